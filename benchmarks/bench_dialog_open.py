@@ -0,0 +1,64 @@
+"""
+反馈窗口打开耗时基准测试
+对比冷启动（每次新建窗口）与预热复用窗口的“请求打开到窗口可见”耗时。
+需要可用的显示环境，例如：xvfb-run python benchmarks/bench_dialog_open.py
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from mcp_feedback_collector.dialog import DialogPool, FeedbackDialog
+from mcp_feedback_collector.ui_thread import get_ui_thread
+
+WORK_SUMMARY = "基准测试：已完成代码优化工作。\n" * 20
+
+
+def open_and_close(dialog):
+    """打开对话框，等待窗口可见后取消，返回打开到可见耗时(ms)"""
+    ui = get_ui_thread()
+    last = ui.latencies[-1] if ui.latencies else None
+    dialog._open_on_ui_thread()
+    while not ui.latencies or ui.latencies[-1] is last:
+        time.sleep(0.001)
+    ui.submit(dialog.cancel).result()
+    return ui.latencies[-1][1]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": round(ordered[0], 2),
+        "median_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def bench_cold(runs):
+    open_and_close(FeedbackDialog(WORK_SUMMARY))  # 预热Tk解释器本身
+    return [open_and_close(FeedbackDialog(WORK_SUMMARY)) for _ in range(runs)]
+
+
+def bench_warm(runs):
+    pool = DialogPool()
+    pool.prewarm().result()
+    return [open_and_close(pool.acquire(WORK_SUMMARY)) for _ in range(runs)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    results = {
+        "cold": summarize(bench_cold(args.runs)),
+        "warm": summarize(bench_warm(args.runs)),
+    }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
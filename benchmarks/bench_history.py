@@ -0,0 +1,91 @@
+"""
+反馈历史记录基准测试
+在临时数据库中写入N条合成会话（部分带图片引用），然后测量：
+- record：单条会话的写入耗时（经历史线程）
+- 全文查询（三元组索引）、短词查询（逐行匹配）、最近会话和按时间筛选的查询耗时
+"""
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from mcp_feedback_collector.history import FeedbackHistory
+
+SEED = 20250528
+WORDS = ["界面", "按钮", "颜色", "布局", "性能", "图片", "超时", "数据库", "迁移", "测试",
+         "layout", "button", "refactor", "timeout", "screenshot", "migration", "cache"]
+
+
+class FakeImage:
+    """只包含历史记录所需字段的图片引用"""
+
+    def __init__(self, rng):
+        self.digest = "%032x" % rng.getrandbits(128)
+        self.source = "剪贴板"
+        self.format = "PNG"
+        self.size = (rng.randrange(100, 4000), rng.randrange(100, 3000))
+        self.file_size = rng.randrange(10_000, 5_000_000)
+
+
+def synthetic_session(rng, index):
+    summary = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(20, 80)))
+    result = {
+        'success': rng.random() > 0.1,
+        'text_feedback': f"第{index}次反馈：" + "".join(rng.choice(WORDS) for _ in range(rng.randrange(3, 15))),
+        'images': [FakeImage(rng) for _ in range(rng.choice((0, 0, 0, 1, 2)))],
+    }
+    return summary, result
+
+
+def timed(func, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[max(0, int(runs * 0.95) - 1)], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(SEED)
+    with tempfile.TemporaryDirectory() as directory:
+        history = FeedbackHistory(str(Path(directory) / "history.sqlite3"))
+        start = time.perf_counter()
+        for index in range(args.sessions):
+            future = history.record(*synthetic_session(rng, index))
+        future.result()
+        fill_seconds = time.perf_counter() - start
+
+        def search(*search_args):
+            return lambda: history.search(*search_args).result()
+
+        results = {
+            "sessions": args.sessions,
+            "fill_seconds": round(fill_seconds, 3),
+            "record": timed(lambda: history.record(*synthetic_session(rng, 0)).result(), args.runs),
+            "search_recent": timed(search("", 10), args.runs),
+            "search_fts": timed(search("数据库迁移", 10), args.runs),
+            "search_fts_rare": timed(search("第12345次", 10), args.runs),
+            "search_short_term": timed(search("界面", 10), args.runs),
+            "search_since": timed(search("", 10, "2100-01-01"), args.runs),
+            "db_bytes": (Path(directory) / "history.sqlite3").stat().st_size,
+        }
+    print(json.dumps(results, indent=2, sort_keys=True, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
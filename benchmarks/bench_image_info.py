@@ -0,0 +1,66 @@
+"""
+图片信息查询基准测试
+在临时目录中生成一批小图片（PNG/JPEG/WebP/GIF），对比：
+- 逐个调用旧实现（Image.open + stat）
+- read_image_infos 首次批量读取（只解析文件头）
+- read_image_infos 再次读取（命中(路径, mtime, 大小)缓存）
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from mcp_feedback_collector.images import read_image_infos
+
+FORMATS = [("png", "PNG"), ("jpg", "JPEG"), ("webp", "WEBP"), ("gif", "GIF")]
+
+
+def generate_images(directory, count):
+    paths = []
+    for i in range(count):
+        suffix, fmt = FORMATS[i % len(FORMATS)]
+        size = (320 + i % 7 * 64, 240 + i % 5 * 48)
+        path = Path(directory) / f"image_{i:04d}.{suffix}"
+        Image.new("RGB", size, (i % 256, 80, 160)).save(path, format=fmt)
+        paths.append(str(path))
+    return paths
+
+
+def legacy_info(path):
+    """旧实现：每个文件分别exists/Image.open/stat"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with Image.open(path) as img:
+        return {"format": img.format, "width": img.width, "height": img.height,
+                "mode": img.mode, "file_size": path.stat().st_size}
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_images(directory, args.count)
+        results = {
+            "images": len(paths),
+            "legacy_sequential_ms": timed(lambda: [legacy_info(p) for p in paths]),
+            "batch_cold_ms": timed(lambda: read_image_infos(paths)),
+            "batch_cached_ms": timed(lambda: read_image_infos(paths)),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+图片条目内存基准测试
+生成若干张大尺寸图片，分别以旧方式（原始数据+解码后的完整图片）和
+ImageEntry（路径+头信息+缩略图）保存，报告各自的进程峰值RSS。
+每种方式在独立子进程中运行，互不影响峰值统计。
+"""
+
+import argparse
+import io
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+
+def generate_images(directory, count, size):
+    """生成带随机噪点的大图（避免被压缩得过小）"""
+    paths = []
+    for i in range(count):
+        img = Image.effect_noise(size, random.randint(40, 90)).convert("RGB")
+        path = Path(directory) / f"large_{i:03d}.jpg"
+        img.save(path, format="JPEG", quality=90)
+        paths.append(str(path))
+    return paths
+
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def run_mode(mode, paths):
+    baseline = peak_rss_mb()
+    kept = []
+    if mode == "eager":
+        from mcp_feedback_collector.images import make_thumbnail
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            img = Image.open(io.BytesIO(data))
+            img.load()
+            kept.append({"data": data, "image": img, "thumbnail_image": make_thumbnail(img)})
+    else:
+        from mcp_feedback_collector.images import ImageEntry
+        kept = [ImageEntry.from_file(path) for path in paths]
+    return {"mode": mode, "images": len(kept), "baseline_mb": round(baseline, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--mode", choices=["eager", "lazy"])
+    parser.add_argument("--dir")
+    args = parser.parse_args()
+
+    if args.mode:
+        paths = sorted(str(p) for p in Path(args.dir).glob("*.jpg"))
+        print(json.dumps(run_mode(args.mode, paths)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate_images(directory, args.count, (args.width, args.height))
+        results = []
+        for mode in ("eager", "lazy"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--dir", directory],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results.append(json.loads(output))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+反馈窗口与图片处理流程基准测试
+以程序方式驱动FeedbackDialog，使用多种尺寸和格式的合成图片，测量：
+- widget_construction：构建窗口和全部控件
+- report_render：不同长度的工作汇报（含代码块和diff），构建窗口的耗时（首次显示）
+  和分块插入全部内容的总耗时
+- update_image_preview：为N张图片创建预览块
+- paste_handler：剪贴板图片粘贴（界面线程阻塞时间，以及读取剪贴板和处理图片的总时间；
+  分别测量PIL图片重新编码为PNG、PNG数据原样使用及重复粘贴相同内容）
+- submit_feedback：提交时的结果组装
+- build_feedback_items：collect_feedback构建MCPImage返回内容（原样发送与缩放为JPEG）
+
+合成图片由固定随机种子生成，输出按键排序的JSON，便于跨提交对比：
+    xvfb-run python benchmarks/bench_pipeline.py --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageGrab
+
+import mcp_feedback_collector.cache as cache_module
+import mcp_feedback_collector.clipboard as clipboard_module
+from mcp_feedback_collector.dialog import FeedbackDialog
+from mcp_feedback_collector.images import ImageEntry
+from mcp_feedback_collector.ui_thread import get_ui_thread
+
+SIZES = {"small": (640, 480), "medium": (1920, 1080), "large": (3840, 2160)}
+FORMATS = ("PNG", "JPEG", "WEBP")
+PREVIEW_COUNTS = (1, 10, 50)
+WORK_SUMMARY = "基准测试：已完成代码优化工作。\n" * 20
+REPORT_LINE_COUNTS = (20, 2000, 20000)
+SEED = 20250528
+
+
+def synthetic_image(size, seed):
+    """生成可复现的合成图片：渐变背景加随机色块（兼顾可压缩性和细节）"""
+    rng = random.Random(seed)
+    width, height = size
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        w, h = rng.randrange(1, width // 4), rng.randrange(1, height // 4)
+        draw.rectangle((x, y, x + w, y + h), fill=tuple(rng.randrange(256) for _ in range(3)))
+    return img
+
+
+def generate_images(directory):
+    """按尺寸和格式生成合成图片文件，返回 {(尺寸名, 格式): 路径}"""
+    paths = {}
+    for index, (size_name, size) in enumerate(sorted(SIZES.items())):
+        img = synthetic_image(size, SEED + index)
+        for fmt in FORMATS:
+            path = Path(directory) / f"{size_name}.{fmt.lower()}"
+            img.save(path, format=fmt)
+            paths[(size_name, fmt)] = str(path)
+    return paths
+
+
+def reset_image_cache():
+    """丢弃进程内图片缓存，使每次测量都走完整的处理路径"""
+    cache_module._image_cache = None
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)], 3),
+    }
+
+
+def measure(func, runs, setup=None, teardown=None):
+    """运行func多次（先预热一次），返回耗时统计；setup的返回值作为func的参数"""
+    samples = []
+    for run in range(runs + 1):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        func(state)
+        elapsed = (time.perf_counter() - start) * 1000
+        if teardown:
+            teardown(state)
+        if run:
+            samples.append(elapsed)
+    return summarize(samples)
+
+
+def on_ui(func, *args):
+    return get_ui_thread().submit(func, *args).result()
+
+
+def loaded_entries(paths, count):
+    files = sorted(paths.values())
+    entries = []
+    for i in range(count):
+        entries.append(ImageEntry.from_file(files[i % len(files)]))
+    return entries
+
+
+def built_dialog():
+    dialog = FeedbackDialog(WORK_SUMMARY)
+    on_ui(dialog._build_window)
+    return dialog
+
+
+def destroy(dialog):
+    on_ui(lambda: dialog.root.destroy() if dialog.root.winfo_exists() else None)
+
+
+def bench_widget_construction(runs):
+    return measure(lambda dialog: on_ui(dialog._build_window), runs,
+                   setup=lambda: FeedbackDialog(WORK_SUMMARY), teardown=destroy)
+
+
+def long_report(line_count):
+    """生成带标题、行内代码和diff代码块的工作汇报"""
+    lines = ["# 基准测试汇报", "已修改 `dialog.py` 和 **report.py**：", "```diff"]
+    rng = random.Random(SEED)
+    while len(lines) < line_count - 1:
+        lines.append(rng.choice("+- ") + "    value = compute(item, " + str(len(lines)) + ")")
+    lines.append("```")
+    return "\n".join(lines[:line_count])
+
+
+def wait_for_report(dialog):
+    """等待工作汇报全部插入完成"""
+    while on_ui(lambda: dialog.report_renderer.pending):
+        time.sleep(0.001)
+
+
+def bench_report_render(runs):
+    results = {}
+    for line_count in REPORT_LINE_COUNTS:
+        summary = long_report(line_count)
+        for markdown in (True, False):
+            key = f"{line_count}_lines_{'markdown' if markdown else 'plain'}"
+            setup = lambda: FeedbackDialog(summary, report_markdown=markdown, report_max_lines=0)
+            results[key] = {
+                "first_paint": measure(lambda dialog: on_ui(dialog._build_window), runs,
+                                       setup=setup, teardown=destroy),
+                "complete": measure(lambda dialog: (on_ui(dialog._build_window), wait_for_report(dialog)), runs,
+                                    setup=setup, teardown=destroy),
+            }
+    return results
+
+
+def bench_update_image_preview(paths, runs):
+    results = {}
+    for count in PREVIEW_COUNTS:
+        entries = loaded_entries(paths, count)
+
+        def setup():
+            dialog = built_dialog()
+            for entry in entries:
+                entry.tile = entry.photo = entry.tile_labels = None
+            dialog.selected_images = list(entries)
+            return dialog
+
+        def teardown(dialog):
+            on_ui(dialog.clear_all_images)
+            destroy(dialog)
+
+        results[f"images_{count}"] = measure(
+            lambda dialog: on_ui(dialog.update_image_preview), runs, setup, teardown
+        )
+    return results
+
+
+def wait_for_paste(dialog):
+    """等待后台剪贴板读取和图片处理完成"""
+    job = on_ui(lambda: dialog._clipboard_job)
+    if job is not None:
+        job.result()
+    while True:
+        jobs = on_ui(lambda: None if dialog._clipboard_job else list(dialog._ingest_jobs))
+        if jobs is not None:
+            for _, future in jobs:
+                future.result()
+            return
+        time.sleep(0.005)
+
+
+def bench_paste_handler(runs):
+    """剪贴板粘贴：PIL图片重新编码为PNG，与剪贴板PNG数据原样使用（首次及重复粘贴）"""
+    results = {}
+    original_grab = ImageGrab.grabclipboard
+    original_passthrough = clipboard_module._read_passthrough
+    try:
+        for index, (size_name, size) in enumerate(sorted(SIZES.items())):
+            base = synthetic_image(size, SEED + index)
+            for mode in ("pil_reencode", "png_passthrough", "png_passthrough_repeat"):
+                ui_block, total_ms = [], []
+                for run in range(runs + 1):
+                    img = base.copy()
+                    if mode != "png_passthrough_repeat":
+                        img.putpixel((0, 0), (run % 256, 0, 0))  # 每次内容不同，避免命中缓存
+                    if mode == "pil_reencode":
+                        ImageGrab.grabclipboard = lambda img=img: img
+                        clipboard_module._read_passthrough = lambda: NotImplemented
+                    else:
+                        buffer = io.BytesIO()
+                        img.save(buffer, format="PNG")
+                        data = buffer.getvalue()
+                        clipboard_module._read_passthrough = lambda data=data: clipboard_module.ClipboardImage(
+                            data, "PNG", cache_module.digest_bytes(data)
+                        )
+                    dialog = built_dialog()
+                    dialog._clipboard_targets = lambda: None
+                    start = time.perf_counter()
+                    on_ui(dialog.paste_handler)
+                    blocked = (time.perf_counter() - start) * 1000
+                    wait_for_paste(dialog)
+                    total = (time.perf_counter() - start) * 1000
+                    on_ui(dialog.clear_all_images)
+                    destroy(dialog)
+                    if run:
+                        ui_block.append(blocked)
+                        total_ms.append(total)
+                results[f"{size_name}_{mode}"] = {
+                    "ui_block": summarize(ui_block), "ui_block_plus_ingest": summarize(total_ms)
+                }
+    finally:
+        ImageGrab.grabclipboard = original_grab
+        clipboard_module._read_passthrough = original_passthrough
+    return results
+
+
+def bench_submit_feedback(paths, runs):
+    results = {}
+    for count in (0, 10):
+        entries = loaded_entries(paths, count)
+
+        def setup():
+            dialog = built_dialog()
+            on_ui(lambda: dialog.text_widget.insert("1.0", "基准测试反馈内容。" * 50))
+            for entry in entries:
+                entry.tile = entry.photo = entry.tile_labels = None
+                on_ui(dialog.add_image, entry)
+            return dialog
+
+        results[f"images_{count}"] = measure(lambda dialog: on_ui(dialog.submit_feedback), runs, setup)
+    return results
+
+
+def bench_build_feedback_items(paths, runs):
+    from mcp_feedback_collector.server import _build_feedback_items
+
+    settings = {
+        "original": {"max_dimension": 0, "target_format": "original", "quality": 85, "max_total_bytes": 0},
+        "jpeg_1568": {"max_dimension": 1568, "target_format": "jpeg", "quality": 85, "max_total_bytes": 0},
+    }
+    results = {}
+    for (size_name, fmt), path in sorted(paths.items()):
+        for setting_name, encoding in settings.items():
+            def setup():
+                reset_image_cache()
+                entry = ImageEntry.from_file(path)
+                return {'success': True, 'has_text': True, 'text_feedback': "基准测试", 'timestamp': "",
+                        'has_images': True, 'images': [entry], 'image_count': 1}
+
+            results[f"{size_name}_{fmt.lower()}_{setting_name}"] = measure(
+                lambda result: asyncio.run(_build_feedback_items(result, encoding)), runs, setup
+            )
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        commit = ""
+    import PIL
+    import tkinter
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "tk": str(tkinter.TkVersion),
+    }
+
+
+def compare(results, baseline):
+    """输出各用例中位数相对基线的变化"""
+    def medians(tree, prefix=""):
+        for key, value in tree.items():
+            if isinstance(value, dict) and "median_ms" in value:
+                yield prefix + key, value["median_ms"]
+            elif isinstance(value, dict):
+                yield from medians(value, f"{prefix}{key}.")
+
+    before = dict(medians(baseline["results"]))
+    for name, after in medians(results["results"]):
+        if name in before and before[name]:
+            print(f"{name}: {before[name]:.3f}ms -> {after:.3f}ms ({after / before[name] - 1:+.1%})",
+                  file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="将结果写入JSON文件")
+    parser.add_argument("--compare", help="与之前保存的JSON结果对比")
+    args = parser.parse_args()
+
+    get_ui_thread()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_images(directory)
+        results = {
+            "environment": environment(),
+            "runs": args.runs,
+            "results": {
+                "widget_construction": bench_widget_construction(args.runs),
+                "report_render": bench_report_render(args.runs),
+                "update_image_preview": bench_update_image_preview(paths, args.runs),
+                "paste_handler": bench_paste_handler(args.runs),
+                "submit_feedback": bench_submit_feedback(paths, args.runs),
+                "build_feedback_items": bench_build_feedback_items(paths, args.runs),
+            },
+        }
+
+    output = json.dumps(results, indent=2, sort_keys=True, ensure_ascii=False)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+服务器冷启动基准测试
+在独立子进程中测量：
+- 导入mcp_feedback_collector.server的耗时，以及导入后是否已加载tkinter/PIL
+- 从启动服务器进程到收到initialize响应的耗时，以及响应之前stdout上是否有非JSON输出
+任一检查失败（加载了界面模块、stdout被污染、超过给定阈值）时以非零状态退出。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("tkinter", "PIL", "PIL.Image", "PIL.ImageTk")
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import mcp_feedback_collector.server
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"import_ms": elapsed,
+                  "heavy_modules": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+INITIALIZE_REQUEST = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "bench-startup", "version": "0"},
+    },
+}
+
+
+def measure_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_initialize(env):
+    """启动服务器进程并发送initialize请求，返回(耗时毫秒, stdout是否干净)"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "mcp_feedback_collector.server"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        env=env, text=True
+    )
+    try:
+        proc.stdin.write(json.dumps(INITIALIZE_REQUEST) + "\n")
+        proc.stdin.flush()
+        clean = True
+        while True:
+            line = proc.stdout.readline()
+            if not line:
+                raise RuntimeError("服务器在响应initialize之前退出")
+            try:
+                message = json.loads(line)
+            except ValueError:
+                clean = False  # stdout上出现了非JSON-RPC输出
+                continue
+            if message.get("id") == 1:
+                return (time.perf_counter() - start) * 1000, clean
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=0, help="导入耗时中位数上限（0表示不检查）")
+    parser.add_argument("--max-initialize-ms", type=float, default=0, help="initialize耗时中位数上限（0表示不检查）")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    imports = [measure_import() for _ in range(args.runs)]
+    initializes = [measure_initialize(env) for _ in range(args.runs)]
+
+    result = {
+        "runs": args.runs,
+        "import_ms": round(statistics.median(r["import_ms"] for r in imports), 1),
+        "initialize_ms": round(statistics.median(ms for ms, _ in initializes), 1),
+        "heavy_modules_on_import": sorted({m for r in imports for m in r["heavy_modules"]}),
+        "stdout_clean": all(clean for _, clean in initializes),
+    }
+    print(json.dumps(result, indent=2))
+
+    failures = []
+    if result["heavy_modules_on_import"]:
+        failures.append(f"导入时加载了界面模块: {result['heavy_modules_on_import']}")
+    if not result["stdout_clean"]:
+        failures.append("initialize响应之前stdout上有非JSON输出")
+    if args.max_import_ms and result["import_ms"] > args.max_import_ms:
+        failures.append(f"导入耗时 {result['import_ms']}ms 超过 {args.max_import_ms}ms")
+    if args.max_initialize_ms and result["initialize_ms"] > args.max_initialize_ms:
+        failures.append(f"initialize耗时 {result['initialize_ms']}ms 超过 {args.max_initialize_ms}ms")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
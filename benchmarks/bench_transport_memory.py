@@ -0,0 +1,77 @@
+"""
+图片发送内存基准测试
+对一张原样发送的大图，用tracemalloc比较两种构建MCP图片内容方式的峰值分配：
+- legacy：读取完整文件为bytes，经MCPImage转换为ImageContent
+- mapped：内存映射文件，分块base64编码后直接构建ImageContent
+结果以“每个发送字节的峰值分配字节数”报告。每种方式在独立子进程中运行。
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+
+def make_payload_file(directory, megabytes):
+    """生成一个指定大小的JPEG文件（内容为随机数据，只需格式头可识别）"""
+    path = Path(directory) / "large.jpg"
+    with open(path, "wb") as f:
+        f.write(b"\xff\xd8\xff\xe0")
+        f.write(os.urandom(megabytes * 1024 * 1024))
+        f.write(b"\xff\xd9")
+    return str(path)
+
+
+def run_mode(mode, path):
+    from mcp.server.fastmcp.utilities.types import Image as MCPImage
+    from mcp_feedback_collector.transport import FileData, image_content
+
+    size = os.path.getsize(path)
+    tracemalloc.start()
+    if mode == "legacy":
+        with open(path, "rb") as f:
+            data = f.read()
+        content = MCPImage(data=data, format="jpeg").to_image_content()
+        del data
+    else:
+        content = image_content(FileData(path, size), "jpeg")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(content.data) == (size + 2) // 3 * 4
+    return {
+        "mode": mode,
+        "payload_bytes": size,
+        "peak_alloc_bytes": peak,
+        "peak_alloc_per_byte": round(peak / size, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megabytes", type=int, default=20)
+    parser.add_argument("--mode", choices=["legacy", "mapped"])
+    parser.add_argument("--path")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.path)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_payload_file(directory, args.megabytes)
+        results = []
+        for mode in ("legacy", "mapped"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--path", path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results.append(json.loads(output))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+反馈界面后端
+collect_feedback通过后端接口显示反馈表单并等待结果：
+- tk：本地Tkinter对话框（默认）
+- web：本地HTTP服务，在浏览器中填写反馈，无需图形显示环境
+- hub：转发给共享的反馈中心进程（见hub.py）
+"""
+
+# 超时自动提交的反馈内容
+AUTO_TIMEOUT_MESSAGE = "由于我现在有些忙,不能立即回复你,继续调用mcp-feedback-collector进行反馈,直到我主动回复你其他内容"
+
+
+def image_limit_error(count: int, total_bytes: int, max_images: int = 0, max_total_bytes: int = 0):
+    """检查加入图片后是否超出单次调用的限制（0表示不限制），超出时返回提示信息"""
+    if max_images and count > max_images:
+        return f"本次反馈最多只能附加{max_images}张图片"
+    if max_total_bytes and total_bytes > max_total_bytes:
+        return f"图片总大小超出限制（{total_bytes / 1024:.0f}KB，上限{max_total_bytes / 1024:.0f}KB）"
+    return None
+
+
+def limit_encoding(encoding: dict, max_total_bytes: int = 0) -> dict:
+    """将单次调用的字节上限合并到图片编码设置中（取较严格的预算）"""
+    encoding = dict(encoding or {})
+    if max_total_bytes:
+        current = encoding.get('max_total_bytes') or 0
+        encoding['max_total_bytes'] = min(current, max_total_bytes) if current else max_total_bytes
+    return encoding
+
+
+def limit_budget(budget: dict, max_tokens: int = 0) -> dict:
+    """将单次调用的token上限合并到响应预算中（取较严格的预算）"""
+    budget = dict(budget or {})
+    if max_tokens:
+        current = budget.get('max_tokens') or 0
+        budget['max_tokens'] = min(current, max_tokens) if current else max_tokens
+    return budget
+
+
+class FeedbackBackend:
+    """反馈界面后端接口
+
+    collect返回的结果字典格式：
+        success: 是否提交成功（取消时为False，并带有message）
+        text_feedback / has_text: 文字反馈
+        images / image_sources / has_images / image_count: 图片条目（ImageEntry）及来源
+        timestamp: 提交时间
+    超时且未能收集到任何结果时返回None。
+    """
+
+    name = ""
+
+    def prewarm(self):
+        """预先准备界面资源（可选）"""
+
+    async def collect(self, work_summary: str, timeout_seconds: int, on_change=None,
+                      max_images: int = 0, max_total_bytes: int = 0, quick_reply: bool = False,
+                      draft_key: str = ""):
+        """显示反馈表单并等待结果
+
+        Args:
+            work_summary: AI完成的工作内容汇报
+            timeout_seconds: 超时时间（秒）
+            on_change: 编辑状态变化回调，参数为 {'text': str, 'images': [ImageEntry]}
+            max_images: 最多可附加的图片数量（0表示不限制），在添加图片时检查
+            max_total_bytes: 所有图片原始数据的总字节上限（0表示不限制），在添加图片时检查
+            quick_reply: 快速回复模式，只显示精简的纯文字窗口
+            draft_key: 草稿标识（如工作目录），支持草稿的后端据此自动保存并恢复未提交的内容
+        """
+        raise NotImplementedError
+
+    def release(self, result):
+        """结果发送给客户端后释放后端资源（如上传的临时文件）"""
+
+
+def create_backend(name: str = "tk", **options) -> FeedbackBackend:
+    """按名称创建反馈界面后端（按需导入，web后端不会加载tkinter）"""
+    if name == "tk":
+        try:
+            from .dialog import TkBackend
+        except ImportError:
+            from dialog import TkBackend
+        return TkBackend(
+            warm=options.get('warm', False),
+            draft_path=options.get('draft_path'),
+            report_markdown=options.get('report_markdown', True),
+            report_max_lines=options.get('report_max_lines', 2000),
+        )
+    if name == "web":
+        try:
+            from .web_backend import WebBackend
+        except ImportError:
+            from web_backend import WebBackend
+        return WebBackend(
+            host=options.get('host', "127.0.0.1"),
+            port=options.get('port', 0),
+            open_browser=options.get('open_browser', True)
+        )
+    if name == "hub":
+        try:
+            from .hub import HubBackend
+        except ImportError:
+            from hub import HubBackend
+        return HubBackend(
+            socket_path=options.get('socket_path'),
+            encoding=options.get('encoding'),
+            fallback=options.get('fallback')
+        )
+    raise ValueError(f"未知的反馈界面后端: {name}")
@@ -0,0 +1,199 @@
+"""
+返回内容的大小估算与响应预算
+collect_feedback返回一条文字和每张图片一个ImageContent，图片多时可能超出模型上下文
+或传输层的消息大小限制。返回前估算每项内容的token数和字节数，超出预算时依次：
+逐步缩小图片、把所有图片合并为一张编号的网格图、降为小缩略图，最后才放弃发送图片；
+采用的处理方式写入返回的文字中（这行说明本身的大小也预先从预算中扣除）。
+
+token数按图片像素估算（模型先把图片缩小到长边1568像素、约115万像素以内，
+每750像素约1个token），文字按ASCII约4个字符1个token、其他字符约1个字符1个token估算。
+"""
+
+import base64
+import io
+import math
+
+from PIL import Image, ImageDraw
+
+try:
+    from .images import TRANSPORT_FORMATS, save_image
+    from .transport import Base64Text, FileData
+except ImportError:
+    from images import TRANSPORT_FORMATS, save_image
+    from transport import Base64Text, FileData
+
+# 模型处理图片前的缩放上限
+MODEL_MAX_EDGE = 1568
+MODEL_MAX_PIXELS = 1_150_000
+PIXELS_PER_TOKEN = 750
+
+# 逐步缩小时尝试的最长边（像素）
+DOWNSCALE_EDGES = (1568, 1024, 768, 512)
+# 网格图中每格的最大边长（像素），图片多时缩小使整张网格图不超过模型缩放上限
+CONTACT_SHEET_CELLS = (512, 256, 128)
+CONTACT_SHEET_QUALITY = 80
+# 最后一级：每张图片单独发送的小缩略图
+THUMBNAIL_EDGE = 128
+THUMBNAIL_QUALITY = 60
+
+# 各级处理方式的说明
+DOWNSCALE_NOTE = "图片已缩小至最长边 {edge} 像素"
+CONTACT_SHEET_NOTE = "{count} 张图片已合并为一张网格图（每格 {cell} 像素，按附加顺序从左到右、从上到下编号）"
+THUMBNAIL_NOTE = "图片已降为最长边 {edge} 像素的缩略图"
+DROPPED_NOTE = "{count} 张图片超出响应预算，未发送"
+
+
+def estimate_text_tokens(text: str) -> int:
+    """估算文字的token数"""
+    extra = len(text.encode()) - len(text)
+    # 非ASCII字符（中文等）在UTF-8中多占2个字节，约1个字符1个token
+    wide = extra // 2
+    return math.ceil((len(text) - wide) / 4) + wide
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """估算图片的token数（按模型缩放后的像素数）"""
+    if not width or not height:
+        return 0
+    scale = min(1.0, MODEL_MAX_EDGE / max(width, height), math.sqrt(MODEL_MAX_PIXELS / (width * height)))
+    return max(1, math.ceil(width * scale * height * scale / PIXELS_PER_TOKEN))
+
+
+def text_cost(text: str):
+    """文字内容的 (估算token数, 字节数)"""
+    return estimate_text_tokens(text), len(text.encode())
+
+
+def note_cost(image_count: int, max_tokens: int = 0, max_bytes: int = 0):
+    """预算说明（含换行）最多占用的 (token数, 字节数)，按最长的说明和足够多位数的估算值计算"""
+    notes = (
+        DOWNSCALE_NOTE.format(edge=max(DOWNSCALE_EDGES)),
+        CONTACT_SHEET_NOTE.format(count=image_count, cell=max(CONTACT_SHEET_CELLS)),
+        THUMBNAIL_NOTE.format(edge=THUMBNAIL_EDGE),
+        DROPPED_NOTE.format(count=image_count),
+    )
+    costs = [text_cost("\n" + format_budget_note(note, (10 ** 9, 10 ** 12), max_tokens, max_bytes)) for note in notes]
+    return max(tokens for tokens, _ in costs), max(size for _, size in costs)
+
+
+def _open_payload(data):
+    """打开编码结果（只读取文件头，需要像素时再解码）"""
+    if isinstance(data, FileData):
+        return Image.open(data.path)
+    if isinstance(data, Base64Text):
+        return Image.open(io.BytesIO(base64.b64decode(data)))
+    return Image.open(io.BytesIO(bytes(data)))
+
+
+def image_cost(data):
+    """图片编码结果的 (估算token数, 发送的base64字节数)"""
+    with _open_payload(data) as img:
+        tokens = estimate_image_tokens(*img.size)
+    if isinstance(data, Base64Text):
+        return tokens, len(data)
+    return tokens, (len(data) + 2) // 3 * 4
+
+
+def _encode(img, fmt, quality=85):
+    data = save_image(img, fmt, quality)
+    return data, TRANSPORT_FORMATS[fmt]
+
+
+def _scaled(img, edge):
+    img = img.copy()
+    img.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+    return img
+
+
+def contact_sheet(images, cell: int):
+    """把多张图片按顺序排成带编号的网格图"""
+    columns = math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    sheet = Image.new('RGB', (columns * cell, rows * cell), (255, 255, 255))
+    draw = ImageDraw.Draw(sheet)
+    for index, img in enumerate(images):
+        left, top = index % columns * cell, index // columns * cell
+        thumbnail = _scaled(img, cell - 4).convert('RGBA')
+        sheet.paste(
+            thumbnail,
+            (left + (cell - thumbnail.width) // 2, top + (cell - thumbnail.height) // 2),
+            thumbnail
+        )
+        draw.rectangle((left, top, left + cell - 1, top + cell - 1), outline=(189, 195, 199))
+        draw.rectangle((left, top, left + 20, top + 14), fill=(44, 62, 80))
+        draw.text((left + 4, top + 2), str(index + 1), fill=(255, 255, 255))
+    return sheet
+
+
+def shape_images(payloads, max_tokens: int = 0, max_bytes: int = 0, reserved=(0, 0)):
+    """使图片编码结果不超过响应预算（在后台线程中调用）
+
+    reserved为文字等其他内容已占用的 (token数, 字节数)。
+    返回 (图片编码结果列表, 采用的处理方式说明或None, 全部内容的 (token数, 字节数))；
+    网格图只返回一项，放弃发送图片时返回空列表。需要处理时，全部内容包含说明的估算大小。
+    """
+    reserved_tokens, reserved_bytes = reserved
+
+    def total(candidate):
+        costs = [image_cost(data) for data, _ in candidate]
+        return (reserved_tokens + sum(tokens for tokens, _ in costs),
+                reserved_bytes + sum(size for _, size in costs))
+
+    def fits(cost):
+        return (not max_tokens or cost[0] <= max_tokens) and (not max_bytes or cost[1] <= max_bytes)
+
+    cost = total(payloads)
+    if not payloads or fits(cost):
+        return payloads, None, cost
+
+    # 处理后的返回内容会多出一行说明，先从预算中扣除
+    extra_tokens, extra_bytes = note_cost(len(payloads), max_tokens, max_bytes)
+    reserved_tokens += extra_tokens
+    reserved_bytes += extra_bytes
+
+    images = []
+    for data, fmt in payloads:
+        with _open_payload(data) as img:
+            img.load()
+            images.append((img.copy(), fmt.upper() if fmt.upper() in ('JPEG', 'WEBP') else 'PNG'))
+
+    # 1. 逐步缩小每张图片
+    longest = max(max(img.size) for img, _ in images)
+    for edge in DOWNSCALE_EDGES:
+        if edge >= longest:
+            continue
+        candidate = [_encode(_scaled(img, edge), fmt) for img, fmt in images]
+        cost = total(candidate)
+        if fits(cost):
+            return candidate, DOWNSCALE_NOTE.format(edge=edge), cost
+
+    # 2. 合并为一张网格图（整张图不超过模型的缩放上限）
+    if len(images) > 1:
+        columns = math.ceil(math.sqrt(len(images)))
+        for cell in sorted({min(cell, MODEL_MAX_EDGE // columns) for cell in CONTACT_SHEET_CELLS}, reverse=True):
+            sheet = contact_sheet([img for img, _ in images], cell)
+            candidate = [_encode(sheet, 'JPEG', CONTACT_SHEET_QUALITY)]
+            cost = total(candidate)
+            if fits(cost):
+                return candidate, CONTACT_SHEET_NOTE.format(count=len(images), cell=cell), cost
+
+    # 3. 降为小缩略图
+    candidate = [_encode(_scaled(img, THUMBNAIL_EDGE), 'JPEG', THUMBNAIL_QUALITY) for img, _ in images]
+    cost = total(candidate)
+    if fits(cost):
+        return candidate, THUMBNAIL_NOTE.format(edge=THUMBNAIL_EDGE), cost
+
+    return [], DROPPED_NOTE.format(count=len(images)), (reserved_tokens, reserved_bytes)
+
+
+def format_budget_note(degradation: str, cost, max_tokens: int = 0, max_bytes: int = 0) -> str:
+    """返回文字中说明响应预算处理的一行"""
+    limits = []
+    if max_tokens:
+        limits.append(f"{max_tokens:,} tokens")
+    if max_bytes:
+        limits.append(f"{max_bytes / 1024:.0f} KB")
+    return (
+        f"响应预算：{degradation}（返回内容估算 {cost[0]:,} tokens / {cost[1] / 1024:.0f} KB，"
+        f"预算 {' / '.join(limits)}）"
+    )
@@ -0,0 +1,199 @@
+"""
+按内容哈希索引的图片缓存
+同一张图片（文件或剪贴板）在多轮反馈中重复附加时，复用已生成的缩略图、
+头信息和编码结果，避免重复读取、解码和压缩。
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    from .transport import FileData
+except ImportError:
+    from transport import FileData
+
+# 默认缓存上限：64MB
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# 文件路径到内容哈希的记录数量上限
+MAX_FILE_DIGESTS = 4096
+# 记录已发送图片哈希的数量上限
+MAX_SENT_DIGESTS = 4096
+# 流式计算文件哈希时的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def digest_bytes(data) -> str:
+    """计算数据的内容哈希"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def digest_pixels(img) -> str:
+    """计算PIL图片像素内容的哈希（用于剪贴板图片，无需先编码）"""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode())
+    hasher.update(img.tobytes())
+    return hasher.hexdigest()
+
+
+class CachedImage:
+    """缓存中的单张图片：缩略图、头信息、编码结果"""
+
+    __slots__ = ('size', 'format', 'file_size', 'thumbnail_image', 'data', 'payloads', 'preview_image')
+
+    def __init__(self, size, format, file_size, thumbnail_image, data=None):
+        self.size = size
+        self.format = format
+        self.file_size = file_size
+        self.thumbnail_image = thumbnail_image
+        self.data = data  # 没有对应文件的图片（如剪贴板）保存其原始编码数据
+        self.payloads = {}  # 编码参数 -> (数据, MCP格式名)
+        self.preview_image = None  # 裁剪/标注窗口使用的缩小预览
+
+    @property
+    def nbytes(self) -> int:
+        """估算占用的字节数"""
+        total = len(self.data) if self.data is not None else 0
+        total += _image_nbytes(self.thumbnail_image) + _image_nbytes(self.preview_image)
+        return total + sum(_payload_nbytes(payload) for payload in self.payloads.values())
+
+
+def _payload_nbytes(payload) -> int:
+    """编码结果占用的内存：原样发送的文件只记录路径，发送时才映射，不计入缓存大小"""
+    data = payload[0]
+    return 0 if isinstance(data, FileData) else len(data)
+
+
+def _image_nbytes(img) -> int:
+    if img is None:
+        return 0
+    width, height = img.size
+    return width * height * len(img.getbands())
+
+
+class ImageCache:
+    """内容哈希 -> CachedImage，按总字节数进行LRU淘汰"""
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._file_digests = OrderedDict()  # (路径, mtime_ns, 大小) -> 内容哈希
+        self._sent = OrderedDict()  # 已发送给客户端的图片哈希
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        """查找缓存的图片，命中时移到最近使用位置"""
+        with self._lock:
+            item = self._items.get(digest)
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(digest)
+            return item
+
+    def put(self, digest, item):
+        """加入或替换缓存的图片"""
+        with self._lock:
+            old = self._items.pop(digest, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._items[digest] = item
+            self.total_bytes += item.nbytes
+            self._evict()
+
+    def get_payload(self, digest, params):
+        """查找指定编码参数下的编码结果"""
+        item = self.get(digest)
+        if item is None:
+            return None
+        return item.payloads.get(params)
+
+    def put_payload(self, digest, params, payload):
+        """保存编码结果（图片不在缓存中时忽略）"""
+        with self._lock:
+            item = self._items.get(digest)
+            if item is None:
+                return
+            old = item.payloads.get(params)
+            if old is not None:
+                self.total_bytes -= _payload_nbytes(old)
+            item.payloads[params] = payload
+            self.total_bytes += _payload_nbytes(payload)
+            self._items.move_to_end(digest)
+            self._evict()
+
+    def get_preview(self, digest):
+        """查找缓存的缩小预览"""
+        item = self.get(digest)
+        return item.preview_image if item is not None else None
+
+    def put_preview(self, digest, preview):
+        """保存缩小预览（图片不在缓存中时忽略）"""
+        with self._lock:
+            item = self._items.get(digest)
+            if item is None:
+                return
+            self.total_bytes -= _image_nbytes(item.preview_image)
+            item.preview_image = preview
+            self.total_bytes += _image_nbytes(preview)
+            self._items.move_to_end(digest)
+            self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._items) > 1:
+            _, item = self._items.popitem(last=False)
+            self.total_bytes -= item.nbytes
+
+    def file_digest(self, path) -> str:
+        """计算文件内容哈希，(路径, 修改时间, 大小)未变时直接复用"""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._file_digests.get(key)
+            if digest is not None:
+                self._file_digests.move_to_end(key)
+                return digest
+
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+
+        with self._lock:
+            self._file_digests[key] = digest
+            while len(self._file_digests) > MAX_FILE_DIGESTS:
+                self._file_digests.popitem(last=False)
+        return digest
+
+    def mark_sent(self, digest) -> bool:
+        """记录图片已发送给客户端，返回此前是否已发送过"""
+        with self._lock:
+            seen = digest in self._sent
+            self._sent[digest] = True
+            self._sent.move_to_end(digest)
+            while len(self._sent) > MAX_SENT_DIGESTS:
+                self._sent.popitem(last=False)
+            return seen
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> ImageCache:
+    """获取进程内共享的图片缓存（上限由MCP_IMAGE_CACHE_BYTES设置）"""
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            try:
+                max_bytes = int(os.getenv("MCP_IMAGE_CACHE_BYTES", DEFAULT_CACHE_BYTES))
+            except ValueError:
+                max_bytes = DEFAULT_CACHE_BYTES
+            _image_cache = ImageCache(max_bytes)
+    return _image_cache
@@ -0,0 +1,108 @@
+"""
+剪贴板图片读取
+在图片线程池中执行（不阻塞界面线程）。Linux上直接通过wl-paste/xclip读取剪贴板中的
+PNG/JPEG原始数据并原样使用，不再解码后重新编码为PNG；X11下用选区的TIMESTAMP判断
+剪贴板是否变化，内容未变时直接复用上次读取的结果。其他平台或剪贴板只有其他图片格式时
+退回ImageGrab.grabclipboard()。
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+try:
+    from .cache import digest_bytes, get_image_cache
+except ImportError:
+    from cache import digest_bytes, get_image_cache
+
+# 可以原样使用的剪贴板图片类型
+PASSTHROUGH_TYPES = (('image/png', 'PNG'), ('image/jpeg', 'JPEG'))
+# 剪贴板命令的超时时间（秒）
+CLIPBOARD_COMMAND_TIMEOUT = 5
+
+
+class ClipboardImage:
+    """从剪贴板直接读取的已编码图片"""
+
+    __slots__ = ('data', 'format', 'digest')
+
+    def __init__(self, data: bytes, format: str, digest: str):
+        self.data = data
+        self.format = format
+        self.digest = digest
+
+
+# 上次读取的剪贴板：(选区时间戳, 内容哈希, 格式)
+_last_clipboard = None
+_last_clipboard_lock = threading.Lock()
+
+
+def _run(args) -> bytes:
+    result = subprocess.run(args, capture_output=True, timeout=CLIPBOARD_COMMAND_TIMEOUT)
+    return result.stdout if result.returncode == 0 else b""
+
+
+def _clipboard_tool():
+    """返回 (列出类型的命令, 读取指定类型的命令前缀, 时间戳命令)，没有可用工具时返回None"""
+    if not sys.platform.startswith('linux'):
+        return None
+    if os.getenv('WAYLAND_DISPLAY') and shutil.which('wl-paste'):
+        return ['wl-paste', '--list-types'], ['wl-paste', '--no-newline', '--type'], None
+    if os.getenv('DISPLAY') and shutil.which('xclip'):
+        base = ['xclip', '-selection', 'clipboard', '-o', '-t']
+        return base + ['TARGETS'], base, base + ['TIMESTAMP']
+    return None
+
+
+def _read_passthrough():
+    """直接读取剪贴板中的PNG/JPEG数据
+
+    返回ClipboardImage；剪贴板中没有图片时返回None；无法直接读取
+    （没有命令行工具或只有其他图片格式）时返回NotImplemented。
+    """
+    global _last_clipboard
+    tool = _clipboard_tool()
+    if tool is None:
+        return NotImplemented
+    list_command, read_command, timestamp_command = tool
+    types = _run(list_command).decode(errors='replace').split()
+    mime = next((mime for mime, _ in PASSTHROUGH_TYPES if mime in types), None)
+    if mime is None:
+        return NotImplemented if any(t.startswith('image/') for t in types) else None
+    fmt = dict(PASSTHROUGH_TYPES)[mime]
+
+    # 选区时间戳未变时剪贴板内容未变，直接使用缓存中的数据
+    timestamp = _run(timestamp_command).strip() if timestamp_command and 'TIMESTAMP' in types else None
+    with _last_clipboard_lock:
+        last = _last_clipboard
+    if timestamp and last is not None and last[0] == timestamp:
+        cached = get_image_cache().get(last[1])
+        if cached is not None and cached.data is not None:
+            return ClipboardImage(cached.data, last[2], last[1])
+
+    data = _run(read_command + [mime])
+    if not data:
+        return None
+    digest = digest_bytes(data)
+    with _last_clipboard_lock:
+        _last_clipboard = (timestamp, digest, fmt)
+    return ClipboardImage(data, fmt, digest)
+
+
+def read_clipboard():
+    """读取剪贴板图片（在后台线程中调用）
+
+    返回ClipboardImage（原始PNG/JPEG数据）、PIL图片、文件路径列表（复制的文件）
+    或None（剪贴板中没有图片）。
+    """
+    try:
+        image = _read_passthrough()
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"直接读取剪贴板失败，改用ImageGrab: {e}", file=sys.stderr)
+        image = NotImplemented
+    if image is not NotImplemented:
+        return image
+    from PIL import ImageGrab
+    return ImageGrab.grabclipboard() or None
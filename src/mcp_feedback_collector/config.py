@@ -0,0 +1,128 @@
+"""
+运行配置
+所有环境变量在第一次需要时才读取（而不是在导入server.py时），
+诊断信息一律输出到标准错误，避免污染stdio上的JSON-RPC数据流。
+"""
+
+import os
+import sys
+import threading
+
+# 默认超时时间（秒）
+DEFAULT_DIALOG_TIMEOUT = 300  # 5分钟
+# 超时时间上限：24小时
+MAX_DIALOG_TIMEOUT = 86400
+
+
+def _env_int(name, default):
+    """读取整数环境变量，无法解析时使用默认值"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError as e:
+        print(f"警告：无法解析{name}环境变量，使用默认值 {default}: {e}", file=sys.stderr)
+        return default
+
+
+def _env_flag(name, default=""):
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+# 可配置的图片发送格式（original表示保持原格式）
+IMAGE_FORMATS = ("original", "png", "jpeg", "jpg", "webp")
+
+
+def check_image_format(value: str) -> str:
+    """检查图片发送格式，不支持时抛出ValueError（在用户填写反馈之前检查）"""
+    if value.lower() not in IMAGE_FORMATS:
+        raise ValueError(f"不支持的图片输出格式: {value}（可选 {'/'.join(IMAGE_FORMATS)}）")
+    return value.lower()
+
+
+def _load_image_format():
+    value = os.getenv("MCP_IMAGE_FORMAT", "original")
+    try:
+        return check_image_format(value)
+    except ValueError as e:
+        print(f"警告：{e}，MCP_IMAGE_FORMAT改为original", file=sys.stderr)
+        return "original"
+
+
+def _load_dialog_timeout():
+    timeout = _env_int("MCP_DIALOG_TIMEOUT", DEFAULT_DIALOG_TIMEOUT)
+    # 支持更长的超时时间，最大支持24小时
+    if timeout > MAX_DIALOG_TIMEOUT:
+        print(f"警告：超时时间过长 ({timeout}秒)，已限制为24小时", file=sys.stderr)
+        timeout = MAX_DIALOG_TIMEOUT
+    print(f"MCP反馈收集器超时时间设置为: {timeout}秒 ({timeout // 60}分钟)", file=sys.stderr)
+    return timeout
+
+
+def _load_data_path(name, filename, enabled=True):
+    """本地数据文件路径：设置为文件路径时使用该路径，设置为1/on时使用用户数据目录下的
+    默认路径，设置为0/off/false/none时不保存；未设置时由enabled决定是否使用默认路径"""
+    path = os.getenv(name, "")
+    if path.lower() in ("0", "off", "false", "no", "none") or (not path and not enabled):
+        return None
+    if path and path.lower() not in ("1", "true", "yes", "on"):
+        return path
+    base = os.getenv("LOCALAPPDATA") if sys.platform == "win32" else os.getenv("XDG_DATA_HOME")
+    base = base or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "mcp-feedback-collector", filename)
+
+
+class FeedbackConfig:
+    """从环境变量读取的运行配置"""
+
+    def __init__(self):
+        self.dialog_timeout = _load_dialog_timeout()
+
+        # 图片发送编码设置（0表示不限制）
+        self.image_encoding = {
+            'max_dimension': _env_int("MCP_IMAGE_MAX_DIMENSION", 0),  # 最长边像素
+            'target_format': _load_image_format(),  # original/png/jpeg/webp
+            'quality': _env_int("MCP_IMAGE_QUALITY", 85),  # JPEG/WebP质量
+            'max_total_bytes': _env_int("MCP_IMAGE_MAX_TOTAL_BYTES", 0),  # 单次提交所有图片的总字节预算
+        }
+
+        # 单次返回内容的预算（0表示不限制），超出时缩小图片、合并为网格图或降为缩略图
+        self.response_budget = {
+            'max_tokens': _env_int("MCP_RESPONSE_MAX_TOKENS", 0),  # 估算的token数
+            'max_bytes': _env_int("MCP_RESPONSE_MAX_BYTES", 0),  # 文字和base64图片的字节数
+        }
+
+        # 已发送过的相同图片改为发送简短的文字引用
+        self.image_dedup_reference = _env_flag("MCP_IMAGE_DEDUP_REFERENCE")
+
+        # 预热窗口模式：保留一个已构建的隐藏窗口，再次调用时重置状态后直接显示
+        self.dialog_warm = _env_flag("MCP_DIALOG_WARM")
+
+        # 反馈界面后端：tk（本地对话框）、web（浏览器表单，无需图形显示环境）
+        # 或 hub（转发给共享的反馈中心，中心未运行时退回本地对话框）
+        self.feedback_ui = os.getenv("MCP_FEEDBACK_UI", "tk").lower()
+        self.web_host = os.getenv("MCP_FEEDBACK_WEB_HOST", "127.0.0.1")
+        self.web_port = _env_int("MCP_FEEDBACK_WEB_PORT", 0)
+        self.web_open = _env_flag("MCP_FEEDBACK_WEB_OPEN", "1")
+        # 反馈中心的套接字路径（为空时使用默认路径）
+        self.hub_socket = os.getenv("MCP_FEEDBACK_HUB_SOCKET") or None
+
+        # 反馈历史记录的SQLite数据库路径（None表示不记录）；保存反馈全文，需显式开启
+        self.history_path = _load_data_path("MCP_FEEDBACK_HISTORY", "history.sqlite3", enabled=False)
+        # 未提交反馈草稿的SQLite数据库路径（None表示不保存草稿）
+        self.draft_path = _load_data_path("MCP_FEEDBACK_DRAFTS", "drafts.sqlite3")
+
+        # 工作汇报的显示：是否应用轻量markdown样式，超过多少行时截断（0表示不截断）
+        self.report_markdown = _env_flag("MCP_REPORT_MARKDOWN", "1")
+        self.report_max_lines = _env_int("MCP_REPORT_MAX_LINES", 2000)
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> FeedbackConfig:
+    """获取运行配置（第一次调用时读取环境变量）"""
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = FeedbackConfig()
+    return _config
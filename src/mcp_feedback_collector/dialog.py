@@ -0,0 +1,1188 @@
+"""
+Tkinter反馈对话框
+FeedbackDialog是反馈界面后端的Tk实现，所有窗口都在常驻界面线程中创建。
+"""
+
+import asyncio
+import math
+import queue
+import sys
+import threading
+import time
+import tkinter as tk
+from datetime import datetime
+from tkinter import filedialog, messagebox, scrolledtext
+
+from PIL import ImageTk
+
+try:
+    from .backend import AUTO_TIMEOUT_MESSAGE, FeedbackBackend, image_limit_error
+    from .clipboard import ClipboardImage, read_clipboard
+    from .config import DEFAULT_DIALOG_TIMEOUT
+    from .drafts import get_draft_store
+    from .images import ImageEntry, get_executor
+    from .report import DEFAULT_MAX_LINES, ReportRenderer
+    from .telemetry import get_telemetry
+    from .ui_thread import get_ui_thread, get_ui_thread_async
+except ImportError:
+    from backend import AUTO_TIMEOUT_MESSAGE, FeedbackBackend, image_limit_error
+    from clipboard import ClipboardImage, read_clipboard
+    from config import DEFAULT_DIALOG_TIMEOUT
+    from drafts import get_draft_store
+    from images import ImageEntry, get_executor
+    from report import DEFAULT_MAX_LINES, ReportRenderer
+    from telemetry import get_telemetry
+    from ui_thread import get_ui_thread, get_ui_thread_async
+
+# 后台图片任务结果的轮询间隔（毫秒）
+INGEST_POLL_MS = 50
+
+# 编辑状态变化通知的合并间隔（毫秒）
+CHANGE_DEBOUNCE_MS = 300
+# 等待方在截止时间之后额外等待的秒数，留给界面线程完成自动提交
+AUTO_SUBMIT_GRACE_SECONDS = 5
+# 预热窗口的最长等待时间（秒），超时或失败时改为按需打开
+PREWARM_TIMEOUT_SECONDS = 10
+
+
+class FeedbackDialog:
+    WINDOW_WIDTH = 700
+    WINDOW_HEIGHT = 1150
+    
+    def __init__(self, work_summary: str = "", timeout_seconds: int = DEFAULT_DIALOG_TIMEOUT, pool=None,
+                 report_markdown: bool = True, report_max_lines: int = DEFAULT_MAX_LINES):
+        self.result_queue = queue.Queue()
+        self.pool = pool  # 所属的预热窗口池（None表示用完即销毁）
+        # 工作汇报的显示方式：是否应用markdown样式、超过多少行时截断（0表示不截断）
+        self.report_markdown = report_markdown
+        self.report_max_lines = report_max_lines
+        self.root = None
+        self.work_summary = work_summary
+        self.timeout_seconds = timeout_seconds
+        self.selected_images = []  # 改为支持多张图片
+        # 单次调用的图片限制（0表示不限制），添加图片时检查
+        self.max_images = 0
+        self.max_total_bytes = 0
+        self.image_preview_frame = None
+        self.no_image_label = None
+        self._ingest_jobs = []  # [(图片条目, Future), ...] 后台处理中的图片
+        self._ingest_poll_id = None
+        self._clipboard_job = None  # 后台读取剪贴板的任务（只处理最近一次粘贴）
+        self.report_text = None
+        self.report_renderer = None  # 分块插入工作汇报（长汇报不阻塞窗口显示）
+        self.text_widget = None
+        # 倒计时相关属性（界面与等待方共享同一个单调时钟截止时间）
+        self.deadline = None
+        self.remaining_seconds = timeout_seconds
+        self.countdown_label = None
+        self.countdown_timer = None
+        self._countdown_display = None
+        self.auto_timeout_message = AUTO_TIMEOUT_MESSAGE
+        # 异步等待相关属性（由show_dialog_async设置）
+        self._loop = None
+        self._future = None
+        # 编辑状态变化回调（在界面线程中调用，参数为状态快照）
+        self.on_change = None
+        self._change_after_id = None
+        self._shown_at = None  # 窗口显示时间，用于统计用户填写耗时
+        # 草稿自动保存（DraftSession）和打开窗口时要恢复的草稿
+        self.draft = None
+        self.restored_draft = None
+        self.editor = None  # 打开中的裁剪/标注窗口
+        # 会话已结束（提交、取消或窗口已放回窗口池），此后的提交/取消/自动提交都被忽略
+        self._closed = True
+        self._submit_after_id = None  # 等待图片处理完成后再提交的定时回调
+        
+    def _open_on_ui_thread(self):
+        """请求常驻界面线程打开对话框"""
+        self._open_requested_at = time.perf_counter()
+        try:
+            future = get_ui_thread().submit(self._open_window)
+        except Exception as e:
+            # 界面线程无法启动（如没有可用的显示环境）
+            self._report_open_error(e)
+            return
+        future.add_done_callback(self._on_open_done)
+        
+    def _on_open_done(self, future):
+        """对话框创建失败时直接向等待方返回错误"""
+        error = future.exception()
+        if error is not None:
+            self._report_open_error(error)
+        
+    def _report_open_error(self, error):
+        self._deliver_result({
+            'success': False,
+            'message': f'无法打开反馈窗口: {error}'
+        })
+        
+    def _open_window(self):
+        """在界面线程中打开对话框：复用已构建的隐藏窗口，否则新建"""
+        if self.root is not None and self.root.winfo_exists():
+            self.reset_widgets()
+        else:
+            self._build_window()
+        self._show_window()
+        if self.restored_draft is not None:
+            self.restore_draft(self.restored_draft)
+            self.restored_draft = None
+        
+    def _build_window(self):
+        """在界面线程中创建隐藏的对话框窗口（Toplevel，共享同一个Tk解释器）"""
+        ui = get_ui_thread()
+        self.root = tk.Toplevel(ui.root)
+        self.root.withdraw() # 构建完成前保持隐藏
+        self.root.title("🎯 工作完成汇报与反馈收集")
+        self.root.geometry(f"{self.WINDOW_WIDTH}x{self.WINDOW_HEIGHT}") # 增大窗口高度以容纳倒计时
+        self.root.resizable(True, True)
+        self.root.configure(bg="#f5f5f5")
+        
+        # 设置窗口图标和样式
+        try:
+            self.root.iconbitmap(default="")
+        except:
+            pass
+        
+        # 绑定键盘快捷键
+        # self.root.bind('<Return>', lambda event=None: self.submit_feedback()) # Enter键绑定提交
+        self.root.bind('<Control-Return>', lambda event=None: self.submit_feedback()) # Ctrl+Enter键绑定提交
+        self.root.bind('<Escape>', lambda event=None: self.cancel())   # Esc键绑定取消
+        self.root.protocol("WM_DELETE_WINDOW", self.cancel) # 关闭窗口视为取消
+
+        # 注意：Ctrl+V将直接绑定到text_widget以确保单次粘贴
+
+        # 创建界面
+        with get_telemetry().span("dialog.create_widgets", dialog=type(self).__name__):
+            self.create_widgets()
+        
+    def _show_window(self):
+        """居中显示窗口并启动倒计时"""
+        ui = get_ui_thread()
+        ui.track_visible("反馈窗口", self.root, self._open_requested_at)
+        
+        # --- 确保窗口显示和居中 --- #
+        # 手动计算并设置窗口位置，多个会话同时打开时叠放显示
+        offset = ui.session_opened()
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
+
+        x = (screen_width // 2) - (self.WINDOW_WIDTH // 2) + offset
+        y = (screen_height // 2) - (self.WINDOW_HEIGHT // 2) + offset
+
+        self.root.geometry(f'{self.WINDOW_WIDTH}x{self.WINDOW_HEIGHT}+{x}+{y}')
+        
+        # 确保窗口显示在前
+        self.root.deiconify() # 如果窗口被最小化，恢复它
+        self.root.lift()      # 将窗口带到顶部
+        # self.root.attributes('-topmost', True) # 可选：使其置顶
+        # self.root.after(500, lambda: self.root.attributes('-topmost', False)) # 可选：短暂置顶后取消 (500ms)
+        
+        # 启动倒计时
+        self._closed = False
+        self._shown_at = time.perf_counter()
+        self.start_countdown()
+        
+    def reset_widgets(self):
+        """重置已构建窗口的界面状态，供下一次会话复用"""
+        self.report_renderer.render(self.work_summary or "本次对话中完成的工作内容...")
+        
+        self.text_widget.delete(1.0, tk.END)
+        self.text_widget.insert(tk.END, "请在此输入您的反馈、建议或问题...")
+        self.text_widget.edit_reset()
+        
+        self.clear_all_images()
+        
+        self.remaining_seconds = self.timeout_seconds
+        self.countdown_timer = None
+        self._countdown_display = None
+        self.countdown_label.config(
+            text=f"⏰ 剩余时间：{self.timeout_seconds//60}分{self.timeout_seconds%60:02d}秒",
+            fg="#2c3e50"
+        )
+        
+    def reset_session(self, work_summary: str = "", timeout_seconds: int = DEFAULT_DIALOG_TIMEOUT):
+        """为新的会话重置非界面状态（窗口空闲时调用）"""
+        self.result_queue = queue.Queue()
+        self.work_summary = work_summary
+        self.timeout_seconds = timeout_seconds
+        self.deadline = None
+        self.remaining_seconds = timeout_seconds
+        self._loop = None
+        self._future = None
+        self.on_change = None
+        self.max_images = 0
+        self.max_total_bytes = 0
+        self.draft = None
+        self.restored_draft = None
+        
+    def _close_window(self):
+        """关闭对话框窗口（界面线程继续运行）"""
+        if self._closed:
+            return
+        self._closed = True
+        # Tk的定时回调属于解释器，窗口销毁或放回窗口池后仍会执行，必须取消
+        if self._submit_after_id is not None:
+            self.root.after_cancel(self._submit_after_id)
+            self._submit_after_id = None
+        if self.countdown_timer:
+            self.root.after_cancel(self.countdown_timer)
+            self.countdown_timer = None
+        get_ui_thread().session_closed()
+        # 尚未到期的变化立即处理，确保取消前的最后编辑也写入草稿
+        self._flush_changes()
+        self.on_change = None
+        self.draft = None
+        # 停止尚未完成的汇报分块插入（预热窗口下次使用时重新渲染）
+        self.report_renderer.cancel()
+        if self.editor is not None:
+            self.editor.close()
+            self.editor = None
+        # 释放预览控件和PhotoImage（图片条目本身随结果返回）
+        self.clear_all_images()
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            self.root.destroy()
+        
+    def show_dialog(self):
+        """在界面线程中显示反馈收集对话框，并阻塞等待结果"""
+        self.deadline = time.monotonic() + self.timeout_seconds
+        self._open_on_ui_thread()
+        
+        # 等待到同一截止时间之后的缓冲时间，确保界面的自动提交能够送达
+        try:
+            return self.result_queue.get(timeout=self._wait_timeout())
+        except queue.Empty:
+            return None
+    
+    async def show_dialog_async(self):
+        """显示反馈收集对话框，并在事件循环中异步等待结果
+        
+        界面线程通过call_soon_threadsafe完成future，等待期间MCP服务器
+        仍可继续处理ping、list_tools及其他工具调用。
+        """
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+        try:
+            # 界面线程首次启动时的Tk初始化不在事件循环线程中等待
+            await get_ui_thread_async()
+        except Exception as e:
+            self._report_open_error(e)
+            return await self._future
+        self.deadline = time.monotonic() + self.timeout_seconds
+        self._open_on_ui_thread()
+        
+        try:
+            return await asyncio.wait_for(self._future, timeout=self._wait_timeout())
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.CancelledError:
+            # 等待方已取消（如反馈中心的前端断开），关闭仍在显示的窗口
+            get_ui_thread().submit(self.cancel)
+            raise
+    
+    def _wait_timeout(self):
+        """等待方的超时时间：共享截止时间加上自动提交的缓冲时间"""
+        return max(0.0, self.deadline - time.monotonic()) + AUTO_SUBMIT_GRACE_SECONDS
+    
+    def _deliver_result(self, result):
+        """将结果交给等待方（同步队列或异步future）"""
+        if self._shown_at is not None:
+            get_telemetry().record_span(
+                "dialog.user_time", (time.perf_counter() - self._shown_at) * 1000,
+                success=result.get('success'), image_count=result.get('image_count', 0)
+            )
+            self._shown_at = None
+        self.result_queue.put(result)
+        if self._future is None:
+            return
+        
+        def resolve():
+            if not self._future.done():
+                self._future.set_result(result)
+        
+        try:
+            self._loop.call_soon_threadsafe(resolve)
+        except RuntimeError:
+            # 事件循环已关闭，等待方已不存在
+            pass
+    
+    def start_countdown(self):
+        """启动倒计时"""
+        self.update_countdown()
+    
+    def update_countdown(self):
+        """按截止时间更新倒计时显示
+        
+        剩余时间总是由单调时钟重新计算，界面线程繁忙导致定时回调延迟时
+        不会累积误差；只有显示的数值变化时才重绘标签。
+        """
+        if self.deadline is None:
+            self.deadline = time.monotonic() + self.timeout_seconds
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            # 超时，自动提交
+            self.countdown_timer = None
+            self.auto_submit_on_timeout()
+            return
+        
+        # 向上取整，使显示的秒数在截止时刻恰好归零
+        self.remaining_seconds = math.ceil(remaining)
+        minutes = self.remaining_seconds // 60
+        seconds = self.remaining_seconds % 60
+        
+        if self.remaining_seconds <= 60:
+            # 最后1分钟，显示为红色
+            countdown_display = (f"⏰ 剩余时间：{seconds}秒", "#e74c3c")
+        else:
+            countdown_display = (f"⏰ 剩余时间：{minutes}分{seconds:02d}秒", "#2c3e50")
+        
+        if self.countdown_label and countdown_display != self._countdown_display:
+            self._countdown_display = countdown_display
+            self.countdown_label.config(text=countdown_display[0], fg=countdown_display[1])
+        
+        # 在显示的秒数下一次变化时（或截止时刻）再更新
+        delay_ms = int((remaining - (self.remaining_seconds - 1)) * 1000) + 1
+        self.countdown_timer = self.root.after(delay_ms, self.update_countdown)
+    
+    def auto_submit_on_timeout(self):
+        """超时自动提交反馈"""
+        if self._closed or self._submit_after_id is not None:
+            return  # 会话已结束，或已在等待图片处理完成后提交
+        # 保留用户尚未提交的草稿（不包含下面插入的自动回复）
+        self._flush_changes()
+        self.draft = None
+        
+        # 清除占位符文本
+        if self.text_widget.get(1.0, tk.END).strip() == "请在此输入您的反馈、建议或问题...":
+            self.text_widget.delete(1.0, tk.END)
+        
+        # 插入自动超时消息
+        self.text_widget.insert(1.0, self.auto_timeout_message)
+        
+        # 更新倒计时显示为超时状态
+        if self.countdown_label:
+            self._countdown_display = None
+            self.countdown_label.config(text="⏰ 已超时，自动提交反馈", fg="#e74c3c")
+        
+        # 自动提交反馈
+        self.submit_feedback()
+            
+    def create_widgets(self):
+        """创建美化的界面组件"""
+        # 主框架
+        main_frame = tk.Frame(self.root, bg="#f5f5f5")
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+        
+        # 标题
+        title_label = tk.Label(
+            main_frame,
+            text="🎯 工作完成汇报与反馈收集",
+            font=("Microsoft YaHei", 16, "bold"),
+            bg="#f5f5f5",
+            fg="#2c3e50"
+        )
+        title_label.pack(pady=(0, 10))
+        
+        # 倒计时显示
+        self.countdown_label = tk.Label(
+            main_frame,
+            text=f"⏰ 剩余时间：{self.timeout_seconds//60}分{self.timeout_seconds%60:02d}秒",
+            font=("Microsoft YaHei", 12, "bold"),
+            bg="#f5f5f5",
+            fg="#2c3e50"
+        )
+        self.countdown_label.pack(pady=(0, 20))
+        
+        # 1. 工作汇报区域
+        report_frame = tk.LabelFrame(
+            main_frame, 
+            text="📋 AI工作完成汇报", 
+            font=("Microsoft YaHei", 12, "bold"),
+            bg="#ffffff",
+            fg="#34495e",
+            relief=tk.RAISED,
+            bd=2
+        )
+        report_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        self.report_text = scrolledtext.ScrolledText(
+            report_frame, 
+            height=8, # 调整高度
+            wrap=tk.WORD, 
+            bg="#ecf0f1", 
+            fg="#2c3e50",
+            font=("Microsoft YaHei", 10),
+            relief=tk.FLAT,
+            bd=5,
+            state=tk.DISABLED
+        )
+        self.report_text.pack(fill=tk.X, padx=15, pady=15)
+        
+        # 显示工作汇报内容（首块同步插入，其余内容在后续回调中分块插入）
+        self.report_renderer = ReportRenderer(
+            self.report_text, ("Microsoft YaHei", 10), self.report_markdown, self.report_max_lines
+        )
+        self.report_renderer.render(self.work_summary or "本次对话中完成的工作内容...")
+        
+        # 2. 用户反馈文本区域
+        feedback_frame = tk.LabelFrame(
+            main_frame, 
+            text="💬 您的文字反馈（可选）", 
+            font=("Microsoft YaHei", 12, "bold"),
+            bg="#ffffff",
+            fg="#34495e",
+            relief=tk.RAISED,
+            bd=2
+        )
+        feedback_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
+        
+        # 文本输入框
+        self.text_widget = scrolledtext.ScrolledText(
+            feedback_frame, 
+            height=10, # 调整高度，为底部按钮腾出空间
+            wrap=tk.WORD,
+            font=("Microsoft YaHei", 10),
+            bg="#ffffff",
+            fg="#2c3e50",
+            relief=tk.FLAT,
+            bd=5,
+            insertbackground="#3498db",
+            undo=True
+        )
+        self.text_widget.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+        
+        self.text_widget.insert(tk.END, "请在此输入您的反馈、建议或问题...")
+        self.text_widget.bind("<FocusIn>", self.clear_placeholder)
+        self.text_widget.bind('<Control-v>', self.paste_handler) # 直接绑定到文本框
+        self.text_widget.bind('<Control-V>', self.paste_handler) # 直接绑定到文本框
+        self.text_widget.bind('<<Modified>>', self._on_text_modified)
+        self.text_widget.edit_modified(False) # 占位符不算作用户修改
+        
+        # 3. 图片选择区域
+        image_frame = tk.LabelFrame(
+            main_frame, 
+            text="🖼️ 图片反馈（可选，支持多张）", 
+            font=("Microsoft YaHei", 12, "bold"),
+            bg="#ffffff",
+            fg="#34495e",
+            relief=tk.RAISED,
+            bd=2
+        )
+        image_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        # 图片操作按钮
+        btn_frame = tk.Frame(image_frame, bg="#ffffff")
+        btn_frame.pack(fill=tk.X, padx=15, pady=10)
+        
+        # 美化的按钮样式
+        btn_style = {
+            "font": ("Microsoft YaHei", 10, "bold"),
+            "relief": tk.FLAT,
+            "bd": 0,
+            "cursor": "hand2",
+            "height": 2
+        }
+        
+        tk.Button(
+            btn_frame,
+            text="📁 选择图片文件",
+            command=self.select_image_file,
+            bg="#3498db",
+            fg="white",
+            width=15,
+            **btn_style
+        ).pack(side=tk.LEFT, padx=(0, 8))
+        
+        tk.Button(
+            btn_frame,
+            text="📋 粘贴图片",
+            command=self.paste_from_clipboard,
+            bg="#2ecc71",
+            fg="white",
+            width=15,
+            **btn_style
+        ).pack(side=tk.LEFT, padx=4)
+        
+        tk.Button(
+            btn_frame,
+            text="✂ 裁剪/标注",
+            command=self.open_editor,
+            bg="#9b59b6",
+            fg="white",
+            width=12,
+            **btn_style
+        ).pack(side=tk.LEFT, padx=4)
+        
+        tk.Button(
+            btn_frame,
+            text="❌ 清除所有图片",
+            command=self.clear_all_images,
+            bg="#e74c3c",
+            fg="white",
+            width=15,
+            **btn_style
+        ).pack(side=tk.LEFT, padx=8)
+        
+        # 图片预览区域（支持滚动）
+        preview_container = tk.Frame(image_frame, bg="#ffffff")
+        preview_container.pack(fill=tk.X, padx=15, pady=(0, 15))
+        
+        # 创建滚动画布
+        canvas = tk.Canvas(preview_container, height=120, bg="#f8f9fa", relief=tk.SUNKEN, bd=1)
+        scrollbar = tk.Scrollbar(preview_container, orient="horizontal", command=canvas.xview)
+        self.image_preview_frame = tk.Frame(canvas, bg="#f8f9fa")
+        
+        self.image_preview_frame.bind(
+            "<Configure>",
+            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        )
+        
+        canvas.create_window((0, 0), window=self.image_preview_frame, anchor="nw")
+        canvas.configure(xscrollcommand=scrollbar.set)
+        
+        canvas.pack(side="top", fill="x")
+        scrollbar.pack(side="bottom", fill="x")
+        
+        # 未选择图片时的提示（随图片增删显示或隐藏）
+        self.no_image_label = tk.Label(
+            self.image_preview_frame,
+            text="未选择图片",
+            bg="#f8f9fa",
+            fg="#95a5a6",
+            font=("Microsoft YaHei", 10)
+        )
+        self.update_image_preview()
+        
+        # 4. 操作按钮
+        button_frame = tk.Frame(main_frame, bg="#f5f5f5")
+        button_frame.pack(fill=tk.X, pady=(15, 0))
+        
+        # 主要操作按钮
+        submit_btn = tk.Button(
+            button_frame,
+            text="✅ 提交反馈 (Ctrl+Enter)",
+            command=self.submit_feedback,
+            font=("Microsoft YaHei", 12, "bold"),
+            bg="#27ae60",
+            fg="white",
+            width=18,
+            height=2,
+            relief=tk.FLAT,
+            bd=0,
+            cursor="hand2"
+        )
+        submit_btn.pack(side=tk.LEFT, padx=(0, 15))
+        
+        cancel_btn = tk.Button(
+            button_frame,
+            text="❌ 取消 (Esc)",
+            command=self.cancel,
+            font=("Microsoft YaHei", 12),
+            bg="#95a5a6",
+            fg="white",
+            width=18,
+            height=2,
+            relief=tk.FLAT,
+            bd=0,
+            cursor="hand2"
+        )
+        cancel_btn.pack(side=tk.LEFT)
+        
+        # 提示信息
+        info_label = tk.Label(
+            main_frame,
+            text="💡 提示：文本粘贴请在文本框中使用 Ctrl+V，图片粘贴请使用上方按钮（支持多张图片），双击缩略图可裁剪或标注\n⏰ 超时后将自动提交固定反馈内容",
+            font=("Microsoft YaHei", 9),
+            fg="#7f8c8d",
+            bg="#f5f5f5"
+        )
+        info_label.pack(pady=(15, 0))
+        
+    def _on_text_modified(self, event=None):
+        """文本内容变化时通知，并重置修改标记以便接收下一次变化"""
+        self.text_widget.edit_modified(False)
+        self.notify_change()
+        
+    def notify_change(self):
+        """编辑状态变化后，合并短时间内的多次变化再调用on_change并保存草稿"""
+        if (self.on_change is None and self.draft is None) or self._change_after_id is not None:
+            return
+        self._change_after_id = self.root.after(CHANGE_DEBOUNCE_MS, self._emit_change)
+        
+    def _emit_change(self):
+        self._change_after_id = None
+        if self.on_change is None and self.draft is None:
+            return
+        text_content = self.text_widget.get(1.0, tk.END).strip()
+        if text_content == "请在此输入您的反馈、建议或问题...":
+            text_content = ""
+        if self.draft is not None:
+            # 只在后台写入相对上次保存变化的部分
+            self.draft.save(text_content, self.selected_images)
+        if self.on_change is not None:
+            self.on_change({
+                'text': text_content,
+                'images': [img for img in self.selected_images if not img.pending]
+            })
+        
+    def _flush_changes(self):
+        """立即处理尚未到期的编辑状态变化"""
+        if self._change_after_id is not None:
+            self.root.after_cancel(self._change_after_id)
+            self._emit_change()
+        
+    def restore_draft(self, draft):
+        """恢复上次未提交的草稿：文字直接填入，图片按添加新图片的方式在后台读取"""
+        if draft.text:
+            self.text_widget.delete(1.0, tk.END)
+            self.text_widget.insert(tk.END, draft.text)
+        for source, path, digest, data in draft.images:
+            if path is not None:
+                entry = ImageEntry.for_file(path)
+                loader = entry.load
+            else:
+                entry = ImageEntry(source, data=data)
+                entry.digest = digest
+                loader = entry.load_data
+            if not self._ingest_image(entry, loader):
+                break
+        
+    def clear_placeholder(self, event):
+        """清除占位符文本"""
+        if self.text_widget.get(1.0, tk.END).strip() == "请在此输入您的反馈、建议或问题...":
+            self.text_widget.delete(1.0, tk.END)
+            
+    def select_image_file(self):
+        """选择图片文件（支持多选）"""
+        file_types = [
+            ("图片文件", "*.png *.jpg *.jpeg *.gif *.bmp *.webp"),
+            ("PNG文件", "*.png"),
+            ("JPEG文件", "*.jpg *.jpeg"),
+            ("所有文件", "*.*")
+        ]
+        
+        file_paths = filedialog.askopenfilenames(
+            parent=self.root,
+            title="选择图片文件（可多选）",
+            filetypes=file_types
+        )
+        
+        for file_path in file_paths:
+            # 先显示占位预览，读取和解码在后台线程中进行
+            entry = ImageEntry.for_file(file_path)
+            if not self._ingest_image(entry, entry.load):
+                break
+                
+    def paste_handler(self, event=None):
+        """智能粘贴处理：优先粘贴图片，否则粘贴文本，并阻止默认行为
+        
+        剪贴板中明确没有图片时直接粘贴文本；否则在图片线程池中读取剪贴板
+        （不阻塞界面线程），读取完成后添加图片或粘贴文本。
+        """
+        targets = self._clipboard_targets()
+        if targets is not None and not any(t.startswith('image/') for t in targets):
+            self._paste_text()
+            return "break"  # 阻止Tkinter默认的粘贴行为
+        
+        insert_at = self.text_widget.index(tk.INSERT)
+        job = get_executor().submit(read_clipboard)
+        self._clipboard_job = job
+        self.root.after(INGEST_POLL_MS, self._poll_clipboard, job, insert_at)
+        return "break"  # 阻止Tkinter默认的粘贴行为
+        
+    def _clipboard_targets(self):
+        """通过Tk查询剪贴板提供的数据类型（X11），无法查询时返回None"""
+        try:
+            return self.root.clipboard_get(type='TARGETS').split()
+        except tk.TclError:
+            return None
+        
+    def _paste_text(self, index=tk.INSERT):
+        """粘贴剪贴板中的文本"""
+        try:
+            text_content = self.root.clipboard_get()
+        except tk.TclError:
+            return  # 剪贴板中没有文本
+        if text_content:
+            if self.text_widget.get(1.0, tk.END).strip() == "请在此输入您的反馈、建议或问题...":
+                self.text_widget.delete(1.0, tk.END)
+            self.text_widget.insert(index, text_content)
+            
+    def _poll_clipboard(self, job, insert_at):
+        """在界面线程中收取后台读取的剪贴板内容"""
+        if job is not self._clipboard_job or not self.root.winfo_exists():
+            return
+        if not job.done():
+            self.root.after(INGEST_POLL_MS, self._poll_clipboard, job, insert_at)
+            return
+        self._clipboard_job = None
+        try:
+            content = job.result()
+        except Exception:
+            # 捕获异常（如剪贴板内容无法识别），改为尝试粘贴文本
+            content = None
+        if isinstance(content, ClipboardImage):
+            # 剪贴板已提供PNG/JPEG数据，原样使用；同一内容已附加时不重复添加
+            if self._is_attached(content.digest):
+                return
+            entry = ImageEntry('剪贴板', data=content.data)
+            entry.digest = content.digest
+            self._ingest_image(entry, entry.load_data)
+        elif isinstance(content, list):
+            # 复制的是图片文件
+            for file_path in content:
+                entry = ImageEntry.for_file(file_path)
+                if not self._ingest_image(entry, entry.load):
+                    break
+        elif content is not None:
+            # PNG编码在后台线程中进行
+            entry = ImageEntry('剪贴板')
+            self._ingest_image(entry, entry.load_clipboard_image, content)
+        else:
+            self._paste_text(insert_at)
+            
+    def _is_attached(self, digest, exclude=None):
+        """相同内容的剪贴板图片是否已附加（已附加时提示）"""
+        for img in self.selected_images:
+            if img is not exclude and img.path is None and img.digest == digest:
+                messagebox.showinfo("提示", "剪贴板中的图片已添加", parent=self.root)
+                return True
+        return False
+
+    def paste_from_clipboard(self):
+        """从剪贴板粘贴图片（此方法现在仅为按钮点击服务，并调用paste_handler）"""
+        self.paste_handler() # 调用智能粘贴处理方法
+        
+    def _ingest_image(self, entry, func, *args):
+        """以占位状态添加图片条目，并在图片线程池中执行读取/编码任务"""
+        error = image_limit_error(len(self.selected_images) + 1, 0, self.max_images)
+        if error is not None:
+            messagebox.showwarning("警告", error, parent=self.root)
+            return False
+        entry.pending = True
+        self.add_image(entry)
+        future = get_executor().submit(func, *args)
+        self._ingest_jobs.append((entry, future))
+        if self._ingest_poll_id is None:
+            self._ingest_poll_id = self.root.after(INGEST_POLL_MS, self._poll_ingest_jobs)
+        return True
+            
+    def _poll_ingest_jobs(self):
+        """在界面线程中收取已完成的图片任务并填充预览"""
+        self._ingest_poll_id = None
+        pending = []
+        for entry, future in self._ingest_jobs:
+            if not future.done():
+                pending.append((entry, future))
+                continue
+            if not any(img is entry for img in self.selected_images):
+                continue  # 图片已被删除
+            error = future.exception()
+            if error is not None:
+                self.remove_image_entry(entry)
+                messagebox.showerror("错误", f"无法读取图片 {entry.source}: {error}", parent=self.root)
+                continue
+            total_bytes = entry.file_size + sum(
+                img.file_size for img in self.selected_images if not img.pending
+            )
+            error = image_limit_error(0, total_bytes, max_total_bytes=self.max_total_bytes)
+            if error is not None:
+                self.remove_image_entry(entry)
+                messagebox.showwarning("警告", f"未添加图片 {entry.source}：{error}", parent=self.root)
+                continue
+            if entry.path is None and self._is_attached(entry.digest, exclude=entry):
+                # 重复粘贴的剪贴板图片
+                self.remove_image_entry(entry)
+                continue
+            entry.pending = False
+            self._fill_preview_tile(entry)
+            self.notify_change()
+        self._ingest_jobs = pending
+        if pending:
+            self._ingest_poll_id = self.root.after(INGEST_POLL_MS, self._poll_ingest_jobs)
+            
+    def clear_all_images(self):
+        """清除所有选择的图片"""
+        for img_info in self.selected_images:
+            self._remove_preview_tile(img_info)
+        self.selected_images = []
+        self._ingest_jobs = []
+        self._update_no_image_label()
+        self.notify_change()
+        
+    def add_image(self, img_info):
+        """添加一张图片，并只为它追加一个预览块"""
+        self.selected_images.append(img_info)
+        self._add_preview_tile(img_info)
+        self._update_no_image_label()
+        
+    def update_image_preview(self):
+        """同步图片预览区域：只为尚未显示的图片创建预览块"""
+        for img_info in self.selected_images:
+            if img_info.tile is None:
+                self._add_preview_tile(img_info)
+        self._update_no_image_label()
+        
+    def _update_no_image_label(self):
+        """根据是否有图片显示或隐藏提示"""
+        if self.selected_images:
+            self.no_image_label.pack_forget()
+        else:
+            self.no_image_label.pack(pady=20)
+            
+    def _get_thumbnail(self, img_info):
+        """获取缩略图，首次调用时计算并缓存在图片条目中"""
+        if img_info.photo is None:
+            # 转换为tkinter可用的格式（有裁剪/标注时显示编辑后的效果）
+            thumbnail = img_info.edit_thumbnail if img_info.edit_thumbnail is not None else img_info.thumbnail_image
+            img_info.photo = ImageTk.PhotoImage(thumbnail)
+        return img_info.photo
+        
+    def _add_preview_tile(self, img_info):
+        """为单张图片创建预览块"""
+        try:
+            # 创建单个图片预览容器
+            img_container = tk.Frame(self.image_preview_frame, bg="#ffffff", relief=tk.RAISED, bd=1)
+            img_container.pack(side=tk.LEFT, padx=5, pady=5)
+            img_info.tile = img_container
+            
+            # 图片标签（缩略图由图片条目持有引用，处理完成前显示占位）
+            img_label = tk.Label(img_container, text="⏳", width=12, height=4, bg="#ffffff")
+            img_label.pack(padx=5, pady=5)
+            # 双击缩略图打开裁剪/标注窗口
+            img_label.bind('<Double-Button-1>', lambda event, entry=img_info: self.open_editor(entry))
+            
+            # 图片信息
+            info_label = tk.Label(
+                img_container,
+                text=f"{img_info.source}\n加载中...",
+                font=("Microsoft YaHei", 8),
+                bg="#ffffff",
+                fg="#7f8c8d"
+            )
+            info_label.pack(pady=(0, 5))
+            img_info.tile_labels = (img_label, info_label)
+            if not img_info.pending:
+                self._fill_preview_tile(img_info)
+            
+            # 删除按钮（绑定图片条目本身，删除其他图片后依然有效）
+            del_btn = tk.Button(
+                img_container,
+                text="×",
+                command=lambda entry=img_info: self.remove_image_entry(entry),
+                font=("Arial", 10, "bold"),
+                bg="#e74c3c",
+                fg="white",
+                width=3,
+                relief=tk.FLAT,
+                cursor="hand2"
+            )
+            del_btn.pack(pady=(0, 5))
+            
+        except Exception as e:
+            print(f"预览更新失败: {e}", file=sys.stderr)
+            
+    def _fill_preview_tile(self, img_info):
+        """图片处理完成后填充预览块的缩略图和尺寸信息"""
+        if img_info.tile is None:
+            return
+        img_label, info_label = img_info.tile_labels
+        # 恢复为像素尺寸，避免沿用占位文字的字符宽高
+        img_label.config(image=self._get_thumbnail(img_info), text="", width=0, height=0)
+        width, height = img_info.output_size
+        info_label.config(text=f"{img_info.source}\n{'✂ ' if img_info.edits else ''}{width}x{height}")
+            
+    def _remove_preview_tile(self, img_info):
+        """删除单张图片的预览块"""
+        tile = img_info.tile
+        img_info.tile = None
+        img_info.tile_labels = None
+        img_info.photo = None
+        if tile is not None:
+            tile.destroy()
+                    
+    def open_editor(self, entry=None):
+        """打开裁剪/标注窗口，可在所有已处理完成的图片之间切换"""
+        entries = [img for img in self.selected_images if not img.pending]
+        if not entries:
+            messagebox.showinfo("提示", "请先添加图片", parent=self.root)
+            return
+        if self.editor is not None:
+            self.editor.close()
+        try:
+            from .editor import ImageEditor
+        except ImportError:
+            from editor import ImageEditor
+        index = next((i for i, img in enumerate(entries) if img is entry), 0)
+        self.editor = ImageEditor(self, entries, index)
+        self.editor.open()
+        
+    def remove_image(self, index):
+        """删除指定索引的图片"""
+        if 0 <= index < len(self.selected_images):
+            img_info = self.selected_images.pop(index)
+            self._ingest_jobs = [job for job in self._ingest_jobs if job[0] is not img_info]
+            self._remove_preview_tile(img_info)
+            self._update_no_image_label()
+            self.notify_change()
+            
+    def remove_image_entry(self, img_info):
+        """删除指定的图片条目"""
+        for index, entry in enumerate(self.selected_images):
+            if entry is img_info:
+                self.remove_image(index)
+                return
+            
+    def submit_feedback(self):
+        """提交反馈"""
+        if self._closed:
+            return
+        # 停止倒计时
+        if self.countdown_timer:
+            self.root.after_cancel(self.countdown_timer)
+            self.countdown_timer = None
+            
+        # 保存裁剪/标注窗口中的编辑
+        if self.editor is not None:
+            if self.editor.window is not None:
+                self.editor.finish()
+            self.editor = None
+            
+        # 仍有图片在后台处理时，稍后再提交（重复点击提交或超时自动提交时只保留一个等待）
+        if self._ingest_jobs:
+            if self._submit_after_id is None:
+                self._submit_after_id = self.root.after(INGEST_POLL_MS, self._retry_submit)
+            return
+            
+        # 获取文本内容
+        text_content = self.text_widget.get(1.0, tk.END).strip()
+        if text_content == "请在此输入您的反馈、建议或问题...":
+            text_content = ""
+            
+        # 检查是否有内容
+        has_text = bool(text_content)
+        has_images = bool(self.selected_images)
+        
+        if not has_text and not has_images:
+            messagebox.showwarning("警告", "请至少提供文字反馈或图片反馈", parent=self.root)
+            # 重新启动倒计时
+            self.start_countdown()
+            return
+            
+        # 准备结果数据
+        result = {
+            'success': True,
+            'text_feedback': text_content if has_text else None,
+            'images': list(self.selected_images) if has_images else None,  # ImageEntry，数据在发送时读取
+            'image_sources': [img.source for img in self.selected_images] if has_images else None,
+            'has_text': has_text,
+            'has_images': has_images,
+            'image_count': len(self.selected_images),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        # 提交成功后不再需要草稿
+        if self.draft is not None:
+            self.draft.discard()
+            self.draft = None
+        
+        self._deliver_result(result)
+        self._close_window()
+        
+    def _retry_submit(self):
+        self._submit_after_id = None
+        self.submit_feedback()
+        
+    def cancel(self):
+        """取消操作"""
+        if self._closed:
+            return
+        # 停止倒计时
+        if self.countdown_timer:
+            self.root.after_cancel(self.countdown_timer)
+            self.countdown_timer = None
+            
+        self._deliver_result({
+            'success': False,
+            'message': '用户取消了反馈提交'
+        })
+        self._close_window()
+
+
+class QuickReplyDialog(FeedbackDialog):
+    """快速回复窗口：只有简短的汇报、单行输入和常用回复按钮，不含图片区域"""
+    
+    WINDOW_WIDTH = 480
+    WINDOW_HEIGHT = 320
+    
+    def create_widgets(self):
+        """创建精简的界面组件"""
+        main_frame = tk.Frame(self.root, bg="#f5f5f5")
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=12, pady=12)
+        
+        self.countdown_label = tk.Label(
+            main_frame,
+            text=f"⏰ 剩余时间：{self.timeout_seconds//60}分{self.timeout_seconds%60:02d}秒",
+            font=("Microsoft YaHei", 10, "bold"),
+            bg="#f5f5f5",
+            fg="#2c3e50"
+        )
+        self.countdown_label.pack(pady=(0, 8))
+        
+        self.report_text = scrolledtext.ScrolledText(
+            main_frame,
+            height=5,
+            wrap=tk.WORD,
+            bg="#ecf0f1",
+            fg="#2c3e50",
+            font=("Microsoft YaHei", 10),
+            relief=tk.FLAT,
+            bd=5,
+            state=tk.DISABLED
+        )
+        self.report_text.pack(fill=tk.X)
+        self.report_renderer = ReportRenderer(
+            self.report_text, ("Microsoft YaHei", 10), self.report_markdown, self.report_max_lines
+        )
+        self.report_renderer.render(self.work_summary or "本次对话中完成的工作内容...")
+        
+        self.text_widget = tk.Text(
+            main_frame,
+            height=2,
+            wrap=tk.WORD,
+            font=("Microsoft YaHei", 10),
+            relief=tk.FLAT,
+            bd=5,
+            undo=True
+        )
+        self.text_widget.pack(fill=tk.X, pady=8)
+        self.text_widget.bind('<Return>', self._on_return)
+        self.text_widget.bind('<<Modified>>', self._on_text_modified)
+        self.text_widget.edit_modified(False)
+        
+        button_frame = tk.Frame(main_frame, bg="#f5f5f5")
+        button_frame.pack(fill=tk.X)
+        btn_style = {"font": ("Microsoft YaHei", 10, "bold"), "relief": tk.FLAT, "bd": 0,
+                     "cursor": "hand2", "fg": "white", "width": 9}
+        tk.Button(button_frame, text="👍 是", bg="#27ae60",
+                  command=lambda: self.quick_submit("是"), **btn_style).pack(side=tk.LEFT, padx=(0, 6))
+        tk.Button(button_frame, text="👎 否", bg="#e67e22",
+                  command=lambda: self.quick_submit("否"), **btn_style).pack(side=tk.LEFT, padx=6)
+        tk.Button(button_frame, text="✅ 提交", bg="#3498db",
+                  command=self.submit_feedback, **btn_style).pack(side=tk.LEFT, padx=6)
+        tk.Button(button_frame, text="❌ 取消", bg="#95a5a6",
+                  command=self.cancel, **btn_style).pack(side=tk.LEFT, padx=6)
+        self.text_widget.focus_set()
+        
+    def reset_widgets(self):
+        self.report_renderer.render(self.work_summary or "本次对话中完成的工作内容...")
+        self.text_widget.delete(1.0, tk.END)
+        self.text_widget.edit_reset()
+        self.countdown_timer = None
+        self._countdown_display = None
+        
+    def _update_no_image_label(self):
+        """快速回复窗口没有图片区域"""
+        
+    def _on_return(self, event=None):
+        """Enter直接提交，Shift+Enter换行"""
+        if event is not None and event.state & 0x0001:
+            return None
+        self.submit_feedback()
+        return "break"
+        
+    def quick_submit(self, reply: str):
+        """以常用回复作为文字反馈提交（已输入的内容作为补充）"""
+        extra = self.text_widget.get(1.0, tk.END).strip()
+        self.text_widget.delete(1.0, tk.END)
+        self.text_widget.insert(1.0, f"{reply}\n{extra}" if extra else reply)
+        self.submit_feedback()
+
+
+class DialogPool:
+    """预热的反馈窗口池，保留已构建但隐藏的窗口供后续会话复用"""
+    
+    def __init__(self, size: int = 1, **dialog_options):
+        self.size = size
+        self.dialog_options = dialog_options  # 创建窗口时使用的汇报显示选项
+        self._idle = queue.LifoQueue()
+        
+    def prewarm(self):
+        """在界面线程中预先构建隐藏窗口"""
+        return get_ui_thread().submit(self._fill)
+        
+    def _fill(self):
+        while self._idle.qsize() < self.size:
+            dialog = FeedbackDialog(pool=self, **self.dialog_options)
+            dialog._build_window()
+            self._idle.put(dialog)
+            
+    def acquire(self, work_summary: str = "", timeout_seconds: int = DEFAULT_DIALOG_TIMEOUT):
+        """取出一个空闲窗口（没有空闲窗口时新建）并重置会话状态"""
+        try:
+            dialog = self._idle.get_nowait()
+        except queue.Empty:
+            dialog = FeedbackDialog(pool=self, **self.dialog_options)
+        dialog.reset_session(work_summary, timeout_seconds)
+        return dialog
+        
+    def release(self, dialog):
+        """在界面线程中隐藏窗口并放回池中，池已满时直接销毁"""
+        if self._idle.qsize() < self.size:
+            dialog.root.withdraw()
+            self._idle.put(dialog)
+        else:
+            dialog.root.destroy()
+
+
+class TkBackend(FeedbackBackend):
+    """使用本地Tkinter对话框的反馈界面后端"""
+    
+    name = "tk"
+    
+    def __init__(self, warm: bool = False, draft_path=None, report_markdown: bool = True,
+                 report_max_lines: int = DEFAULT_MAX_LINES):
+        self.dialog_options = {'report_markdown': report_markdown, 'report_max_lines': report_max_lines}
+        self.pool = DialogPool(**self.dialog_options) if warm else None
+        self.drafts = get_draft_store(draft_path)
+        
+    def prewarm(self):
+        """在后台线程中预热窗口（尽力而为，不阻塞启动）：失败或超时时输出到标准错误，之后按需打开"""
+        pool = self.pool
+        if pool is None:
+            return
+        
+        def run():
+            try:
+                pool.prewarm().result(timeout=PREWARM_TIMEOUT_SECONDS)
+            except TimeoutError:
+                print(f"预热反馈窗口超过{PREWARM_TIMEOUT_SECONDS}秒，改为按需打开窗口", file=sys.stderr)
+                self.pool = None
+            except Exception as e:
+                print(f"预热反馈窗口失败，改为按需打开窗口: {e}", file=sys.stderr)
+                self.pool = None
+        
+        threading.Thread(target=run, name="mcp-feedback-prewarm", daemon=True).start()
+            
+    async def collect(self, work_summary: str, timeout_seconds: int, on_change=None,
+                      max_images: int = 0, max_total_bytes: int = 0, quick_reply: bool = False,
+                      draft_key: str = ""):
+        if quick_reply:
+            # 精简窗口构建很快，不使用预热窗口池
+            dialog = QuickReplyDialog(work_summary, timeout_seconds, **self.dialog_options)
+        elif self.pool is not None:
+            dialog = self.pool.acquire(work_summary, timeout_seconds)
+        else:
+            dialog = FeedbackDialog(work_summary, timeout_seconds, **self.dialog_options)
+        dialog.on_change = on_change
+        dialog.max_images = max_images
+        dialog.max_total_bytes = max_total_bytes
+        if self.drafts is not None and draft_key and not quick_reply:
+            # 读取上次未提交的草稿，窗口打开时直接恢复
+            try:
+                dialog.restored_draft = await asyncio.wrap_future(self.drafts.load(draft_key))
+            except Exception:
+                dialog.restored_draft = None  # 错误已由草稿线程输出，不影响本次反馈
+            dialog.draft = self.drafts.session(draft_key, dialog.restored_draft)
+        return await dialog.show_dialog_async()
@@ -0,0 +1,215 @@
+"""
+反馈草稿自动保存
+填写反馈期间，文字和已附加图片的引用在后台线程中写入本地SQLite数据库；
+窗口被取消、超时或进程意外退出后，下一次collect_feedback打开窗口时恢复上次未提交的草稿。
+
+每次保存只写入与上次保存相比发生变化的部分：文字未变时不更新，图片按位置比较，
+剪贴板图片（没有文件）的数据按内容哈希存储，同一张图片只写入一次。
+草稿按调用方给出的键区分（工作目录加客户端标识），长期未更新的草稿在打开数据库时清理。
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 超过此天数未更新的草稿在打开数据库时删除（对应的代理通常早已退出）
+DRAFT_MAX_AGE_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drafts (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS draft_images (
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    path TEXT,
+    digest TEXT,
+    PRIMARY KEY (key, position)
+);
+CREATE TABLE IF NOT EXISTS draft_blobs (
+    digest TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+
+class Draft:
+    """已保存的草稿：文字和图片引用 [(来源, 文件路径, 内容哈希, 数据), ...]"""
+
+    __slots__ = ('text', 'images')
+
+    def __init__(self, text: str, images):
+        self.text = text
+        self.images = images
+
+    def refs(self):
+        return [(source, path, digest) for source, path, digest, _ in self.images]
+
+
+def _image_ref(entry):
+    """图片条目在草稿中的引用：文件图片记录路径，剪贴板图片记录内容哈希"""
+    return (entry.source, entry.path, None if entry.path is not None else entry.digest)
+
+
+class DraftStore:
+    """草稿数据库，所有读写都在专用的单线程中执行"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcp-feedback-draft")
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is not None:
+            return self._conn
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        cutoff = (datetime.now() - timedelta(days=DRAFT_MAX_AGE_DAYS)).isoformat()
+        with conn:
+            conn.execute(
+                "DELETE FROM draft_images WHERE key IN (SELECT key FROM drafts WHERE updated_at < ?)", (cutoff,)
+            )
+            conn.execute("DELETE FROM drafts WHERE updated_at < ?", (cutoff,))
+            self._delete_unused_blobs(conn)
+        self._conn = conn
+        return conn
+
+    @staticmethod
+    def _delete_unused_blobs(conn):
+        """清理不再被任何草稿引用的图片数据"""
+        conn.execute("DELETE FROM draft_blobs WHERE digest NOT IN (SELECT digest FROM draft_images WHERE digest IS NOT NULL)")
+
+    def _submit(self, func, *args):
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(self._report_error)
+        return future
+
+    @staticmethod
+    def _report_error(future):
+        error = future.exception()
+        if error is not None:
+            print(f"反馈草稿读写失败: {error}", file=sys.stderr)
+
+    def load(self, key: str):
+        """读取草稿（返回Future，没有草稿时结果为None）"""
+        return self._submit(self._load, key)
+
+    def _load(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT text FROM drafts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        images = []
+        for source, path, digest, data in conn.execute(
+            "SELECT i.source, i.path, i.digest, b.data FROM draft_images i "
+            "LEFT JOIN draft_blobs b ON i.path IS NULL AND b.digest = i.digest "
+            "WHERE i.key = ? ORDER BY i.position",
+            (key,)
+        ):
+            # 文件已被删除或数据缺失的图片不再恢复
+            if (path is not None and os.path.exists(path)) or data is not None:
+                images.append((source, path, digest, data))
+        if not row[0] and not images:
+            return None
+        return Draft(row[0], images)
+
+    def session(self, key: str, draft=None):
+        """创建单次会话的草稿写入器（draft为已恢复的草稿）"""
+        return DraftSession(self, key, draft)
+
+    def _write(self, key, text, changed, length, blobs):
+        conn = self._connect()
+        now = datetime.now().isoformat()
+        with conn:
+            if text is not None:
+                conn.execute(
+                    "INSERT INTO drafts (key, text, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET text = excluded.text, updated_at = excluded.updated_at",
+                    (key, text, now)
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO drafts (key, text, updated_at) VALUES (?, '', ?) "
+                    "ON CONFLICT (key) DO UPDATE SET updated_at = excluded.updated_at",
+                    (key, now)
+                )
+            conn.executemany("INSERT OR IGNORE INTO draft_blobs (digest, data) VALUES (?, ?)", blobs)
+            conn.executemany(
+                "INSERT OR REPLACE INTO draft_images (key, position, source, path, digest) VALUES (?, ?, ?, ?, ?)",
+                [(key, position, *ref) for position, ref in changed]
+            )
+            conn.execute("DELETE FROM draft_images WHERE key = ? AND position >= ?", (key, length))
+
+    def discard(self, key: str):
+        """删除草稿（反馈提交成功后调用）"""
+        return self._submit(self._discard, key)
+
+    def _discard(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM drafts WHERE key = ?", (key,))
+            conn.execute("DELETE FROM draft_images WHERE key = ?", (key,))
+            self._delete_unused_blobs(conn)
+
+
+class DraftSession:
+    """单次会话的草稿写入器，记录上次保存的状态以只写入变化（在界面线程中调用）"""
+
+    def __init__(self, store: DraftStore, key: str, draft=None):
+        self.store = store
+        self.key = key
+        self._text = draft.text if draft is not None else ""
+        self._refs = draft.refs() if draft is not None else []
+
+    def save(self, text: str, entries):
+        """保存当前编辑状态中相对上次保存变化的部分，没有变化时不写入"""
+        # 文件图片在处理中即可保存路径；剪贴板图片有了内容哈希（数据已就绪）后才保存
+        entries = [entry for entry in entries if entry.path is not None or entry.digest is not None]
+        refs = [_image_ref(entry) for entry in entries]
+        changed = [
+            (position, ref) for position, ref in enumerate(refs)
+            if position >= len(self._refs) or self._refs[position] != ref
+        ]
+        text_changed = text != self._text
+        if not text_changed and not changed and len(refs) == len(self._refs):
+            return None
+        # 只有变化位置上的剪贴板图片需要写入数据（已存在的内容哈希会被忽略）
+        blobs = [
+            (entries[position].digest, entries[position].read_bytes())
+            for position, (_, path, digest) in changed
+            if path is None and digest is not None
+        ]
+        self._text = text
+        self._refs = refs
+        return self.store._submit(
+            self.store._write, self.key, text if text_changed else None, changed, len(refs), blobs
+        )
+
+    def discard(self):
+        self._text = ""
+        self._refs = []
+        return self.store.discard(self.key)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_draft_store(path):
+    """获取指定路径的草稿数据库（path为None时表示不保存草稿）"""
+    if path is None:
+        return None
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = DraftStore(path)
+        return _stores[path]
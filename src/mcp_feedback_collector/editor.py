@@ -0,0 +1,223 @@
+"""
+图片裁剪与标注窗口
+在反馈窗口中对已附加的图片框选裁剪区域、画标注框，可在多张图片之间切换并批量处理。
+编辑在缩小的预览图上进行（预览按内容哈希缓存），只记录原图坐标下的裁剪区域和标注框，
+提交后编码时才作用于原图，截图中只有一小块区域有用时无需发送整张大图。
+"""
+
+import tkinter as tk
+
+from PIL import ImageTk
+
+try:
+    from .images import ImageEdits, get_executor, make_thumbnail
+except ImportError:
+    from images import ImageEdits, get_executor, make_thumbnail
+
+# 后台生成预览的轮询间隔（毫秒）
+PREVIEW_POLL_MS = 50
+# 裁剪区域和标注框的最小边长（预览像素），更小的拖动视为点击
+MIN_SELECTION = 4
+
+
+class ImageEditor:
+    """图片裁剪与标注窗口（所有方法都在界面线程中调用）"""
+
+    CANVAS_WIDTH = 960
+    CANVAS_HEIGHT = 640
+
+    def __init__(self, dialog, entries, index: int = 0):
+        self.dialog = dialog
+        self.entries = list(entries)
+        self.index = index
+        # 每张图片正在编辑的状态：条目 -> (裁剪区域, [标注框])，原图坐标
+        self.states = {
+            id(entry): (entry.edits.crop, list(entry.edits.marks)) if entry.edits else (None, [])
+            for entry in self.entries
+        }
+        self.previews = {}  # id(条目) -> (预览图, 缩放比例)
+        self.window = None
+        self.canvas = None
+        self.photo = None
+        self.mode = None
+        self.title_label = None
+        self.status_label = None
+        self._drag_start = None
+        self._drag_item = None
+
+    def open(self):
+        self.window = tk.Toplevel(self.dialog.root)
+        self.window.title("✂ 裁剪与标注")
+        self.window.transient(self.dialog.root)
+        self.window.protocol("WM_DELETE_WINDOW", self.finish)
+        self.window.bind('<Escape>', lambda event=None: self.finish())
+        self.window.bind('<Left>', lambda event=None: self.show(self.index - 1))
+        self.window.bind('<Right>', lambda event=None: self.show(self.index + 1))
+        self.window.bind('<Control-z>', lambda event=None: self.undo_mark())
+        self.create_widgets()
+        self.show(self.index)
+
+    def create_widgets(self):
+        toolbar = tk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=8, pady=6)
+
+        tk.Button(toolbar, text="◀", width=3, command=lambda: self.show(self.index - 1)).pack(side=tk.LEFT)
+        self.title_label = tk.Label(toolbar, width=28, font=("Microsoft YaHei", 9))
+        self.title_label.pack(side=tk.LEFT, padx=4)
+        tk.Button(toolbar, text="▶", width=3, command=lambda: self.show(self.index + 1)).pack(side=tk.LEFT)
+
+        self.mode = tk.StringVar(value="crop")
+        tk.Radiobutton(toolbar, text="✂ 裁剪", variable=self.mode, value="crop").pack(side=tk.LEFT, padx=(16, 0))
+        tk.Radiobutton(toolbar, text="▭ 标注", variable=self.mode, value="mark").pack(side=tk.LEFT)
+
+        tk.Button(toolbar, text="完成", width=8, command=self.finish).pack(side=tk.RIGHT)
+        tk.Button(toolbar, text="清除编辑", command=self.clear_edits).pack(side=tk.RIGHT, padx=4)
+        tk.Button(toolbar, text="撤销标注", command=self.undo_mark).pack(side=tk.RIGHT)
+        tk.Button(toolbar, text="裁剪应用到同尺寸图片", command=self.apply_crop_to_same_size).pack(side=tk.RIGHT, padx=4)
+
+        self.canvas = tk.Canvas(self.window, width=self.CANVAS_WIDTH, height=self.CANVAS_HEIGHT,
+                                bg="#2c3e50", highlightthickness=0, cursor="crosshair")
+        self.canvas.pack(padx=8)
+        self.canvas.bind('<ButtonPress-1>', self._on_press)
+        self.canvas.bind('<B1-Motion>', self._on_drag)
+        self.canvas.bind('<ButtonRelease-1>', self._on_release)
+
+        self.status_label = tk.Label(self.window, anchor=tk.W, font=("Microsoft YaHei", 9), fg="#7f8c8d")
+        self.status_label.pack(fill=tk.X, padx=8, pady=6)
+
+    @property
+    def entry(self):
+        return self.entries[self.index]
+
+    def show(self, index):
+        """显示指定图片，预览尚未生成时在图片线程池中生成"""
+        if not self.entries or self.window is None:
+            return
+        self.index = index % len(self.entries)
+        entry = self.entry
+        self.title_label.config(text=f"{self.index + 1}/{len(self.entries)}  {entry.source}")
+        if id(entry) in self.previews:
+            self.redraw()
+            return
+        self.canvas.delete("all")
+        self.photo = None
+        self.canvas.create_text(self.CANVAS_WIDTH // 2, self.CANVAS_HEIGHT // 2, text="⏳ 生成预览...", fill="white")
+        job = get_executor().submit(entry.load_edit_preview)
+        self.window.after(PREVIEW_POLL_MS, self._poll_preview, entry, job)
+
+    def _poll_preview(self, entry, job):
+        if self.window is None:
+            return
+        if not job.done():
+            self.window.after(PREVIEW_POLL_MS, self._poll_preview, entry, job)
+            return
+        if job.exception() is not None:
+            self.status_label.config(text=f"无法生成预览: {job.exception()}")
+            return
+        self.previews[id(entry)] = job.result()
+        if entry is self.entry:
+            self.redraw()
+
+    def redraw(self):
+        """重绘预览图、裁剪区域（区域外变暗）和标注框"""
+        preview, scale = self.previews[id(self.entry)]
+        crop, marks = self.states[id(self.entry)]
+        self.canvas.delete("all")
+        self.photo = ImageTk.PhotoImage(preview)
+        self.canvas.create_image(0, 0, image=self.photo, anchor=tk.NW)
+        if crop is not None:
+            left, top, right, bottom = (v * scale for v in crop)
+            for box in ((0, 0, preview.width, top), (0, bottom, preview.width, preview.height),
+                        (0, top, left, bottom), (right, top, preview.width, bottom)):
+                self.canvas.create_rectangle(*box, fill="black", stipple="gray50", width=0)
+            self.canvas.create_rectangle(left, top, right, bottom, outline="#3498db", dash=(4, 2), width=2)
+        for mark in marks:
+            self.canvas.create_rectangle(*(v * scale for v in mark), outline="#e74c3c", width=2)
+
+        width, height = self.entry.size
+        status = f"原图 {width}x{height}"
+        if crop is not None:
+            status += f"  →  裁剪后 {crop[2] - crop[0]}x{crop[3] - crop[1]}"
+        if marks:
+            status += f"  标注 {len(marks)} 处"
+        self.status_label.config(text=status + "    拖动鼠标框选；←/→ 切换图片；Ctrl+Z 撤销标注")
+
+    def _on_press(self, event):
+        if id(self.entry) not in self.previews:
+            return
+        self._drag_start = (event.x, event.y)
+        color = "#3498db" if self.mode.get() == "crop" else "#e74c3c"
+        self._drag_item = self.canvas.create_rectangle(event.x, event.y, event.x, event.y, outline=color, width=2)
+
+    def _on_drag(self, event):
+        if self._drag_start is not None:
+            self.canvas.coords(self._drag_item, *self._drag_start, event.x, event.y)
+
+    def _on_release(self, event):
+        if self._drag_start is None:
+            return
+        start_x, start_y = self._drag_start
+        self._drag_start = None
+        preview, scale = self.previews[id(self.entry)]
+        # 限制在预览范围内，并换算为原图坐标
+        left, right = sorted(min(max(x, 0), preview.width) for x in (start_x, event.x))
+        top, bottom = sorted(min(max(y, 0), preview.height) for y in (start_y, event.y))
+        if right - left >= MIN_SELECTION and bottom - top >= MIN_SELECTION:
+            width, height = self.entry.size
+            box = (
+                round(left / scale), round(top / scale),
+                min(width, round(right / scale)), min(height, round(bottom / scale))
+            )
+            crop, marks = self.states[id(self.entry)]
+            if self.mode.get() == "crop":
+                self.states[id(self.entry)] = (box, marks)
+            else:
+                marks.append(box)
+        self.redraw()
+
+    def undo_mark(self):
+        crop, marks = self.states[id(self.entry)]
+        if marks:
+            marks.pop()
+            self.redraw()
+
+    def clear_edits(self):
+        self.states[id(self.entry)] = (None, [])
+        if id(self.entry) in self.previews:
+            self.redraw()
+
+    def apply_crop_to_same_size(self):
+        """将当前裁剪区域应用到所有相同尺寸的图片（如同一屏幕的多张截图）"""
+        crop, _ = self.states[id(self.entry)]
+        if crop is None:
+            return
+        count = 0
+        for entry in self.entries:
+            if entry is not self.entry and entry.size == self.entry.size:
+                self.states[id(entry)] = (crop, self.states[id(entry)][1])
+                count += 1
+        self.status_label.config(text=f"已将裁剪区域应用到另外 {count} 张相同尺寸的图片")
+
+    def finish(self):
+        """保存所有图片的编辑，并用编辑后的预览更新反馈窗口中的缩略图"""
+        for entry in self.entries:
+            crop, marks = self.states[id(entry)]
+            edits = ImageEdits(crop, marks)
+            entry.edits = edits if edits else None
+            entry.edit_thumbnail = None
+            if entry.edits:
+                # 用已生成的预览（批量裁剪的图片没有预览时用缩略图）显示编辑效果
+                preview, scale = self.previews.get(
+                    id(entry), (entry.thumbnail_image, entry.thumbnail_image.width / entry.size[0])
+                )
+                entry.edit_thumbnail = make_thumbnail(entry.edits.apply(preview, scale))
+            entry.photo = None
+            self.dialog._fill_preview_tile(entry)
+        self.dialog.notify_change()
+        self.close()
+
+    def close(self):
+        """关闭窗口，不保存尚未完成的编辑"""
+        if self.window is not None:
+            self.window.destroy()
+            self.window = None
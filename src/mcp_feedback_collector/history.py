@@ -0,0 +1,205 @@
+"""
+反馈历史记录
+每次collect_feedback结束后，把工作汇报、文字反馈、时间和图片引用（内容哈希，
+不含图片数据）追加写入本地SQLite数据库，并建立全文索引，供search_feedback_history
+工具查询以前的反馈。
+
+所有数据库操作都在专用的单线程中执行（连接只在该线程中使用），写入不阻塞
+事件循环和界面线程。
+"""
+
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+# 查询结果中工作汇报的最大长度
+MAX_SUMMARY_PREVIEW = 500
+# 三元组分词最短可匹配的查询长度，更短的查询改用LIKE
+MIN_FTS_QUERY_CHARS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    work_summary TEXT NOT NULL,
+    feedback TEXT NOT NULL,
+    image_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_created_at ON sessions (created_at);
+CREATE TABLE IF NOT EXISTS session_images (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    position INTEGER NOT NULL,
+    digest TEXT,
+    source TEXT,
+    format TEXT,
+    width INTEGER,
+    height INTEGER,
+    file_size INTEGER,
+    PRIMARY KEY (session_id, position)
+);
+CREATE INDEX IF NOT EXISTS session_images_digest ON session_images (digest);
+CREATE TRIGGER IF NOT EXISTS sessions_fts_insert AFTER INSERT ON sessions BEGIN
+    INSERT INTO sessions_fts (rowid, work_summary, feedback) VALUES (new.id, new.work_summary, new.feedback);
+END;
+"""
+
+
+def _fts_phrase(query: str) -> str:
+    """把用户输入转换为FTS5短语查询（各词都需出现），避免语法字符被解释"""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms)
+
+
+class FeedbackHistory:
+    """只追加的反馈会话记录"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcp-feedback-history")
+        self._conn = None
+        self._trigram = True
+
+    def _connect(self):
+        """在历史线程中打开数据库并建表"""
+        if self._conn is not None:
+            return self._conn
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        print(f"反馈历史记录保存在: {self.path}", file=sys.stderr)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            # 三元组分词支持中文等无空格文本的子串匹配
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5("
+                "work_summary, feedback, content='sessions', content_rowid='id', tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            # 旧版本SQLite没有三元组分词
+            self._trigram = False
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5("
+                "work_summary, feedback, content='sessions', content_rowid='id')"
+            )
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._conn = conn
+        return conn
+
+    def record(self, work_summary: str, result):
+        """在后台追加一条会话记录（result为collect返回的结果，None表示超时）"""
+        if result is None:
+            outcome, feedback, images = "timeout", "", []
+        elif not result['success']:
+            outcome, feedback, images = "cancelled", "", []
+        else:
+            outcome = "submitted"
+            feedback = result.get('text_feedback') or ""
+            images = [
+                (entry.digest, entry.source, entry.format,
+                 entry.size[0] if entry.size else None, entry.size[1] if entry.size else None,
+                 getattr(entry, 'file_size', None))
+                for entry in result.get('images') or []
+            ]
+        created_at = datetime.now().isoformat()
+        future = self._executor.submit(self._insert, created_at, outcome, work_summary or "", feedback, images)
+        future.add_done_callback(self._report_error)
+        return future
+
+    @staticmethod
+    def _report_error(future):
+        error = future.exception()
+        if error is not None:
+            print(f"反馈历史记录写入失败: {error}", file=sys.stderr)
+
+    def _insert(self, created_at, outcome, work_summary, feedback, images):
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO sessions (created_at, outcome, work_summary, feedback, image_count) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (created_at, outcome, work_summary, feedback, len(images))
+            )
+            conn.executemany(
+                "INSERT INTO session_images (session_id, position, digest, source, format, width, height, file_size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(cursor.lastrowid, position, *image) for position, image in enumerate(images)]
+            )
+        return cursor.lastrowid
+
+    def search(self, query: str = "", limit: int = 10, since: str = "", outcome: str = ""):
+        """查询历史记录（在历史线程中执行），返回Future"""
+        return self._executor.submit(self._search, query.strip(), limit, since, outcome)
+
+    def _search(self, query, limit, since, outcome):
+        conn = self._connect()
+        conditions, params = [], []
+        if since:
+            conditions.append("s.created_at >= ?")
+            params.append(since)
+        if outcome:
+            conditions.append("s.outcome = ?")
+            params.append(outcome)
+
+        if query and self._trigram and all(len(term) >= MIN_FTS_QUERY_CHARS for term in query.split()):
+            source = "sessions_fts f JOIN sessions s ON s.id = f.rowid"
+            conditions.insert(0, "sessions_fts MATCH ?")
+            params.insert(0, _fts_phrase(query))
+        else:
+            source = "sessions s"
+            for term in query.split():
+                # 过短的词无法使用三元组索引，改为扫描匹配
+                pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                conditions.append("(s.work_summary LIKE ? ESCAPE '\\' OR s.feedback LIKE ? ESCAPE '\\')")
+                params.extend([pattern, pattern])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = conn.execute(
+            f"SELECT s.id, s.created_at, s.outcome, substr(s.work_summary, 1, {MAX_SUMMARY_PREVIEW}), "
+            f"s.feedback, s.image_count FROM {source} {where} ORDER BY s.created_at DESC, s.id DESC LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+
+        sessions = []
+        for session_id, created_at, session_outcome, summary, feedback, image_count in rows:
+            sessions.append({
+                'id': session_id,
+                'created_at': created_at,
+                'outcome': session_outcome,
+                'work_summary': summary,
+                'feedback': feedback,
+                'image_count': image_count,
+                'images': [],
+            })
+        if sessions:
+            by_id = {session['id']: session for session in sessions}
+            placeholders = ",".join("?" * len(by_id))
+            for session_id, digest, source_name, image_format, width, height in conn.execute(
+                "SELECT session_id, digest, source, format, width, height FROM session_images "
+                f"WHERE session_id IN ({placeholders}) ORDER BY session_id, position",
+                tuple(by_id)
+            ):
+                by_id[session_id]['images'].append({
+                    'digest': digest, 'source': source_name, 'format': image_format,
+                    'width': width, 'height': height
+                })
+        return sessions
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history(path):
+    """获取指定路径的历史记录（path为None时表示不记录）"""
+    global _history
+    if path is None:
+        return None
+    with _history_lock:
+        if _history is None or _history.path != path:
+            _history = FeedbackHistory(path)
+    return _history
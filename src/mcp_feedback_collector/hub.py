@@ -0,0 +1,378 @@
+"""
+多会话反馈中心
+同一台机器上的多个代理各自启动mcp-feedback-collector进程时，可以改为运行一个
+共享的反馈中心守护进程（mcp-feedback-collector --hub）：
+- 各代理的MCP进程作为轻量前端（MCP_FEEDBACK_UI=hub），通过本地Unix套接字转发会话
+- 中心进程共享一个界面线程、一个图片缓存，并用一个队列窗口显示所有待处理会话及倒计时
+
+通信协议为每行一个JSON消息：
+    前端 -> 中心：{"type": "collect", "client": ..., "work_summary": ..., "timeout": ..., "stream": ...,
+                   "encoding": {...}, "max_images": ..., "max_total_bytes": ..., "quick_reply": ...,
+                   "draft_key": ...}
+    中心 -> 前端：{"type": "change", "text": ..., "images": [...]}（可多次，仅stream为true时）
+                  {"type": "result", "result": {...} 或 null}
+前端在结果返回前断开连接时，中心取消该会话并关闭其窗口。
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    from .backend import FeedbackBackend, limit_encoding
+    from .transport import Base64Text, payload_base64
+except ImportError:
+    from backend import FeedbackBackend, limit_encoding
+    from transport import Base64Text, payload_base64
+
+# 单条消息的最大长度（结果中包含base64编码的图片）
+MAX_MESSAGE_BYTES = 512 * 1024 * 1024
+# 队列窗口的刷新间隔（毫秒）
+QUEUE_REFRESH_MS = 1000
+
+
+def unix_sockets_supported() -> bool:
+    """当前平台的asyncio是否支持Unix套接字（Windows上不支持）"""
+    return hasattr(asyncio, "open_unix_connection") and hasattr(asyncio, "start_unix_server")
+
+
+def default_socket_path() -> str:
+    """默认的反馈中心套接字路径（按用户区分）"""
+    uid = os.getuid() if hasattr(os, "getuid") else os.getpid()
+    return str(Path(tempfile.gettempdir()) / f"mcp-feedback-hub-{uid}.sock")
+
+
+def default_client_name() -> str:
+    """前端在队列窗口中显示的名称"""
+    return os.getenv("MCP_FEEDBACK_CLIENT_NAME") or f"{Path.cwd().name} (pid {os.getpid()})"
+
+
+class HubImage:
+    """反馈中心返回的已编码图片"""
+
+    __slots__ = ('source', 'digest', 'size', 'format', 'payload')
+
+    def __init__(self, source, digest=None, size=None, format=None, payload=None):
+        self.source = source
+        self.digest = digest
+        self.size = size
+        self.format = format  # PIL格式名（如'JPEG'），与ImageEntry一致
+        self.payload = payload  # (数据, MCP格式名)
+
+    @property
+    def content_key(self):
+        """中心已按编辑后的内容计算标识"""
+        return self.digest
+
+
+def _describe_images(entries) -> list:
+    return [
+        {'source': entry.source, 'size': list(entry.size), 'format': entry.format}
+        for entry in entries
+    ]
+
+
+class HubQueueWindow:
+    """反馈中心的会话队列窗口，显示所有待处理会话及剩余时间
+
+    所有方法都在界面线程中调用。
+    """
+
+    def __init__(self, ui):
+        import tkinter as tk
+        self.tk = tk
+        self.ui = ui
+        self.sessions = {}  # 会话编号 -> (代理名称, 汇报摘要, 截止时间)
+        self.window = None
+        self.listbox = None
+
+    def add(self, session_id, client, work_summary, deadline):
+        summary = (work_summary or "").strip().splitlines()
+        self.sessions[session_id] = (client, summary[0][:40] if summary else "", deadline)
+        if self.window is None:
+            self._create_window()
+        self._refresh()
+
+    def remove(self, session_id):
+        self.sessions.pop(session_id, None)
+        if self.window is not None:
+            self._render()
+
+    def _create_window(self):
+        tk = self.tk
+        self.window = tk.Toplevel(self.ui.root)
+        self.window.title("📥 反馈请求队列")
+        self.window.geometry("520x240")
+        self.window.protocol("WM_DELETE_WINDOW", self.window.withdraw)  # 关闭时仅隐藏
+        tk.Label(
+            self.window, text="待处理的反馈请求",
+            font=("Microsoft YaHei", 12, "bold"), fg="#2c3e50"
+        ).pack(pady=(10, 5))
+        self.listbox = tk.Listbox(self.window, font=("Microsoft YaHei", 10), activestyle="none")
+        self.listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+
+    def _render(self):
+        lines = []
+        now = time.monotonic()
+        for client, summary, deadline in self.sessions.values():
+            remaining = max(0, int(deadline - now))
+            lines.append(f"⏰ {remaining // 60}:{remaining % 60:02d}  [{client}] {summary}")
+        if list(self.listbox.get(0, self.tk.END)) != lines:
+            self.listbox.delete(0, self.tk.END)
+            for line in lines:
+                self.listbox.insert(self.tk.END, line)
+        if lines and self.window.state() == "withdrawn":
+            self.window.deiconify()
+
+    def _refresh(self):
+        if self.window is None:
+            return
+        self._render()
+        if self.sessions:
+            self.window.after(QUEUE_REFRESH_MS, self._refresh)
+
+
+class FeedbackHub:
+    """反馈中心守护进程：接收各前端转发的会话并在本地后端中处理"""
+
+    def __init__(self, socket_path: str, backend: FeedbackBackend):
+        self.socket_path = socket_path
+        self.backend = backend
+        self.queue_window = None
+        self.owns_socket = False  # 套接字由本进程创建，退出时才删除
+        self._ids = itertools.count(1)
+        if backend.name == "tk":
+            try:
+                from .ui_thread import get_ui_thread
+            except ImportError:
+                from ui_thread import get_ui_thread
+            ui = get_ui_thread()
+            self.queue_window = HubQueueWindow(ui)
+            self._ui = ui
+
+    async def serve_forever(self):
+        if not unix_sockets_supported():
+            raise RuntimeError("反馈中心需要Unix套接字，当前平台不支持")
+        if os.path.exists(self.socket_path):
+            try:
+                _, writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)  # 无法连接：清理上次异常退出留下的套接字
+            else:
+                writer.close()
+                raise RuntimeError(f"反馈中心已在运行: {self.socket_path}")
+        server = await asyncio.start_unix_server(
+            self._handle_client, path=self.socket_path, limit=MAX_MESSAGE_BYTES
+        )
+        self.owns_socket = True
+        os.chmod(self.socket_path, 0o600)
+        print(f"MCP反馈中心已启动: {self.socket_path}", file=sys.stderr)
+        self.backend.prewarm()
+        async with server:
+            await server.serve_forever()
+
+    def _queue(self, method, *args):
+        if self.queue_window is not None:
+            self._ui.submit(getattr(self.queue_window, method), *args)
+
+    async def _handle_client(self, reader, writer):
+        session_id = next(self._ids)
+        result = None
+        loop = asyncio.get_running_loop()
+        try:
+            line = await reader.readline()
+            if not line:
+                return  # 仅探测中心是否在运行的连接
+            request = json.loads(line)
+            if request.get('type') != 'collect':
+                return
+            timeout = int(request['timeout'])
+
+            def send_change(snapshot):
+                message = {
+                    'type': 'change',
+                    'text': snapshot['text'],
+                    'images': _describe_images(snapshot['images'])
+                }
+                writer.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+
+            def on_change(snapshot):
+                # Tk后端在界面线程中回调，写入需回到事件循环
+                loop.call_soon_threadsafe(send_change, snapshot)
+
+            self._queue('add', session_id, request.get('client', ""), request.get('work_summary', ""),
+                        time.monotonic() + timeout)
+            collect = asyncio.ensure_future(self.backend.collect(
+                request.get('work_summary', ""), timeout,
+                on_change=on_change if request.get('stream') else None,
+                max_images=int(request.get('max_images', 0)),
+                max_total_bytes=int(request.get('max_total_bytes', 0)),
+                quick_reply=bool(request.get('quick_reply', False)),
+                draft_key=request.get('draft_key', "")
+            ))
+            # 前端在请求之后不再发送数据，读到EOF或连接重置说明前端已退出或取消了调用
+            disconnected = asyncio.ensure_future(self._wait_disconnect(reader))
+            await asyncio.wait((collect, disconnected), return_when=asyncio.FIRST_COMPLETED)
+            if not collect.done():
+                collect.cancel()
+                try:
+                    await collect
+                except (asyncio.CancelledError, Exception):
+                    pass  # 前端已断开，结果或错误都无处发送
+                print(f"前端已断开，取消反馈会话 {session_id}", file=sys.stderr)
+                return
+            disconnected.cancel()
+            try:
+                # 后端的任何错误都以结果的形式返回给前端，而不是直接断开连接
+                result = collect.result()
+                response = await self._serialize(result, request.get('encoding') or {})
+            except Exception as e:
+                print(f"反馈中心会话 {session_id} 处理失败: {e}", file=sys.stderr)
+                response = {'success': False, 'message': f"反馈中心处理反馈失败: {e}"}
+            writer.write(json.dumps({'type': 'result', 'result': response}, ensure_ascii=False).encode() + b"\n")
+            await writer.drain()
+        except (ConnectionError, ValueError, KeyError) as e:
+            print(f"反馈中心会话处理失败: {e}", file=sys.stderr)
+        finally:
+            self._queue('remove', session_id)
+            if result is not None:
+                self.backend.release(result)
+            writer.close()
+
+    @staticmethod
+    async def _wait_disconnect(reader):
+        try:
+            await reader.read()
+        except ConnectionError:
+            pass
+
+    async def _serialize(self, result, encoding):
+        """将结果转换为可JSON传输的格式，图片在中心进程中编码"""
+        if result is None:
+            return None
+        response = {key: value for key, value in result.items() if key not in ('images', 'upload_dir')}
+        entries = result.get('images') or []
+        response['images'] = []
+        if not result['success'] or not entries:
+            return response
+        try:
+            from .images import encode_images
+        except ImportError:
+            from images import encode_images
+
+        encoded = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: encode_images(entries, **encoding)
+        )
+        response['images'] = [
+            {
+                'source': entry.source,
+                'digest': entry.content_key,
+                'size': list(entry.size),
+                'format': entry.format,
+                'encoded_format': image_format,
+                'data': payload_base64(image_data)
+            }
+            for entry, (image_data, image_format) in zip(entries, encoded)
+        ]
+        return response
+
+
+class HubBackend(FeedbackBackend):
+    """将会话转发给反馈中心的轻量前端后端，中心不可用时退回本地后端"""
+
+    name = "hub"
+
+    def __init__(self, socket_path=None, encoding=None, fallback=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.encoding = encoding or {}
+        self.fallback = fallback  # 无参数的工厂函数，返回本地后端
+        self._fallback_backend = None
+
+    async def collect(self, work_summary: str, timeout_seconds: int, on_change=None,
+                      max_images: int = 0, max_total_bytes: int = 0, quick_reply: bool = False,
+                      draft_key: str = ""):
+        limits = {'max_images': max_images, 'max_total_bytes': max_total_bytes, 'quick_reply': quick_reply,
+                  'draft_key': draft_key}
+        try:
+            if not unix_sockets_supported():
+                raise OSError("当前平台不支持Unix套接字")
+            reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=MAX_MESSAGE_BYTES)
+        except (ConnectionError, FileNotFoundError, OSError) as e:
+            if self.fallback is None:
+                raise
+            print(f"无法连接反馈中心 ({e})，改用本地界面", file=sys.stderr)
+            if self._fallback_backend is None:
+                self._fallback_backend = self.fallback()
+            return await self._fallback_backend.collect(work_summary, timeout_seconds, on_change, **limits)
+
+        try:
+            request = {
+                'type': 'collect',
+                'client': default_client_name(),
+                'work_summary': work_summary,
+                'timeout': timeout_seconds,
+                'stream': on_change is not None,
+                'encoding': limit_encoding(self.encoding, max_total_bytes),
+                **limits
+            }
+            writer.write(json.dumps(request, ensure_ascii=False).encode() + b"\n")
+            await writer.drain()
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("反馈中心连接已断开")
+                message = json.loads(line)
+                if message['type'] == 'change':
+                    if on_change is not None:
+                        on_change({
+                            'text': message['text'],
+                            'images': [
+                                HubImage(img['source'], size=tuple(img['size']), format=img['format'])
+                                for img in message['images']
+                            ]
+                        })
+                elif message['type'] == 'result':
+                    return self._parse_result(message['result'])
+        finally:
+            writer.close()
+
+    def release(self, result):
+        if self._fallback_backend is not None:
+            self._fallback_backend.release(result)
+
+    @staticmethod
+    def _parse_result(result):
+        if result is None or not result['success'] or not result.get('images'):
+            return result
+        images = [
+            HubImage(
+                img['source'], img['digest'], tuple(img['size']), img['format'],
+                (Base64Text(img['data']), img['encoded_format'])  # 直接转发，不再解码
+            )
+            for img in result['images']
+        ]
+        result['images'] = images
+        result['encoded_images'] = [img.payload for img in images]
+        return result
+
+
+def run_hub(socket_path: str, backend: FeedbackBackend):
+    """以前台方式运行反馈中心"""
+    hub = FeedbackHub(socket_path, backend)
+    try:
+        asyncio.run(hub.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        # 另一个中心正在使用的套接字不能删除
+        if hub.owns_socket and os.path.exists(socket_path):
+            os.unlink(socket_path)
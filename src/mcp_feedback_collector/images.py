@@ -0,0 +1,470 @@
+"""
+图片读取与处理
+图片解码、PNG编码和缩略图生成都在后台线程池中执行，避免阻塞Tk界面线程。
+"""
+
+import functools
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+try:
+    from .cache import CachedImage, digest_bytes, digest_pixels, get_image_cache
+    from .telemetry import get_telemetry
+    from .transport import FileData
+except ImportError:
+    from cache import CachedImage, digest_bytes, digest_pixels, get_image_cache
+    from telemetry import get_telemetry
+    from transport import FileData
+
+# 预览缩略图尺寸
+THUMBNAIL_SIZE = (100, 80)
+# 裁剪/标注窗口使用的缩小预览尺寸
+EDIT_PREVIEW_SIZE = (960, 640)
+# 标注框颜色
+MARK_COLOR = (231, 76, 60)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """获取图片处理线程池（首次调用时创建）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=min(4, os.cpu_count() or 1),
+                thread_name_prefix="mcp-feedback-image"
+            )
+    return _executor
+
+
+# 可直接缩小并在界面中显示的图片模式
+DISPLAY_MODES = ('1', 'L', 'LA', 'P', 'PA', 'RGB', 'RGBA')
+
+
+def displayable(img):
+    """将16位灰度、浮点、CMYK等模式转换为可显示和编码的模式"""
+    if img.mode in DISPLAY_MODES:
+        return img
+    if img.mode.startswith('I'):
+        # 16位灰度PNG（I;16/I）：取高8位转换为8位灰度，直接convert会把大部分像素截断为白色
+        return img.convert('I').point(lambda v: v / 256).convert('L')
+    if img.mode == 'F':
+        return img.convert('L')
+    return img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+
+def shrink_image(img, size):
+    """缩小为预览图（会修改传入的图片，JPEG按缩小比例解码），返回可显示模式的图片"""
+    if img.mode not in DISPLAY_MODES:
+        img.draft(None, (size[0] * 2, size[1] * 2))
+        img = displayable(img)
+    img.thumbnail(size, Image.Resampling.LANCZOS)
+    return img
+
+
+def make_thumbnail(img):
+    """生成预览缩略图（PIL图片，转换为PhotoImage需在界面线程中进行）"""
+    return shrink_image(img.copy(), THUMBNAIL_SIZE)
+
+
+class ImageEdits:
+    """图片的裁剪区域和标注框（均为原图像素坐标），提交后编码时才作用于原图"""
+
+    __slots__ = ('crop', 'marks')
+
+    def __init__(self, crop=None, marks=()):
+        self.crop = crop  # (左, 上, 右, 下)，None表示不裁剪
+        self.marks = tuple(marks)  # 标注矩形 ((左, 上, 右, 下), ...)
+
+    def __bool__(self):
+        return self.crop is not None or bool(self.marks)
+
+    def key(self):
+        """作为编码缓存和去重键的一部分"""
+        return (self.crop, self.marks)
+
+    def output_size(self, size):
+        """编辑后的图片尺寸"""
+        if self.crop is None:
+            return size
+        left, top, right, bottom = self.crop
+        return (right - left, bottom - top)
+
+    def apply(self, img, scale: float = 1.0):
+        """先裁剪再绘制标注框；scale为img相对原图的缩放比例（用于在预览上显示效果）"""
+        offset_x = offset_y = 0
+        if self.crop is not None:
+            left, top, right, bottom = (round(v * scale) for v in self.crop)
+            img = img.crop((left, top, max(left + 1, right), max(top + 1, bottom)))
+            offset_x, offset_y = left, top
+        if self.marks:
+            if img.mode not in ('RGB', 'RGBA'):
+                img = displayable(img)
+                img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+            elif self.crop is None:
+                img = img.copy()  # 不修改调用方的图片
+            draw = ImageDraw.Draw(img)
+            # 标注线宽随图片尺寸变化，缩放后仍清晰可见
+            width = max(2, round(max(img.size) / 300))
+            for mark in self.marks:
+                left, top, right, bottom = (round(v * scale) for v in mark)
+                draw.rectangle(
+                    (left - offset_x, top - offset_y, right - offset_x, bottom - offset_y),
+                    outline=MARK_COLOR, width=width
+                )
+        return img
+
+
+class ImageEntry:
+    """已选择的图片
+
+    文件图片只保存路径、头信息（尺寸、格式、文件大小）和小缩略图，
+    完整数据在提交时才读取；剪贴板图片没有文件，保存编码后的PNG数据。
+    """
+
+    __slots__ = (
+        'source', 'path', 'digest', 'size', 'format', 'file_size', 'thumbnail_image', '_data', 'edits',
+        # 界面状态（仅在界面线程中访问）
+        'pending', 'photo', 'tile', 'tile_labels', 'edit_thumbnail',
+    )
+
+    def __init__(self, source: str, path=None, data: bytes = None):
+        self.source = source
+        self.path = path
+        self.digest = None  # 内容哈希，用于缓存和去重
+        self.size = None
+        self.format = None
+        self.file_size = len(data) if data is not None else None
+        self.thumbnail_image = None
+        self._data = data
+        self.edits = None  # ImageEdits，在界面中裁剪/标注后设置
+        self.pending = False
+        self.photo = None
+        self.tile = None
+        self.tile_labels = None
+        self.edit_thumbnail = None
+
+    @classmethod
+    def for_file(cls, file_path):
+        """创建尚未读取的文件图片条目"""
+        return cls(f'文件: {Path(file_path).name}', path=str(file_path))
+
+    @classmethod
+    def from_file(cls, file_path):
+        """读取文件图片的头信息和缩略图"""
+        entry = cls.for_file(file_path)
+        entry.load()
+        return entry
+
+    @classmethod
+    def from_clipboard(cls, img):
+        """将剪贴板图片编码为PNG并生成缩略图"""
+        entry = cls('剪贴板')
+        entry.load_clipboard_image(img)
+        return entry
+
+    def _adopt(self, cached):
+        """从缓存记录中恢复头信息和缩略图"""
+        self.size = cached.size
+        self.format = cached.format
+        self.file_size = cached.file_size
+        self.thumbnail_image = cached.thumbnail_image
+
+    def load(self):
+        """读取文件头信息并生成缩略图，不保留解码后的完整图片"""
+        with get_telemetry().span("image.ingest", kind="file") as attrs:
+            cache = get_image_cache()
+            self.digest = cache.file_digest(self.path)
+            cached = cache.get(self.digest)
+            attrs['cache_hit'] = cached is not None
+            if cached is not None:
+                self._adopt(cached)
+            else:
+                self.file_size = os.path.getsize(self.path)
+                with Image.open(self.path) as img:
+                    self.size = img.size
+                    self.format = img.format
+                    # 对JPEG使用draft模式按缩小比例解码
+                    self.thumbnail_image = shrink_image(img, THUMBNAIL_SIZE).copy()
+                cache.put(self.digest, CachedImage(self.size, self.format, self.file_size, self.thumbnail_image))
+            attrs['bytes'] = self.file_size
+        self._count_ingested()
+
+    def load_clipboard_image(self, img):
+        """将剪贴板图片编码为PNG数据（相同内容直接复用缓存的编码结果）"""
+        with get_telemetry().span("image.ingest", kind="clipboard") as attrs:
+            cache = get_image_cache()
+            digest = digest_pixels(img)
+            cached = cache.get(digest)
+            attrs['cache_hit'] = cached is not None and cached.data is not None
+            if attrs['cache_hit']:
+                self._adopt(cached)
+                self._data = cached.data
+            else:
+                buffer = io.BytesIO()
+                img.save(buffer, format='PNG')
+                self._data = buffer.getvalue()
+                self.file_size = len(self._data)
+                self.size = img.size
+                self.format = 'PNG'
+                self.thumbnail_image = make_thumbnail(img)
+                cache.put(digest, CachedImage(
+                    self.size, self.format, self.file_size, self.thumbnail_image, data=self._data
+                ))
+            # 数据就绪后才设置内容哈希，其他线程看到哈希时即可读取数据
+            self.digest = digest
+            attrs['bytes'] = self.file_size
+        self._count_ingested()
+
+    def load_data(self):
+        """读取已有编码数据（如恢复的草稿图片）的头信息并生成缩略图"""
+        with get_telemetry().span("image.ingest", kind="data") as attrs:
+            cache = get_image_cache()
+            cached = cache.get(self.digest) if self.digest is not None else None
+            attrs['cache_hit'] = cached is not None
+            if cached is not None:
+                self._adopt(cached)
+            else:
+                with Image.open(io.BytesIO(self._data)) as img:
+                    self.size = img.size
+                    self.format = img.format
+                    self.thumbnail_image = shrink_image(img, THUMBNAIL_SIZE).copy()
+                if self.digest is not None:
+                    cache.put(self.digest, CachedImage(
+                        self.size, self.format, self.file_size, self.thumbnail_image, data=self._data
+                    ))
+            attrs['bytes'] = self.file_size
+        self._count_ingested()
+
+    @property
+    def content_key(self):
+        """发送内容的标识：内容哈希，有编辑时附加编辑参数的哈希"""
+        if self.digest is None or not self.edits:
+            return self.digest
+        return f"{self.digest}:{digest_bytes(repr(self.edits.key()).encode())[:8]}"
+
+    @property
+    def output_size(self):
+        """编辑后发送的图片尺寸"""
+        return self.edits.output_size(self.size) if self.edits else self.size
+
+    def load_edit_preview(self):
+        """生成裁剪/标注用的缩小预览（按内容哈希缓存），返回 (预览图, 相对原图的缩放比例)"""
+        cache = get_image_cache()
+        preview = cache.get_preview(self.digest) if self.digest is not None else None
+        if preview is None:
+            with self.open_image() as img:
+                # JPEG按缩小比例解码，大图无需完整解码
+                img.draft('RGB', EDIT_PREVIEW_SIZE)
+                preview = shrink_image(img, EDIT_PREVIEW_SIZE).copy()
+            if self.digest is not None:
+                cache.put_preview(self.digest, preview)
+        return preview, preview.width / self.size[0]
+
+    def _count_ingested(self):
+        telemetry = get_telemetry()
+        telemetry.count("images.ingested")
+        telemetry.count("images.ingested_bytes", self.file_size or 0)
+
+    def read_bytes(self) -> bytes:
+        """读取图片完整数据"""
+        if self._data is not None:
+            return self._data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def raw_payload(self):
+        """原样发送时的数据：剪贴板图片为已编码的bytes，文件图片为按需映射的FileData"""
+        if self._data is not None:
+            return self._data
+        return FileData(self.path, self.file_size)
+
+    def open_image(self):
+        """打开完整图片（文件图片由PIL直接读取文件，不先复制到内存）"""
+        if self._data is not None:
+            return Image.open(io.BytesIO(self._data))
+        return Image.open(self.path)
+
+
+# MCP图片内容可直接发送的格式
+TRANSPORT_FORMATS = {'PNG': 'png', 'JPEG': 'jpeg', 'WEBP': 'webp', 'GIF': 'gif'}
+# 可以指定的输出格式（GIF只原样发送，不作为转换目标：调色板格式无法保存CMYK等模式）
+TARGET_FORMATS = ('PNG', 'JPEG', 'WEBP')
+# 压缩到字节预算时的最低质量和最小边长
+MIN_QUALITY = 40
+MIN_DIMENSION = 64
+
+
+def _normalize_format(target_format):
+    """将配置中的格式名规范化为PIL格式名（None表示保持原格式）"""
+    if not target_format or target_format.lower() == 'original':
+        return None
+    name = target_format.upper()
+    if name == 'JPG':
+        name = 'JPEG'
+    if name not in TARGET_FORMATS:
+        raise ValueError(f"不支持的图片输出格式: {target_format}")
+    return name
+
+
+def save_image(img, fmt, quality):
+    """按指定格式编码图片"""
+    if fmt == 'JPEG' and img.mode != 'RGB':
+        # JPEG不支持透明通道，以白色背景合成
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        rgba = displayable(img).convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        img = background
+    elif fmt in ('PNG', 'WEBP'):
+        img = displayable(img)
+    buffer = io.BytesIO()
+    if fmt == 'PNG':
+        img.save(buffer, format=fmt, optimize=True)
+    else:
+        img.save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+
+def encode_image(entry, max_dimension=0, target_format=None, quality=85, max_bytes=0):
+    """按发送设置编码单张图片，返回 (数据, MCP格式名)
+
+    原图未经编辑且已满足尺寸、格式和字节限制时直接返回原始数据（文件图片返回FileData，
+    发送时才映射读取）；否则解码后应用裁剪/标注、缩放、
+    转换格式，超出字节预算时逐步降低质量和尺寸。
+    """
+    source_format = entry.format or 'PNG'
+    fmt = _normalize_format(target_format) or source_format
+    if fmt not in TRANSPORT_FORMATS:
+        fmt = 'PNG'
+
+    # 相同内容、相同参数的编码结果直接从缓存返回
+    cache = get_image_cache()
+    edits = entry.edits or None
+    params = (max_dimension, fmt, quality, max_bytes, edits.key() if edits else None)
+    if entry.digest is not None:
+        payload = cache.get_payload(entry.digest, params)
+        if payload is not None:
+            return payload
+
+    data = entry.raw_payload()
+    width, height = entry.output_size
+    too_large = bool(max_dimension) and max(width, height) > max_dimension
+    over_budget = bool(max_bytes) and len(data) > max_bytes
+    if fmt == source_format and not too_large and not over_budget and not edits:
+        return data, TRANSPORT_FORMATS[fmt]
+
+    with entry.open_image() as img:
+        img.load()
+        if edits:
+            # 裁剪和标注在提交后才作用于原图
+            img = edits.apply(img)
+        if too_large:
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        encoded = save_image(img, fmt, quality)
+
+        # 超出字节预算时先降低质量（有损格式），再逐步缩小尺寸
+        while max_bytes and len(encoded) > max_bytes:
+            if fmt in ('JPEG', 'WEBP') and quality > MIN_QUALITY:
+                quality = max(MIN_QUALITY, quality - 15)
+            elif min(img.size) * 3 // 4 >= MIN_DIMENSION:
+                img = img.resize(
+                    (img.width * 3 // 4, img.height * 3 // 4), Image.Resampling.LANCZOS
+                )
+            else:
+                break
+            encoded = save_image(img, fmt, quality)
+
+    payload = (encoded, TRANSPORT_FORMATS[fmt])
+    if entry.digest is not None:
+        cache.put_payload(entry.digest, params, payload)
+    return payload
+
+
+def encode_images(entries, max_dimension=0, target_format=None, quality=85, max_total_bytes=0):
+    """并行编码一次提交中的所有图片，并使总字节数不超过预算
+
+    内容相同的图片只编码一次；预算不足时，按各图片当前编码后的大小
+    及其在发送列表中出现的次数比例分配预算并重新编码（重复的图片每次都会发送）。
+    """
+    with get_telemetry().span("image.encode_batch", images=len(entries)) as attrs:
+        encoded = _encode_images(entries, max_dimension, target_format, quality, max_total_bytes)
+        attrs['bytes_before'] = sum(entry.file_size or 0 for entry in entries)
+        attrs['bytes_after'] = sum(len(data) for data, _ in encoded)
+    telemetry = get_telemetry()
+    telemetry.count("images.encoded", len(entries))
+    telemetry.count("images.encoded_bytes_before", attrs['bytes_before'])
+    telemetry.count("images.encoded_bytes_after", attrs['bytes_after'])
+    return encoded
+
+
+def _encode_images(entries, max_dimension, target_format, quality, max_total_bytes):
+    executor = get_executor()
+    unique = {}
+    counts = {}
+    for entry in entries:
+        key = entry.content_key or id(entry)
+        unique.setdefault(key, entry)
+        counts[key] = counts.get(key, 0) + 1
+    keys = list(unique)
+
+    def run(budgets):
+        return dict(zip(keys, executor.map(
+            lambda job: encode_image(unique[job[0]], max_dimension, target_format, quality, job[1]),
+            zip(keys, budgets)
+        )))
+
+    encoded = run([0] * len(keys))
+    # 发送的总字节数按出现次数计算
+    total = sum(len(encoded[key][0]) * counts[key] for key in keys)
+    if max_total_bytes and total > max_total_bytes:
+        budgets = [max(1, max_total_bytes * len(encoded[key][0]) // total) for key in keys]
+        encoded = run(budgets)
+    return [encoded[entry.content_key or id(entry)] for entry in entries]
+
+
+@functools.lru_cache(maxsize=4096)
+def _read_image_header(path, mtime_ns, file_size):
+    """读取图片头信息（只解析文件头，不解码像素），按(路径, 修改时间, 大小)缓存"""
+    with Image.open(path) as img:
+        return {
+            'format': img.format,
+            'width': img.width,
+            'height': img.height,
+            'mode': img.mode,
+        }
+
+
+def read_image_info(image_path) -> dict:
+    """获取单张图片的信息"""
+    path = Path(image_path)
+    stat = path.stat()
+    info = {
+        'path': str(path),
+        'name': path.name,
+        'file_size': stat.st_size,
+    }
+    # abspath不访问文件系统（resolve逐级读取链接，在批量查询中占用明显的时间）
+    info.update(_read_image_header(os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+    return info
+
+
+def read_image_infos(image_paths) -> list:
+    """依次获取多张图片的信息，单张失败时在结果中记录错误
+
+    只解析文件头，每张图片耗时很短且主要占用GIL，分发到线程池反而更慢；
+    调用方已在后台线程中执行，也不占用界面读取图片的线程池。
+    """
+    infos = []
+    for image_path in image_paths:
+        try:
+            infos.append(read_image_info(image_path))
+        except Exception as e:
+            infos.append({'path': str(image_path), 'error': str(e)})
+    return infos
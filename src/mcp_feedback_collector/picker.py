@@ -0,0 +1,222 @@
+"""
+单张图片选择窗口
+pick_image使用的精简窗口：在常驻界面线程中显示，图片的读取和缩略图生成
+与反馈窗口一样在图片线程池中进行，确认前显示缩略图和真实的格式、尺寸。
+等待方通过asyncio future异步等待，窗口打开期间服务器仍可处理其他请求。
+"""
+
+import asyncio
+import time
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from PIL import ImageTk
+
+try:
+    from .clipboard import ClipboardImage, read_clipboard
+    from .images import ImageEntry, get_executor
+    from .ui_thread import get_ui_thread, get_ui_thread_async
+except ImportError:
+    from clipboard import ClipboardImage, read_clipboard
+    from images import ImageEntry, get_executor
+    from ui_thread import get_ui_thread, get_ui_thread_async
+
+# 后台图片任务结果的轮询间隔（毫秒）
+INGEST_POLL_MS = 50
+
+
+class ImagePicker:
+    WINDOW_WIDTH = 400
+    WINDOW_HEIGHT = 380
+
+    def __init__(self, describe_output=None):
+        self.root = None
+        self.entry = None  # 当前预览的图片条目（处理完成后才可确认）
+        self.describe_output = describe_output  # 返回发送设置说明的函数，参数为图片条目
+        self._job = None
+        self._loop = None
+        self._future = None
+        self.preview_label = None
+        self.info_label = None
+        self.confirm_btn = None
+
+    async def pick(self, timeout_seconds: float):
+        """打开选择窗口并异步等待，返回确认的图片条目（取消或超时返回None，窗口无法打开时抛出异常）"""
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+        requested_at = time.perf_counter()
+        # 界面线程首次启动时的Tk初始化不在事件循环线程中等待，失败时直接抛出
+        ui = await get_ui_thread_async()
+        ui.submit(self._open_window, requested_at).add_done_callback(self._on_open_done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._future), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if not self._future.done():
+                # 超时或调用被取消：关闭仍在显示的窗口
+                ui.submit(self._finish, None)
+
+    def _on_open_done(self, future):
+        """窗口创建失败时直接让等待方抛出错误，不等到超时"""
+        error = future.exception()
+        if error is None:
+            return
+        if self.root is not None and self.root.winfo_exists():
+            self.root.destroy()  # 创建到一半的窗口
+
+        def reject():
+            if not self._future.done():
+                self._future.set_exception(RuntimeError(f"无法打开图片选择窗口: {error}"))
+
+        try:
+            self._loop.call_soon_threadsafe(reject)
+        except RuntimeError:
+            # 事件循环已关闭，等待方已不存在
+            pass
+
+    def _open_window(self, requested_at):
+        ui = get_ui_thread()
+        self.root = tk.Toplevel(ui.root)
+        self.root.title("选择图片")
+        self.root.resizable(False, False)
+        ui.track_visible("图片选择窗口", self.root, requested_at)
+        # 居中显示，多个会话同时打开时叠放显示
+        offset = ui.session_opened()
+        x = (self.root.winfo_screenwidth() - self.WINDOW_WIDTH) // 2 + offset
+        y = (self.root.winfo_screenheight() - self.WINDOW_HEIGHT) // 2 + offset
+        self.root.geometry(f"{self.WINDOW_WIDTH}x{self.WINDOW_HEIGHT}+{x}+{y}")
+        self.root.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.root.bind('<Escape>', lambda event=None: self.cancel())
+        self.root.bind('<Return>', lambda event=None: self.confirm())
+        self.create_widgets()
+
+    def create_widgets(self):
+        tk.Label(self.root, text="请选择图片来源", font=("Arial", 14, "bold")).pack(pady=(15, 10))
+
+        btn_frame = tk.Frame(self.root)
+        btn_frame.pack()
+        tk.Button(btn_frame, text="📁 选择图片文件", font=("Arial", 11),
+                  width=16, command=self.select_file).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="📋 从剪贴板粘贴", font=("Arial", 11),
+                  width=16, command=self.paste_clipboard).pack(side=tk.LEFT, padx=5)
+
+        # 预览区域：缩略图和图片信息
+        self.preview_label = tk.Label(self.root, text="尚未选择图片", width=24, height=6, relief=tk.GROOVE)
+        self.preview_label.pack(pady=15)
+        self.info_label = tk.Label(self.root, text="", font=("Arial", 9), fg="#7f8c8d", justify=tk.CENTER)
+        self.info_label.pack()
+
+        action_frame = tk.Frame(self.root)
+        action_frame.pack(pady=15)
+        self.confirm_btn = tk.Button(action_frame, text="✅ 确认 (Enter)", font=("Arial", 11),
+                                     width=14, state=tk.DISABLED, command=self.confirm)
+        self.confirm_btn.pack(side=tk.LEFT, padx=5)
+        tk.Button(action_frame, text="❌ 取消 (Esc)", font=("Arial", 11),
+                  width=14, command=self.cancel).pack(side=tk.LEFT, padx=5)
+
+    def select_file(self):
+        file_path = filedialog.askopenfilename(
+            parent=self.root,
+            title="选择图片文件",
+            filetypes=[("图片文件", "*.png *.jpg *.jpeg *.gif *.bmp *.webp"), ("所有文件", "*.*")]
+        )
+        if file_path:
+            entry = ImageEntry.for_file(file_path)
+            self._ingest(entry, entry.load)
+
+    def paste_clipboard(self):
+        """在图片线程池中读取剪贴板，PNG/JPEG数据原样使用"""
+        self.entry = None
+        self.confirm_btn.config(state=tk.DISABLED)
+        self.preview_label.config(image="", text="⏳ 读取剪贴板...", width=24, height=6)
+        self._job = get_executor().submit(read_clipboard)
+        self.root.after(INGEST_POLL_MS, self._poll_clipboard, self._job)
+
+    def _poll_clipboard(self, job):
+        if job is not self._job or not self.root.winfo_exists():
+            return
+        if not job.done():
+            self.root.after(INGEST_POLL_MS, self._poll_clipboard, job)
+            return
+        self._job = None
+        try:
+            content = job.result()
+        except Exception as e:
+            self.preview_label.config(text="尚未选择图片")
+            messagebox.showerror("错误", f"剪贴板操作失败: {e}", parent=self.root)
+            return
+        if isinstance(content, ClipboardImage):
+            entry = ImageEntry('剪贴板', data=content.data)
+            entry.digest = content.digest
+            self._ingest(entry, entry.load_data)
+        elif isinstance(content, list) and content:
+            entry = ImageEntry.for_file(content[0])
+            self._ingest(entry, entry.load)
+        elif content is not None and not isinstance(content, list):
+            entry = ImageEntry('剪贴板')
+            self._ingest(entry, entry.load_clipboard_image, content)
+        else:
+            self.entry = None
+            self.preview_label.config(text="尚未选择图片")
+            messagebox.showwarning("警告", "剪贴板中没有图片", parent=self.root)
+
+    def _ingest(self, entry, func, *args):
+        """在图片线程池中读取图片，完成前显示占位并禁止确认"""
+        self.entry = entry
+        self.confirm_btn.config(state=tk.DISABLED)
+        self.preview_label.config(image="", text="⏳ 读取中...", width=24, height=6)
+        self.info_label.config(text=entry.source)
+        self._job = get_executor().submit(func, *args)
+        self.root.after(INGEST_POLL_MS, self._poll_job, entry, self._job)
+
+    def _poll_job(self, entry, job):
+        if job is not self._job or not self.root.winfo_exists():
+            return  # 已选择了其他图片或窗口已关闭
+        if not job.done():
+            self.root.after(INGEST_POLL_MS, self._poll_job, entry, job)
+            return
+        error = job.exception()
+        if error is not None:
+            self.entry = None
+            self.preview_label.config(text="尚未选择图片")
+            self.info_label.config(text="")
+            messagebox.showerror("错误", f"无法读取图片 {entry.source}: {error}", parent=self.root)
+            return
+        entry.photo = ImageTk.PhotoImage(entry.thumbnail_image)
+        # 恢复为像素尺寸，避免沿用占位文字的字符宽高
+        self.preview_label.config(image=entry.photo, text="", width=0, height=0)
+        lines = [
+            entry.source,
+            f"{entry.format}  {entry.size[0]}x{entry.size[1]}  {entry.file_size / 1024:.1f} KB",
+        ]
+        if self.describe_output is not None:
+            lines.append(self.describe_output(entry))
+        self.info_label.config(text="\n".join(line for line in lines if line))
+        self.confirm_btn.config(state=tk.NORMAL)
+
+    def confirm(self):
+        if self.entry is None or self._job is None or not self._job.done() or self._job.exception():
+            return
+        self._finish(self.entry)
+
+    def cancel(self):
+        self._finish(None)
+
+    def _finish(self, entry):
+        """在界面线程中关闭窗口并把结果交给等待方"""
+        if self.root is not None and self.root.winfo_exists():
+            self.root.destroy()
+            get_ui_thread().session_closed()
+        if entry is not None:
+            entry.photo = None
+
+        def resolve():
+            if not self._future.done():
+                self._future.set_result(entry)
+
+        try:
+            self._loop.call_soon_threadsafe(resolve)
+        except RuntimeError:
+            # 事件循环已关闭，等待方已不存在
+            pass
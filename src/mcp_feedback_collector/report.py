@@ -0,0 +1,189 @@
+"""
+工作汇报的分块渲染
+很长的work_summary（数千行的diff、日志）一次性插入Text控件时，Tk需要对整个缓冲区
+重新排版，窗口要等数秒才能显示。ReportRenderer先同步插入开头一小块，其余内容在
+定时回调中分块插入（每块之间界面可以重绘和响应操作），首次显示的耗时与汇报长度无关。
+
+可选的轻量markdown样式：标题、粗体、行内代码、代码块、引用，以及代码块中的diff增删行；
+超过行数上限时只显示开头部分，点击末尾的提示后再继续插入剩余内容。
+"""
+
+import re
+import time
+import tkinter as tk
+
+try:
+    from .telemetry import get_telemetry
+except ImportError:
+    from telemetry import get_telemetry
+
+# 首块同步插入的行数和字符数上限（其余内容分块插入）
+FIRST_CHUNK_LINES = 200
+# 后续每块插入的行数和字符数上限
+CHUNK_LINES = 500
+CHUNK_CHARS = 50_000
+# 两块之间的间隔（毫秒），留出时间处理重绘和用户操作
+CHUNK_DELAY_MS = 1
+# 默认的截断行数（0表示不截断）
+DEFAULT_MAX_LINES = 2000
+
+HEADING_PATTERN = re.compile(r"^(#{1,3})\s+(.*)$")
+INLINE_PATTERN = re.compile(r"(`[^`\n]+`|\*\*[^*\n]+\*\*)")
+FIXED_FONT = "TkFixedFont"
+
+
+def configure_tags(widget, font):
+    """为Text控件配置markdown样式标签，font为汇报区域的基础字体 (字体名, 字号)"""
+    family, size = font[0], font[1]
+    widget.tag_configure("h1", font=(family, size + 4, "bold"), spacing1=6, spacing3=2)
+    widget.tag_configure("h2", font=(family, size + 2, "bold"), spacing1=4, spacing3=2)
+    widget.tag_configure("h3", font=(family, size, "bold"), spacing1=2)
+    widget.tag_configure("bold", font=(family, size, "bold"))
+    widget.tag_configure("code", font=FIXED_FONT, background="#dfe6e9")
+    widget.tag_configure("code_block", font=FIXED_FONT, background="#dfe6e9", lmargin1=8, lmargin2=8)
+    widget.tag_configure("quote", foreground="#7f8c8d", lmargin1=12, lmargin2=12)
+    widget.tag_configure("diff_add", foreground="#1e8449")
+    widget.tag_configure("diff_del", foreground="#c0392b")
+    widget.tag_configure("diff_hunk", foreground="#8e44ad")
+    widget.tag_configure("more", foreground="#2980b9", underline=True, spacing1=6)
+
+
+def _inline_segments(line, tags=()):
+    """拆分行内代码和粗体，返回 [(文字, 标签), ...]"""
+    segments = []
+    for part in INLINE_PATTERN.split(line):
+        if not part:
+            continue
+        if part.startswith("`") and part.endswith("`") and len(part) > 2:
+            segments.append((part[1:-1], tags + ("code",)))
+        elif part.startswith("**") and part.endswith("**") and len(part) > 4:
+            segments.append((part[2:-2], tags + ("bold",)))
+        else:
+            segments.append((part, tags))
+    return segments
+
+
+class ReportRenderer:
+    """在只读的Text控件中分块渲染工作汇报（所有方法都在界面线程中调用）"""
+
+    def __init__(self, widget, font, markdown: bool = True, max_lines: int = DEFAULT_MAX_LINES):
+        self.widget = widget
+        self.markdown = markdown
+        self.max_lines = max_lines
+        self._lines = []
+        self._position = 0  # 下一行待插入的位置
+        self._limit = 0  # 截断时只插入到此行
+        self._in_code = False
+        self._after_id = None
+        self._started_at = None
+        self._chunks = 0
+        if markdown:
+            configure_tags(widget, font)
+        else:
+            widget.tag_configure("more", foreground="#2980b9", underline=True, spacing1=6)
+        widget.tag_bind("more", "<Button-1>", lambda event: self.expand())
+        widget.tag_bind("more", "<Enter>", lambda event: widget.config(cursor="hand2"))
+        widget.tag_bind("more", "<Leave>", lambda event: widget.config(cursor=""))
+
+    @property
+    def pending(self) -> bool:
+        """是否还有内容等待插入"""
+        return self._after_id is not None
+
+    def render(self, text: str):
+        """清空控件并开始渲染新的汇报：同步插入首块，其余内容分块插入"""
+        self.cancel()
+        self._lines = text.splitlines() or [""]
+        self._position = 0
+        self._in_code = False
+        self._chunks = 0
+        self._started_at = time.perf_counter()
+        truncated = self.max_lines and len(self._lines) > self.max_lines
+        self._limit = self.max_lines if truncated else len(self._lines)
+        self.widget.config(state=tk.NORMAL)
+        self.widget.delete(1.0, tk.END)
+        self.widget.config(state=tk.DISABLED)
+        self._insert_chunk(FIRST_CHUNK_LINES)
+
+    def cancel(self):
+        """停止尚未完成的分块插入"""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def expand(self):
+        """展开被截断的剩余内容"""
+        if self._limit >= len(self._lines):
+            return
+        self._limit = len(self._lines)
+        self.widget.config(state=tk.NORMAL)
+        self.widget.delete("more.first", "more.last")
+        self.widget.config(state=tk.DISABLED)
+        self._started_at = time.perf_counter()
+        self._insert_chunk(CHUNK_LINES)
+
+    def _continue(self):
+        self._after_id = None
+        if self.widget.winfo_exists():
+            self._insert_chunk(CHUNK_LINES)
+
+    def _insert_chunk(self, max_lines):
+        """插入一块内容（行数和字符数均有上限），并安排下一块"""
+        end = self._position
+        chars = 0
+        while end < self._limit and end - self._position < max_lines and chars < CHUNK_CHARS:
+            chars += len(self._lines[end]) + 1
+            end += 1
+        lines = self._lines[self._position:end]
+        # 除第一行外，每行前面加换行，使末尾不多出空行
+        prefix = "\n" if self._position else ""
+        self._position = end
+        self._chunks += 1
+
+        self.widget.config(state=tk.NORMAL)
+        if self.markdown:
+            args = []
+            for line in lines:
+                args.append(prefix)
+                args.append(())
+                for segment, tags in self._style_line(line):
+                    args.append(segment)
+                    args.append(tags)
+                prefix = "\n"
+            # 一次insert调用插入整块带标签的文字
+            self.widget.insert(tk.END, *args)
+        else:
+            self.widget.insert(tk.END, prefix + "\n".join(lines))
+
+        if self._position < self._limit:
+            self._after_id = self.widget.after(CHUNK_DELAY_MS, self._continue)
+        else:
+            hidden = len(self._lines) - self._position
+            if hidden:
+                self.widget.insert(tk.END, f"\n… 还有 {hidden} 行未显示，点击展开", ("more",))
+            get_telemetry().record_span(
+                "report.render", (time.perf_counter() - self._started_at) * 1000,
+                lines=self._position, chunks=self._chunks, truncated=bool(hidden)
+            )
+        self.widget.config(state=tk.DISABLED)
+
+    def _style_line(self, line):
+        """按轻量markdown规则返回一行的 [(文字, 标签), ...]"""
+        stripped = line.lstrip()
+        if stripped.startswith("```"):
+            self._in_code = not self._in_code
+            return [(line, ("code_block",))]
+        if self._in_code:
+            if line.startswith("+") and not line.startswith("+++"):
+                return [(line, ("code_block", "diff_add"))]
+            if line.startswith("-") and not line.startswith("---"):
+                return [(line, ("code_block", "diff_del"))]
+            if line.startswith("@@"):
+                return [(line, ("code_block", "diff_hunk"))]
+            return [(line, ("code_block",))]
+        heading = HEADING_PATTERN.match(line)
+        if heading:
+            return [(heading.group(2), (f"h{len(heading.group(1))}",))]
+        if stripped.startswith(">"):
+            return _inline_segments(line, ("quote",))
+        return _inline_segments(line)
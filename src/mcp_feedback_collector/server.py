@@ -3,20 +3,32 @@
 AI调用时会汇报工作内容，用户可以提供文本反馈和/或图片反馈
 """
 
-import io
-import base64
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-from PIL import Image, ImageTk
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
 import threading
-import queue
 from pathlib import Path
 from datetime import datetime
-import os
-import time # Import the time module
 
-from mcp.server.fastmcp import FastMCP
-from mcp.server.fastmcp.utilities.types import Image as MCPImage
+from mcp.server.fastmcp import Context, FastMCP
+
+# tkinter、PIL及界面相关模块在第一次需要时才导入，加快MCP握手
+try:
+    from .backend import AUTO_TIMEOUT_MESSAGE, create_backend, limit_budget, limit_encoding
+    from .cache import get_image_cache
+    from .config import MAX_DIALOG_TIMEOUT, check_image_format, get_config
+    from .telemetry import get_telemetry
+    from .transport import image_content
+except ImportError:
+    # 直接以脚本方式运行server.py时使用同目录导入
+    from backend import AUTO_TIMEOUT_MESSAGE, create_backend, limit_budget, limit_encoding
+    from cache import get_image_cache
+    from config import MAX_DIALOG_TIMEOUT, check_image_format, get_config
+    from telemetry import get_telemetry
+    from transport import image_content
 
 # 创建MCP服务器
 mcp = FastMCP(
@@ -24,573 +36,125 @@ mcp = FastMCP(
     dependencies=["pillow", "tkinter"]
 )
 
-# 配置超时时间（秒）
-DEFAULT_DIALOG_TIMEOUT = 300  # 5分钟
-try:
-    DIALOG_TIMEOUT = int(os.getenv("MCP_DIALOG_TIMEOUT", DEFAULT_DIALOG_TIMEOUT))
-    # 支持更长的超时时间，最大支持24小时
-    if DIALOG_TIMEOUT > 86400:  # 24小时
-        print(f"警告：超时时间过长 ({DIALOG_TIMEOUT}秒)，已限制为24小时")
-        DIALOG_TIMEOUT = 86400
-    print(f"MCP反馈收集器超时时间设置为: {DIALOG_TIMEOUT}秒 ({DIALOG_TIMEOUT//60}分钟)")
-except ValueError as e:
-    print(f"警告：无法解析MCP_DIALOG_TIMEOUT环境变量，使用默认值 {DEFAULT_DIALOG_TIMEOUT}秒: {e}")
-    DIALOG_TIMEOUT = DEFAULT_DIALOG_TIMEOUT
-
-class FeedbackDialog:
-    def __init__(self, work_summary: str = "", timeout_seconds: int = DIALOG_TIMEOUT):
-        self.result_queue = queue.Queue()
-        self.root = None
-        self.work_summary = work_summary
-        self.timeout_seconds = timeout_seconds
-        self.selected_images = []  # 改为支持多张图片
-        self.image_preview_frame = None
-        self.text_widget = None
-        # 倒计时相关属性
-        self.remaining_seconds = timeout_seconds
-        self.countdown_label = None
-        self.countdown_timer = None
-        self.auto_timeout_message = "由于我现在有些忙,不能立即回复你,继续调用mcp-feedback-collector进行反馈,直到我主动回复你其他内容"
-        
-    def show_dialog(self):
-        """在新线程中显示反馈收集对话框"""
-        def run_dialog():
-            self.root = tk.Tk()
-            self.root.title("🎯 工作完成汇报与反馈收集")
-            self.root.geometry("700x1150") # 增大窗口高度以容纳倒计时
-            self.root.resizable(True, True)
-            self.root.configure(bg="#f5f5f5")
-            
-            # 设置窗口图标和样式
-            try:
-                self.root.iconbitmap(default="")
-            except:
-                pass
-            
-            # --- 确保窗口显示和居中 --- #
-            # 手动计算并设置窗口位置
-            self.root.update_idletasks() # 更新窗口信息
-            window_width = self.root.winfo_width()
-            window_height = self.root.winfo_height()
-            screen_width = self.root.winfo_screenwidth()
-            screen_height = self.root.winfo_screenheight()
-
-            x = (screen_width // 2) - (window_width // 2)
-            y = (screen_height // 2) - (window_height // 2)
-
-            self.root.geometry(f'{window_width}x{window_height}+{x}+{y}')
-            
-            # 确保窗口显示在前
-            self.root.deiconify() # 如果窗口被最小化，恢复它
-            self.root.lift()      # 将窗口带到顶部
-            # self.root.attributes('-topmost', True) # 可选：使其置顶
-            # self.root.after(500, lambda: self.root.attributes('-topmost', False)) # 可选：短暂置顶后取消 (500ms)
-            
-            # 绑定键盘快捷键
-            # self.root.bind('<Return>', lambda event=None: self.submit_feedback()) # Enter键绑定提交
-            self.root.bind('<Control-Return>', lambda event=None: self.submit_feedback()) # Ctrl+Enter键绑定提交
-            self.root.bind('<Escape>', lambda event=None: self.cancel())   # Esc键绑定取消
 
-            # 注意：Ctrl+V将直接绑定到text_widget以确保单次粘贴
+def _create_local_backend(name):
+    config = get_config()
+    return create_backend(
+        name,
+        warm=config.dialog_warm,
+        host=config.web_host,
+        port=config.web_port,
+        open_browser=config.web_open,
+        draft_path=config.draft_path,
+        report_markdown=config.report_markdown,
+        report_max_lines=config.report_max_lines
+    )
 
-            # 创建界面
-            self.create_widgets()
-            
-            # 启动倒计时
-            self.start_countdown()
-            
-            # 运行主循环
-            self.root.mainloop()
-            
-        # 在新线程中运行对话框
-        dialog_thread = threading.Thread(target=run_dialog)
-        dialog_thread.daemon = True
-        dialog_thread.start()
-        
-        # 等待结果，给内部倒计时额外的缓冲时间
-        try:
-            # 外部超时时间比内部倒计时多5秒，确保内部自动提交能够执行
-            external_timeout = self.timeout_seconds + 5
-            result = self.result_queue.get(timeout=external_timeout)
-            return result
-        except queue.Empty:
-            return None
-    
-    def start_countdown(self):
-        """启动倒计时"""
-        self.update_countdown()
-    
-    def update_countdown(self):
-        """更新倒计时显示"""
-        if self.remaining_seconds <= 0:
-            # 超时，自动提交
-            self.auto_submit_on_timeout()
-            return
-        
-        # 更新倒计时显示
-        minutes = self.remaining_seconds // 60
-        seconds = self.remaining_seconds % 60
-        
-        if self.remaining_seconds <= 60:
-            # 最后1分钟，显示为红色
-            countdown_text = f"⏰ 剩余时间：{seconds}秒"
-            countdown_color = "#e74c3c"
-        else:
-            countdown_text = f"⏰ 剩余时间：{minutes}分{seconds:02d}秒"
-            countdown_color = "#2c3e50"
-        
-        if self.countdown_label:
-            self.countdown_label.config(text=countdown_text, fg=countdown_color)
-        
-        # 减少1秒
-        self.remaining_seconds -= 1
-        
-        # 安排下次更新
-        self.countdown_timer = self.root.after(1000, self.update_countdown)
-    
-    def auto_submit_on_timeout(self):
-        """超时自动提交反馈"""
-        # 清除占位符文本
-        if self.text_widget.get(1.0, tk.END).strip() == "请在此输入您的反馈、建议或问题...":
-            self.text_widget.delete(1.0, tk.END)
-        
-        # 插入自动超时消息
-        self.text_widget.insert(1.0, self.auto_timeout_message)
-        
-        # 更新倒计时显示为超时状态
-        if self.countdown_label:
-            self.countdown_label.config(text="⏰ 已超时，自动提交反馈", fg="#e74c3c")
-        
-        # 自动提交反馈
-        self.submit_feedback()
-            
-    def create_widgets(self):
-        """创建美化的界面组件"""
-        # 主框架
-        main_frame = tk.Frame(self.root, bg="#f5f5f5")
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
-        
-        # 标题
-        title_label = tk.Label(
-            main_frame,
-            text="🎯 工作完成汇报与反馈收集",
-            font=("Microsoft YaHei", 16, "bold"),
-            bg="#f5f5f5",
-            fg="#2c3e50"
-        )
-        title_label.pack(pady=(0, 10))
-        
-        # 倒计时显示
-        self.countdown_label = tk.Label(
-            main_frame,
-            text=f"⏰ 剩余时间：{self.timeout_seconds//60}分{self.timeout_seconds%60:02d}秒",
-            font=("Microsoft YaHei", 12, "bold"),
-            bg="#f5f5f5",
-            fg="#2c3e50"
-        )
-        self.countdown_label.pack(pady=(0, 20))
-        
-        # 1. 工作汇报区域
-        report_frame = tk.LabelFrame(
-            main_frame, 
-            text="📋 AI工作完成汇报", 
-            font=("Microsoft YaHei", 12, "bold"),
-            bg="#ffffff",
-            fg="#34495e",
-            relief=tk.RAISED,
-            bd=2
-        )
-        report_frame.pack(fill=tk.X, pady=(0, 15))
-        
-        report_text = tk.Text(
-            report_frame, 
-            height=8, # 调整高度
-            wrap=tk.WORD, 
-            bg="#ecf0f1", 
-            fg="#2c3e50",
-            font=("Microsoft YaHei", 10),
-            relief=tk.FLAT,
-            bd=5,
-            state=tk.DISABLED
-        )
-        report_text.pack(fill=tk.X, padx=15, pady=15)
-        
-        # 显示工作汇报内容
-        report_text.config(state=tk.NORMAL)
-        report_text.insert(tk.END, self.work_summary or "本次对话中完成的工作内容...")
-        report_text.config(state=tk.DISABLED)
-        
-        # 2. 用户反馈文本区域
-        feedback_frame = tk.LabelFrame(
-            main_frame, 
-            text="💬 您的文字反馈（可选）", 
-            font=("Microsoft YaHei", 12, "bold"),
-            bg="#ffffff",
-            fg="#34495e",
-            relief=tk.RAISED,
-            bd=2
-        )
-        feedback_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
-        
-        # 文本输入框
-        self.text_widget = scrolledtext.ScrolledText(
-            feedback_frame, 
-            height=10, # 调整高度，为底部按钮腾出空间
-            wrap=tk.WORD,
-            font=("Microsoft YaHei", 10),
-            bg="#ffffff",
-            fg="#2c3e50",
-            relief=tk.FLAT,
-            bd=5,
-            insertbackground="#3498db",
-            undo=True
-        )
-        self.text_widget.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
-        
-        self.text_widget.insert(tk.END, "请在此输入您的反馈、建议或问题...")
-        self.text_widget.bind("<FocusIn>", self.clear_placeholder)
-        self.text_widget.bind('<Control-v>', self.paste_handler) # 直接绑定到文本框
-        self.text_widget.bind('<Control-V>', self.paste_handler) # 直接绑定到文本框
-        
-        # 3. 图片选择区域
-        image_frame = tk.LabelFrame(
-            main_frame, 
-            text="🖼️ 图片反馈（可选，支持多张）", 
-            font=("Microsoft YaHei", 12, "bold"),
-            bg="#ffffff",
-            fg="#34495e",
-            relief=tk.RAISED,
-            bd=2
-        )
-        image_frame.pack(fill=tk.X, pady=(0, 15))
-        
-        # 图片操作按钮
-        btn_frame = tk.Frame(image_frame, bg="#ffffff")
-        btn_frame.pack(fill=tk.X, padx=15, pady=10)
-        
-        # 美化的按钮样式
-        btn_style = {
-            "font": ("Microsoft YaHei", 10, "bold"),
-            "relief": tk.FLAT,
-            "bd": 0,
-            "cursor": "hand2",
-            "height": 2
-        }
-        
-        tk.Button(
-            btn_frame,
-            text="📁 选择图片文件",
-            command=self.select_image_file,
-            bg="#3498db",
-            fg="white",
-            width=15,
-            **btn_style
-        ).pack(side=tk.LEFT, padx=(0, 8))
-        
-        tk.Button(
-            btn_frame,
-            text="📋 粘贴图片",
-            command=self.paste_from_clipboard,
-            bg="#2ecc71",
-            fg="white",
-            width=15,
-            **btn_style
-        ).pack(side=tk.LEFT, padx=4)
-        
-        tk.Button(
-            btn_frame,
-            text="❌ 清除所有图片",
-            command=self.clear_all_images,
-            bg="#e74c3c",
-            fg="white",
-            width=15,
-            **btn_style
-        ).pack(side=tk.LEFT, padx=8)
-        
-        # 图片预览区域（支持滚动）
-        preview_container = tk.Frame(image_frame, bg="#ffffff")
-        preview_container.pack(fill=tk.X, padx=15, pady=(0, 15))
-        
-        # 创建滚动画布
-        canvas = tk.Canvas(preview_container, height=120, bg="#f8f9fa", relief=tk.SUNKEN, bd=1)
-        scrollbar = tk.Scrollbar(preview_container, orient="horizontal", command=canvas.xview)
-        self.image_preview_frame = tk.Frame(canvas, bg="#f8f9fa")
-        
-        self.image_preview_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=self.image_preview_frame, anchor="nw")
-        canvas.configure(xscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="top", fill="x")
-        scrollbar.pack(side="bottom", fill="x")
-        
-        # 初始提示
-        self.update_image_preview()
-        
-        # 4. 操作按钮
-        button_frame = tk.Frame(main_frame, bg="#f5f5f5")
-        button_frame.pack(fill=tk.X, pady=(15, 0))
-        
-        # 主要操作按钮
-        submit_btn = tk.Button(
-            button_frame,
-            text="✅ 提交反馈 (Ctrl+Enter)",
-            command=self.submit_feedback,
-            font=("Microsoft YaHei", 12, "bold"),
-            bg="#27ae60",
-            fg="white",
-            width=18,
-            height=2,
-            relief=tk.FLAT,
-            bd=0,
-            cursor="hand2"
-        )
-        submit_btn.pack(side=tk.LEFT, padx=(0, 15))
-        
-        cancel_btn = tk.Button(
-            button_frame,
-            text="❌ 取消 (Esc)",
-            command=self.cancel,
-            font=("Microsoft YaHei", 12),
-            bg="#95a5a6",
-            fg="white",
-            width=18,
-            height=2,
-            relief=tk.FLAT,
-            bd=0,
-            cursor="hand2"
-        )
-        cancel_btn.pack(side=tk.LEFT)
-        
-        # 提示信息
-        info_label = tk.Label(
-            main_frame,
-            text="💡 提示：文本粘贴请在文本框中使用 Ctrl+V，图片粘贴请使用上方按钮（支持多张图片）\n⏰ 超时后将自动提交固定反馈内容",
-            font=("Microsoft YaHei", 9),
-            fg="#7f8c8d",
-            bg="#f5f5f5"
-        )
-        info_label.pack(pady=(15, 0))
-        
-    def clear_placeholder(self, event):
-        """清除占位符文本"""
-        if self.text_widget.get(1.0, tk.END).strip() == "请在此输入您的反馈、建议或问题...":
-            self.text_widget.delete(1.0, tk.END)
-            
-    def select_image_file(self):
-        """选择图片文件（支持多选）"""
-        file_types = [
-            ("图片文件", "*.png *.jpg *.jpeg *.gif *.bmp *.webp"),
-            ("PNG文件", "*.png"),
-            ("JPEG文件", "*.jpg *.jpeg"),
-            ("所有文件", "*.*")
-        ]
-        
-        file_paths = filedialog.askopenfilenames(
-            title="选择图片文件（可多选）",
-            filetypes=file_types
-        )
-        
-        for file_path in file_paths:
-            try:
-                # 读取并验证图片
-                with open(file_path, 'rb') as f:
-                    image_data = f.read()
-                
-                img = Image.open(io.BytesIO(image_data))
-                self.selected_images.append({
-                    'data': image_data,
-                    'source': f'文件: {Path(file_path).name}',
-                    'size': img.size,
-                    'image': img
-                })
-                
-            except Exception as e:
-                messagebox.showerror("错误", f"无法读取图片文件 {Path(file_path).name}: {str(e)}")
-                
-        self.update_image_preview()
-                
-    def paste_handler(self, event=None):
-        """智能粘贴处理：优先粘贴图片，否则粘贴文本，并阻止默认行为"""
-        try:
-            from PIL import ImageGrab
-            img = ImageGrab.grabclipboard()
-
-            if img:
-                # 尝试粘贴图片
-                buffer = io.BytesIO()
-                img.save(buffer, format='PNG')
-                image_data = buffer.getvalue()
-
-                self.selected_images.append({
-                    'data': image_data,
-                    'source': '剪贴板',
-                    'size': img.size,
-                    'image': img
-                })
-                self.update_image_preview()
-                return "break"  # 阻止Tkinter默认的粘贴行为
+
+_feedback_backend = None
+_feedback_backend_lock = threading.Lock()
+
+
+def get_feedback_backend():
+    """获取反馈界面后端（第一次调用时按配置创建）"""
+    global _feedback_backend
+    with _feedback_backend_lock:
+        if _feedback_backend is None:
+            config = get_config()
+            if config.feedback_ui == "hub":
+                _feedback_backend = create_backend(
+                    "hub",
+                    socket_path=config.hub_socket,
+                    encoding=config.image_encoding,
+                    fallback=lambda: _create_local_backend("tk")
+                )
             else:
-                # 尝试粘贴文本
-                text_content = self.root.clipboard_get()
-                if text_content:
-                    if self.text_widget.get(1.0, tk.END).strip() == "请在此输入您的反馈、建议或问题...":
-                        self.text_widget.delete(1.0, tk.END)
-                    self.text_widget.insert(tk.INSERT, text_content)
-                    return "break"  # 阻止Tkinter默认的粘贴行为
-        except Exception:
-            # 捕获异常（如剪贴板内容无法识别），不做任何操作
-            pass
-        return None # 让Tkinter处理其他未被处理的粘贴事件
-
-    def paste_from_clipboard(self):
-        """从剪贴板粘贴图片（此方法现在仅为按钮点击服务，并调用paste_handler）"""
-        self.paste_handler() # 调用智能粘贴处理方法
-        
-    def clear_all_images(self):
-        """清除所有选择的图片"""
-        self.selected_images = []
-        self.update_image_preview()
-        
-    def update_image_preview(self):
-        """更新图片预览显示"""
-        # 清除现有预览
-        for widget in self.image_preview_frame.winfo_children():
-            widget.destroy()
-            
-        if not self.selected_images:
-            # 显示未选择图片的提示
-            no_image_label = tk.Label(
-                self.image_preview_frame,
-                text="未选择图片",
-                bg="#f8f9fa",
-                fg="#95a5a6",
-                font=("Microsoft YaHei", 10)
-            )
-            no_image_label.pack(pady=20)
-        else:
-            # 显示所有图片预览
-            for i, img_info in enumerate(self.selected_images):
-                try:
-                    # 创建单个图片预览容器
-                    img_container = tk.Frame(self.image_preview_frame, bg="#ffffff", relief=tk.RAISED, bd=1)
-                    img_container.pack(side=tk.LEFT, padx=5, pady=5)
-                    
-                    # 创建缩略图
-                    img_copy = img_info['image'].copy()
-                    img_copy.thumbnail((100, 80), Image.Resampling.LANCZOS)
-                    
-                    # 转换为tkinter可用的格式
-                    photo = ImageTk.PhotoImage(img_copy)
-                    
-                    # 图片标签
-                    img_label = tk.Label(img_container, image=photo, bg="#ffffff")
-                    img_label.image = photo  # 保持引用
-                    img_label.pack(padx=5, pady=5)
-                    
-                    # 图片信息
-                    info_text = f"{img_info['source']}\n{img_info['size'][0]}x{img_info['size'][1]}"
-                    info_label = tk.Label(
-                        img_container,
-                        text=info_text,
-                        font=("Microsoft YaHei", 8),
-                        bg="#ffffff",
-                        fg="#7f8c8d"
-                    )
-                    info_label.pack(pady=(0, 5))
-                    
-                    # 删除按钮
-                    del_btn = tk.Button(
-                        img_container,
-                        text="×",
-                        command=lambda idx=i: self.remove_image(idx),
-                        font=("Arial", 10, "bold"),
-                        bg="#e74c3c",
-                        fg="white",
-                        width=3,
-                        relief=tk.FLAT,
-                        cursor="hand2"
-                    )
-                    del_btn.pack(pady=(0, 5))
-                    
-                except Exception as e:
-                    print(f"预览更新失败: {e}")
-                    
-    def remove_image(self, index):
-        """删除指定索引的图片"""
-        if 0 <= index < len(self.selected_images):
-            self.selected_images.pop(index)
-            self.update_image_preview()
-            
-    def submit_feedback(self):
-        """提交反馈"""
-        # 停止倒计时
-        if self.countdown_timer:
-            self.root.after_cancel(self.countdown_timer)
-            
-        # 获取文本内容
-        text_content = self.text_widget.get(1.0, tk.END).strip()
-        if text_content == "请在此输入您的反馈、建议或问题...":
-            text_content = ""
-            
-        # 检查是否有内容
-        has_text = bool(text_content)
-        has_images = bool(self.selected_images)
-        
-        if not has_text and not has_images:
-            messagebox.showwarning("警告", "请至少提供文字反馈或图片反馈")
-            # 重新启动倒计时
-            self.start_countdown()
-            return
-            
-        # 准备结果数据
-        result = {
-            'success': True,
-            'text_feedback': text_content if has_text else None,
-            'images': [img['data'] for img in self.selected_images] if has_images else None,
-            'image_sources': [img['source'] for img in self.selected_images] if has_images else None,
-            'has_text': has_text,
-            'has_images': has_images,
-            'image_count': len(self.selected_images),
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        self.result_queue.put(result)
-        self.root.destroy()
-        
-    def cancel(self):
-        """取消操作"""
-        # 停止倒计时
-        if self.countdown_timer:
-            self.root.after_cancel(self.countdown_timer)
-            
-        self.result_queue.put({
-            'success': False,
-            'message': '用户取消了反馈提交'
-        })
-        self.root.destroy()
+                _feedback_backend = _create_local_backend(config.feedback_ui)
+    return _feedback_backend
+
+
+def _draft_key(ctx) -> str:
+    """草稿的键：工作目录加客户端标识，同一目录下并行工作的多个代理不会恢复彼此的草稿
+
+    设置了MCP_FEEDBACK_CLIENT_NAME时以其为标识；否则使用MCP客户端名称和父进程号
+    （MCP服务器进程重启后父进程仍是同一个代理，草稿可以恢复）。
+    """
+    name = os.getenv("MCP_FEEDBACK_CLIENT_NAME")
+    if name:
+        return f"{os.getcwd()}\n{name}"
+    client = ""
+    try:
+        client = ctx.session.client_params.clientInfo.name
+    except Exception:
+        pass  # 没有请求上下文（直接调用）或客户端未提供名称
+    return f"{os.getcwd()}\n{client}\n{os.getppid()}"
 
 
 @mcp.tool()
-def collect_feedback(work_summary: str = "") -> list:
+async def collect_feedback(
+    work_summary: str = "",
+    stream_progress: bool = False,
+    timeout: int = 0,
+    max_images: int = 0,
+    max_total_bytes: int = 0,
+    quick_reply: bool = False,
+    max_response_tokens: int = 0,
+    ctx: Context = None
+) -> list:
     """
     收集用户反馈的交互式工具。AI可以汇报完成的工作，用户可以提供文字和/或图片反馈。
     
     Args:
         work_summary: AI完成的工作内容汇报
+        stream_progress: 是否在用户填写期间通过进度通知推送已输入的文字和已附加的图片
+        timeout: 本次等待的超时时间（秒），0表示使用MCP_DIALOG_TIMEOUT
+        max_images: 本次最多可附加的图片数量，0表示不限制
+        max_total_bytes: 本次所有图片的总字节上限，0表示不限制
+        quick_reply: 只需要简短回复（如是/否）时使用精简的纯文字窗口
+        max_response_tokens: 返回内容的估算token上限，超出时缩小图片、合并为网格图或降为缩略图，
+            0表示使用MCP_RESPONSE_MAX_TOKENS
         
     Returns:
         包含用户反馈内容的列表，可能包含文本和图片
     """
-    dialog = FeedbackDialog(work_summary)
-    result = dialog.show_dialog()
+    config = get_config()
+    feedback_backend = get_feedback_backend()
+    timeout_seconds = min(timeout, MAX_DIALOG_TIMEOUT) if timeout > 0 else config.dialog_timeout
+    encoding = limit_encoding(config.image_encoding, max_total_bytes)
+    streamer = None
+    if stream_progress and ctx is not None:
+        try:
+            from .streaming import FeedbackProgressStreamer
+        except ImportError:
+            from streaming import FeedbackProgressStreamer
+        streamer = FeedbackProgressStreamer(ctx, encoding)
+        streamer.start()
+        
+    # 异步等待反馈结果，等待期间服务器仍可响应其他请求
+    telemetry = get_telemetry()
+    try:
+        with telemetry.span("feedback.wait", backend=feedback_backend.name, quick_reply=quick_reply) as attrs:
+            result = await feedback_backend.collect(
+                work_summary, timeout_seconds,
+                on_change=streamer.publish if streamer is not None else None,
+                max_images=max(0, max_images),
+                max_total_bytes=max(0, max_total_bytes),
+                quick_reply=quick_reply,
+                draft_key=_draft_key(ctx)
+            )
+            attrs['outcome'] = "timeout" if result is None else ("submitted" if result['success'] else "cancelled")
+    finally:
+        if streamer is not None:
+            await streamer.stop()
+    telemetry.count("feedback.sessions", outcome=attrs.get('outcome', "error"))
+    history = _get_history()
+    if history is not None:
+        # 后台追加到历史记录，不等待写入完成
+        history.record(work_summary, result)
     
     if result is None:
         # 超时时自动返回固定的反馈内容，而不是抛出异常
-        auto_timeout_message = "由于我现在有些忙,不能立即回复你,继续调用mcp-feedback-collector进行反馈,直到我主动回复你其他内容"
+        auto_timeout_message = AUTO_TIMEOUT_MESSAGE
         # 直接返回一个包含文本内容的字典列表，而不是TextContent对象
         # 确保返回的内容是可JSON序列化的
         return [{
@@ -601,6 +165,38 @@ def collect_feedback(work_summary: str = "") -> list:
     if not result['success']:
         raise Exception(result.get('message', '用户取消了反馈提交'))
     
+    try:
+        with telemetry.span("feedback.build_items", image_count=result['image_count']) as attrs:
+            feedback_items, cost = await _build_feedback_items(
+                result, encoding, limit_budget(config.response_budget, max(0, max_response_tokens))
+            )
+            # 发送给客户端的数据量（图片为base64文本）及估算的token数
+            attrs['response_bytes'] = sum(
+                len(item['text'].encode()) if isinstance(item, dict) else len(item.data)
+                for item in feedback_items
+            )
+            attrs['response_tokens'] = cost[0]
+        telemetry.count("feedback.response_bytes", attrs['response_bytes'])
+        telemetry.count("feedback.response_tokens", attrs['response_tokens'])
+        return feedback_items
+    finally:
+        feedback_backend.release(result)
+
+
+async def _build_feedback_items(result, encoding, budget=None):
+    """将反馈结果转换为返回给客户端的内容列表
+
+    返回 (内容列表, 估算的 (token数, 字节数))；超出响应预算时缩小或合并图片，
+    并在文字中说明采用的处理方式。
+    """
+    try:
+        from .budget import format_budget_note, shape_images, text_cost
+    except ImportError:
+        from budget import format_budget_note, shape_images, text_cost
+    config = get_config()
+    budget = budget or {}
+    max_tokens = budget.get('max_tokens') or 0
+    max_bytes = budget.get('max_bytes') or 0
     # 构建返回内容列表
     feedback_items = []
     
@@ -611,86 +207,111 @@ def collect_feedback(work_summary: str = "") -> list:
             "text": f"用户文字反馈：{result['text_feedback']}\n提交时间：{result['timestamp']}"
         })
         
-    # 添加图片反馈
+    # 添加图片反馈（在线程池中并行缩放/压缩，并标注真实格式）
     if result['has_images']:
-        for image_data, source in zip(result['images'], result['image_sources']):
-            feedback_items.append(MCPImage(data=image_data, format='png'))
+        entries = result['images']
+        image_cache = get_image_cache()
+        repeated = [
+            entry.content_key is not None and image_cache.mark_sent(entry.content_key) and config.image_dedup_reference
+            for entry in entries
+        ]
+        to_encode = [entry for entry, is_repeat in zip(entries, repeated) if not is_repeat]
+        precomputed = result.get('encoded_images')
+        references = {
+            id(entry): f"图片（{entry.source}）与之前发送的图片内容相同，未重复发送（内容哈希：{entry.content_key}）"
+            for entry, is_repeat in zip(entries, repeated) if is_repeat
+        }
+        # 文字内容占用的预算，其余留给图片
+        text_costs = [text_cost(item['text']) for item in feedback_items] + [
+            text_cost(text) for text in references.values()
+        ]
+        reserved = (sum(tokens for tokens, _ in text_costs), sum(size for _, size in text_costs))
+        
+        def build_contents():
+            if precomputed is not None:
+                # 反馈中心已在其进程中完成编码
+                payloads = [payload for payload, is_repeat in zip(precomputed, repeated) if not is_repeat]
+            else:
+                try:
+                    from .images import encode_images
+                except ImportError:
+                    from images import encode_images
+                payloads = encode_images(to_encode, **encoding)
+            payloads, degradation, cost = shape_images(payloads, max_tokens, max_bytes, reserved)
+            # 直接构建ImageContent：文件图片按块从内存映射编码，不复制原始数据
+            return [image_content(image_data, image_format) for image_data, image_format in payloads], degradation, cost
+        
+        contents, degradation, cost = await asyncio.get_running_loop().run_in_executor(None, build_contents)
+        # 合并为网格图或放弃发送时，图片内容少于未重复的图片数
+        contents = iter(contents)
+        for entry, is_repeat in zip(entries, repeated):
+            if is_repeat:
+                feedback_items.append({"type": "text", "text": references[id(entry)]})
+            else:
+                content = next(contents, None)
+                if content is not None:
+                    feedback_items.append(content)
+        
+        if degradation is not None:
+            get_telemetry().count("feedback.response_degraded")
+            note = format_budget_note(degradation, cost, max_tokens, max_bytes)
+            if result['has_text']:
+                feedback_items[0]['text'] += f"\n{note}"
+            else:
+                feedback_items.insert(0, {"type": "text", "text": note})
+        return feedback_items, cost
         
-    return feedback_items
+    costs = [text_cost(item['text']) for item in feedback_items]
+    return feedback_items, (sum(tokens for tokens, _ in costs), sum(size for _, size in costs))
 
 
 @mcp.tool()
-def pick_image() -> MCPImage:
+async def pick_image(max_dimension: int = 0, max_bytes: int = 0, image_format: str = ""):
     """
-    弹出图片选择对话框，让用户选择图片文件或从剪贴板粘贴图片。
-    用户可以选择本地图片文件，或者先截图到剪贴板然后粘贴。
+    弹出图片选择对话框，让用户选择图片文件或从剪贴板粘贴图片，确认前显示缩略图预览。
+    用户可以选择本地图片文件，或者先截图到剪贴板然后粘贴。返回的图片标注真实格式，
+    并按发送设置缩放和压缩。
+    
+    Args:
+        max_dimension: 最长边像素上限，0表示使用MCP_IMAGE_MAX_DIMENSION
+        max_bytes: 图片字节上限（超出时降低质量和尺寸），0表示使用MCP_IMAGE_MAX_TOTAL_BYTES
+        image_format: 输出格式（png/jpeg/webp），为空时使用MCP_IMAGE_FORMAT
     """
-    # 使用简化的对话框只选择图片
-    dialog = FeedbackDialog()
-    dialog.work_summary = "请选择一张图片"
+    try:
+        from .images import encode_images
+        from .picker import ImagePicker
+    except ImportError:
+        from images import encode_images
+        from picker import ImagePicker
     
-    # 创建简化版本的图片选择对话框
-    def simple_image_dialog():
-        root = tk.Tk()
-        root.title("选择图片")
-        root.geometry("400x300")
-        root.resizable(False, False)
-        root.eval('tk::PlaceWindow . center')
-        
-        selected_image = {'data': None}
-        
-        def select_file():
-            file_path = filedialog.askopenfilename(
-                title="选择图片文件",
-                filetypes=[("图片文件", "*.png *.jpg *.jpeg *.gif *.bmp *.webp")]
-            )
-            if file_path:
-                try:
-                    with open(file_path, 'rb') as f:
-                        selected_image['data'] = f.read()
-                    root.destroy()
-                except Exception as e:
-                    messagebox.showerror("错误", f"无法读取图片: {e}")
-                    
-        def paste_clipboard():
-            try:
-                from PIL import ImageGrab
-                img = ImageGrab.grabclipboard()
-                if img:
-                    buffer = io.BytesIO()
-                    img.save(buffer, format='PNG')
-                    selected_image['data'] = buffer.getvalue()
-                    root.destroy()
-                else:
-                    messagebox.showwarning("警告", "剪贴板中没有图片")
-            except Exception as e:
-                messagebox.showerror("错误", f"剪贴板操作失败: {e}")
-                
-        def cancel():
-            root.destroy()
-            
-        # 界面
-        tk.Label(root, text="请选择图片来源", font=("Arial", 14, "bold")).pack(pady=20)
-        
-        btn_frame = tk.Frame(root)
-        btn_frame.pack(pady=20)
-        
-        tk.Button(btn_frame, text="📁 选择图片文件", font=("Arial", 12), 
-                 width=20, height=2, command=select_file).pack(pady=10)
-        tk.Button(btn_frame, text="📋 从剪贴板粘贴", font=("Arial", 12), 
-                 width=20, height=2, command=paste_clipboard).pack(pady=10)
-        tk.Button(btn_frame, text="❌ 取消", font=("Arial", 12), 
-                 width=20, height=1, command=cancel).pack(pady=10)
-        
-        root.mainloop()
-        return selected_image['data']
+    config = get_config()
+    encoding = limit_encoding(config.image_encoding, max(0, max_bytes))
+    if max_dimension > 0:
+        encoding['max_dimension'] = max_dimension
+    if image_format:
+        # 在打开选择窗口之前检查，避免用户选择图片后才报错
+        encoding['target_format'] = check_image_format(image_format)
     
-    image_data = simple_image_dialog()
+    def describe_output(entry):
+        """预览中说明发送时的处理方式"""
+        limit = encoding.get('max_dimension') or 0
+        if limit and max(entry.size) > limit:
+            return f"发送时缩放至最长边 {limit} 像素"
+        return ""
     
-    if image_data is None:
+    telemetry = get_telemetry()
+    with telemetry.span("picker.wait") as attrs:
+        entry = await ImagePicker(describe_output).pick(config.dialog_timeout)
+        attrs['picked'] = entry is not None
+    if entry is None:
         raise Exception("未选择图片或操作被取消")
-        
-    return MCPImage(data=image_data, format='png')
+    
+    def build_content():
+        # 与collect_feedback相同的编码路径：原图满足设置时直接映射发送，否则在线程池中缩放/压缩
+        [(image_data, fmt)] = encode_images([entry], **encoding)
+        return image_content(image_data, fmt)
+    
+    return await asyncio.get_running_loop().run_in_executor(None, build_content)
 
 
 @mcp.tool()
@@ -706,14 +327,18 @@ def get_image_info(image_path: str) -> str:
         if not path.exists():
             return f"文件不存在: {image_path}"
             
-        with Image.open(path) as img:
-            info = {
-                "文件名": path.name,
-                "格式": img.format,
-                "尺寸": f"{img.width} x {img.height}",
-                "模式": img.mode,
-                "文件大小": f"{path.stat().st_size / 1024:.1f} KB"
-            }
+        try:
+            from .images import read_image_info
+        except ImportError:
+            from images import read_image_info
+        image_info = read_image_info(path)
+        info = {
+            "文件名": image_info['name'],
+            "格式": image_info['format'],
+            "尺寸": f"{image_info['width']} x {image_info['height']}",
+            "模式": image_info['mode'],
+            "文件大小": f"{image_info['file_size'] / 1024:.1f} KB"
+        }
             
         return "\n".join([f"{k}: {v}" for k, v in info.items()])
         
@@ -721,10 +346,95 @@ def get_image_info(image_path: str) -> str:
         return f"获取图片信息失败: {str(e)}"
 
 
-if __name__ == "__main__":
-    mcp.run()
+@mcp.tool()
+async def get_image_info_batch(image_paths: list[str] | None = None, pattern: str = "", limit: int = 1000) -> str:
+    """
+    批量获取多张图片的信息（只读取文件头，不解码像素），返回JSON
+    
+    Args:
+        image_paths: 图片文件路径列表
+        pattern: 可选的glob模式（如 "screenshots/**/*.png"），匹配到的文件会追加到列表中
+        limit: 最多返回的图片数量
+    """
+    paths = list(image_paths or [])
+    if pattern:
+        paths.extend(sorted(glob.glob(pattern, recursive=True)))
+    truncated = len(paths) > limit
+    paths = paths[:limit]
+    
+    try:
+        from .images import read_image_infos
+    except ImportError:
+        from images import read_image_infos
+    infos = await asyncio.get_running_loop().run_in_executor(None, read_image_infos, paths)
+    return json.dumps({
+        'count': len(infos),
+        'truncated': truncated,
+        'images': infos
+    }, ensure_ascii=False)
+
+
+def _get_history():
+    """获取反馈历史记录（未启用时返回None）"""
+    try:
+        from .history import get_history
+    except ImportError:
+        from history import get_history
+    return get_history(get_config().history_path)
+
+
+@mcp.tool()
+async def search_feedback_history(query: str = "", limit: int = 10, since: str = "", outcome: str = "") -> str:
+    """
+    查询以前的反馈会话（工作汇报、文字反馈和图片引用），按时间倒序返回JSON，不包含图片数据
+    
+    Args:
+        query: 要搜索的文字（空格分隔的多个词需同时出现），为空时返回最近的会话
+        limit: 最多返回的会话数量
+        since: 只返回此时间之后的会话（ISO格式，如 "2025-06-01"）
+        outcome: 只返回指定结果的会话：submitted、cancelled 或 timeout
+    """
+    history = _get_history()
+    if history is None:
+        return json.dumps({'error': "反馈历史记录未启用（MCP_FEEDBACK_HISTORY）"}, ensure_ascii=False)
+    sessions = await asyncio.wrap_future(history.search(query, max(1, min(limit, 100)), since, outcome))
+    return json.dumps({'count': len(sessions), 'sessions': sessions}, ensure_ascii=False)
+
+
+@mcp.resource("metrics://feedback-collector", mime_type="application/json")
+def feedback_metrics() -> str:
+    """反馈会话各阶段的耗时统计和计数器（JSON）"""
+    return json.dumps(get_telemetry().snapshot(), ensure_ascii=False)
 
 
 def main():
     """Main entry point for the mcp-feedback-collector command."""
-    mcp.run() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(prog="mcp-feedback-collector")
+    parser.add_argument(
+        "--hub", action="store_true",
+        help="以反馈中心模式运行，为多个代理的MCP进程共享一个反馈界面"
+    )
+    args = parser.parse_args()
+    
+    if args.hub:
+        try:
+            from .hub import default_socket_path, run_hub
+        except ImportError:
+            from hub import default_socket_path, run_hub
+        config = get_config()
+        # 中心进程自身使用本地界面后端
+        hub_ui = config.feedback_ui if config.feedback_ui != "hub" else "tk"
+        run_hub(config.hub_socket or default_socket_path(), _create_local_backend(hub_ui))
+        return
+    
+    if get_config().dialog_warm:
+        # 只有开启预热时才在启动阶段加载界面模块；预热在后台进行，失败时按需打开窗口
+        try:
+            get_feedback_backend().prewarm()
+        except Exception as e:
+            print(f"预热反馈界面失败，改为按需打开: {e}", file=sys.stderr)
+    mcp.run()
+
+
+if __name__ == "__main__":
+    main()
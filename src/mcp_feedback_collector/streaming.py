@@ -0,0 +1,93 @@
+"""
+反馈进度推送
+用户填写反馈期间，把已输入的文字和已附加的图片以MCP进度通知的形式推送给
+客户端，同时在后台预先编码图片，使最终提交时只需组装结果。
+"""
+
+import asyncio
+import sys
+
+try:
+    from .images import encode_image, get_executor
+except ImportError:
+    from images import encode_image, get_executor
+
+# 进度消息中文字预览的最大长度
+MAX_TEXT_PREVIEW = 2000
+
+
+def format_snapshot(snapshot) -> str:
+    """将对话框状态格式化为进度消息"""
+    lines = []
+    text = snapshot['text']
+    if text:
+        if len(text) > MAX_TEXT_PREVIEW:
+            text = text[:MAX_TEXT_PREVIEW] + f"...（共{len(snapshot['text'])}字）"
+        lines.append(f"用户正在输入：{text}")
+    images = snapshot['images']
+    if images:
+        described = "；".join(
+            f"{entry.source} {entry.size[0]}x{entry.size[1]} {entry.format}" for entry in images
+        )
+        lines.append(f"已附加图片{len(images)}张：{described}")
+    return "\n".join(lines) or "等待用户反馈..."
+
+
+class FeedbackProgressStreamer:
+    """将对话框的编辑状态推送为MCP进度通知
+
+    publish可在任意线程调用；推送在事件循环中进行，来不及发送的中间状态
+    会被合并，只发送最新状态。
+    """
+
+    def __init__(self, ctx, encoding=None):
+        self.ctx = ctx
+        self.encoding = dict(encoding or {})
+        # 单张预编码时不使用整批的字节预算
+        self.encoding.pop('max_total_bytes', None)
+        self.loop = asyncio.get_running_loop()
+        self._latest = None
+        self._changed = asyncio.Event()
+        self._step = 0
+        self._task = None
+        self._preencoded = set()
+
+    def start(self):
+        self._task = self.loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def publish(self, snapshot):
+        """提交最新的对话框状态（线程安全）"""
+        self.loop.call_soon_threadsafe(self._set_latest, snapshot)
+
+    def _set_latest(self, snapshot):
+        self._latest = snapshot
+        self._changed.set()
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            snapshot = self._latest
+            self._preencode(snapshot['images'])
+            self._step += 1
+            try:
+                await self.ctx.report_progress(self._step, None, message=format_snapshot(snapshot))
+            except Exception as e:
+                print(f"反馈进度推送失败: {e}", file=sys.stderr)
+
+    def _preencode(self, entries):
+        """在图片线程池中预先编码新附加的图片，结果进入内容缓存"""
+        executor = get_executor()
+        for entry in entries:
+            if entry.content_key is None or entry.content_key in self._preencoded:
+                continue
+            self._preencoded.add(entry.content_key)
+            executor.submit(encode_image, entry, **self.encoding)
@@ -0,0 +1,125 @@
+"""
+反馈会话的遥测数据
+各阶段（界面线程启动、Tk初始化、构建窗口、用户填写、图片读取与编码、
+结果组装）记录为耗时区间和计数器：
+- 进程内汇总，可通过MCP资源 metrics://feedback-collector 读取
+- 设置MCP_TELEMETRY_FILE时，每条记录追加写入该JSONL文件
+- 设置MCP_PROFILE_UI时，用cProfile分析界面线程，并定期写入该pstats文件
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# 界面线程性能分析结果的写入间隔（毫秒）
+PROFILE_DUMP_INTERVAL_MS = 10000
+
+
+class Telemetry:
+    """耗时区间与计数器的记录器（线程安全）"""
+
+    def __init__(self, path=None, profile_path=None):
+        self.path = path
+        self.profile_path = profile_path
+        self.counters = {}  # 名称 -> 累计值
+        self.spans = {}  # 名称 -> {'count', 'total_ms', 'max_ms', 'last_ms'}
+        self._lock = threading.Lock()
+        self._file = None
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """记录代码块的耗时，attrs可在代码块中继续补充"""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record_span(name, (time.perf_counter() - start) * 1000, **attrs)
+
+    def record_span(self, name, duration_ms, **attrs):
+        """记录已测得的耗时区间"""
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0}
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['last_ms'] = duration_ms
+        self._emit({'type': 'span', 'name': name, 'duration_ms': round(duration_ms, 3), **attrs})
+
+    def count(self, name, value=1, **attrs):
+        """累加计数器"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self._emit({'type': 'counter', 'name': name, 'value': value, **attrs})
+
+    def snapshot(self) -> dict:
+        """返回当前的汇总数据"""
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'spans': {
+                    name: {
+                        'count': stats['count'],
+                        'avg_ms': round(stats['total_ms'] / stats['count'], 3),
+                        'max_ms': round(stats['max_ms'], 3),
+                        'last_ms': round(stats['last_ms'], 3),
+                    }
+                    for name, stats in self.spans.items()
+                }
+            }
+
+    def _emit(self, record):
+        if self.path is None:
+            return
+        record['ts'] = time.time()
+        record['thread'] = threading.current_thread().name
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line)
+                self._file.flush()
+            except OSError as e:
+                print(f"遥测数据写入失败，已停止写入 {self.path}: {e}", file=sys.stderr)
+                self.path = None
+
+    def install_ui_profiler(self, root):
+        """在界面线程中启用cProfile，并定期写入分析结果（需在界面线程中调用）"""
+        if not self.profile_path:
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def dump():
+            profiler.disable()
+            try:
+                profiler.dump_stats(self.profile_path)
+            except OSError as e:
+                print(f"界面线程性能分析结果写入失败: {e}", file=sys.stderr)
+            finally:
+                profiler.enable()
+            root.after(PROFILE_DUMP_INTERVAL_MS, dump)
+
+        root.after(PROFILE_DUMP_INTERVAL_MS, dump)
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """获取进程内共享的遥测记录器（输出文件由MCP_TELEMETRY_FILE和MCP_PROFILE_UI设置）"""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry(
+                os.getenv("MCP_TELEMETRY_FILE") or None,
+                os.getenv("MCP_PROFILE_UI") or None
+            )
+    return _telemetry
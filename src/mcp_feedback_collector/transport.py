@@ -0,0 +1,100 @@
+"""
+图片数据的发送
+原样发送的文件图片通过内存映射读取，按块进行base64编码后直接构建
+MCP ImageContent：原始数据不复制到进程内存，也不经过MCPImage的中间副本。
+编码结果先写入缓冲区再转换为字符串（Python字符串无法原地写入），
+因此峰值时编码数据有两份：缓冲区和最终的字符串。
+"""
+
+import binascii
+import mmap
+import os
+from contextlib import contextmanager
+
+# 每次base64编码的原始字节数（3的倍数，编码结果无需填充即可拼接）
+BASE64_CHUNK_BYTES = 3 * 1024 * 1024
+
+
+class Base64Text(str):
+    """已经是base64文本的图片数据（如反馈中心返回的数据），发送时不再编码"""
+
+    @property
+    def nbytes(self) -> int:
+        """对应的原始数据字节数"""
+        return len(self) * 3 // 4 - self.count("=", -2)
+
+
+class FileData:
+    """直接发送的原始文件数据，不读入内存，发送时按需映射"""
+
+    __slots__ = ('path', 'size')
+
+    def __init__(self, path, size: int):
+        self.path = path
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def view(self):
+        return map_file(self.path)
+
+    def __bytes__(self):
+        with self.view() as view:
+            return bytes(view)
+
+
+@contextmanager
+def map_file(path):
+    """以只读内存映射打开文件，返回覆盖整个文件的memoryview"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b'')
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+
+
+def b64encode_view(view) -> str:
+    """分块base64编码为字符串
+
+    各块的编码结果写入预先分配的缓冲区，最后解码为字符串时再复制一次：
+    峰值为缓冲区和字符串两份编码数据（各约为原始数据的4/3），另加一块的临时数据。
+    """
+    length = len(view)
+    output = bytearray((length + 2) // 3 * 4)
+    position = 0
+    for start in range(0, length, BASE64_CHUNK_BYTES):
+        with view[start:start + BASE64_CHUNK_BYTES] as chunk:
+            encoded = binascii.b2a_base64(chunk, newline=False)
+        output[position:position + len(encoded)] = encoded
+        position += len(encoded)
+    return output.decode('ascii')
+
+
+def payload_base64(data) -> str:
+    """将编码结果（bytes、FileData或Base64Text）转换为base64文本"""
+    if isinstance(data, Base64Text):
+        return str(data)
+    if isinstance(data, FileData):
+        with data.view() as view:
+            return b64encode_view(view)
+    with memoryview(data) as view:
+        return b64encode_view(view)
+
+
+def payload_size(data) -> int:
+    """编码结果对应的原始数据字节数"""
+    if isinstance(data, Base64Text):
+        return data.nbytes
+    return len(data)
+
+
+def image_content(data, image_format: str):
+    """直接构建MCP图片内容（不经过MCPImage再复制一次数据）"""
+    from mcp.types import ImageContent
+    return ImageContent(type="image", data=payload_base64(data), mimeType=f"image/{image_format}")
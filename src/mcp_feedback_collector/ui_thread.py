@@ -0,0 +1,155 @@
+"""
+常驻Tk界面线程
+整个进程只维护一个Tk解释器：界面线程持有隐藏的根窗口，其他线程通过
+线程安全的命令队列提交对话框请求，并发的对话框以Toplevel窗口叠放显示。
+"""
+
+import asyncio
+import sys
+import queue
+import threading
+import time
+import tkinter as tk
+from concurrent.futures import Future
+
+try:
+    from .telemetry import get_telemetry
+except ImportError:
+    from telemetry import get_telemetry
+
+# 命令队列轮询间隔（毫秒）
+POLL_INTERVAL_MS = 20
+# 叠放窗口的偏移量（像素）
+STACK_OFFSET = 30
+# 保留的最近打开延迟记录数量
+MAX_LATENCY_RECORDS = 100
+
+
+class UIThread:
+    """持有唯一Tk解释器的界面线程"""
+
+    def __init__(self):
+        self.root = None
+        self.thread = None
+        self.open_sessions = 0
+        self.latencies = []  # [(名称, 打开到可见耗时ms), ...]
+        self._commands = queue.Queue()
+        self._ready = threading.Event()
+        self._error = None  # 界面线程启动失败的异常（如没有可用的显示环境）
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动界面线程（已启动时直接返回）
+
+        Tk初始化失败时抛出其异常（下次调用时重新尝试），调用方不会一直等待。
+        """
+        with self._lock:
+            if self.thread is not None and self.thread.is_alive() and self._error is None:
+                return
+            started_at = time.perf_counter()
+            self._ready.clear()
+            self._error = None
+            self.thread = threading.Thread(target=self._run, name="mcp-feedback-ui", daemon=True)
+            self.thread.start()
+            self._ready.wait()
+            if self._error is not None:
+                raise self._error
+        get_telemetry().record_span("ui.thread_start", (time.perf_counter() - started_at) * 1000)
+
+    def _run(self):
+        """界面线程主体：创建隐藏根窗口并运行主循环"""
+        telemetry = get_telemetry()
+        try:
+            with telemetry.span("ui.tk_init"):
+                self.root = tk.Tk()
+                self.root.withdraw()
+            telemetry.install_ui_profiler(self.root)
+            self.root.after(POLL_INTERVAL_MS, self._poll_commands)
+        except BaseException as e:
+            self._error = e
+            self.root = None
+            return
+        finally:
+            # 无论成功与否都通知等待方，避免start()一直阻塞
+            self._ready.set()
+        self.root.mainloop()
+
+    def _poll_commands(self):
+        """在界面线程中执行队列里的命令"""
+        while True:
+            try:
+                func, future = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            self._execute(func, future)
+        self.root.after(POLL_INTERVAL_MS, self._poll_commands)
+
+    @staticmethod
+    def _execute(func, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+
+    def is_ui_thread(self):
+        """当前线程是否为界面线程"""
+        return threading.current_thread() is self.thread
+
+    def submit(self, func, *args) -> Future:
+        """将函数提交到界面线程执行，返回concurrent.futures.Future"""
+        self.start()
+        future = Future()
+        if self.is_ui_thread():
+            self._execute(lambda: func(*args), future)
+        else:
+            self._commands.put((lambda: func(*args), future))
+        return future
+
+    def session_opened(self):
+        """登记新打开的对话框，返回叠放显示所需的位置偏移（像素）"""
+        offset = self.open_sessions * STACK_OFFSET
+        self.open_sessions += 1
+        return offset
+
+    def session_closed(self):
+        """登记对话框关闭"""
+        self.open_sessions = max(0, self.open_sessions - 1)
+
+    def record_latency(self, name, latency_ms):
+        """记录对话框从请求打开到可见的耗时"""
+        self.latencies.append((name, latency_ms))
+        del self.latencies[:-MAX_LATENCY_RECORDS]
+        get_telemetry().record_span("dialog.open_to_visible", latency_ms, window=name)
+        print(f"{name}打开到可见耗时: {latency_ms:.1f}ms", file=sys.stderr)
+
+    def track_visible(self, name, window, requested_at):
+        """在窗口首次映射到屏幕时记录打开延迟"""
+        def on_map(event):
+            if event.widget is window:
+                window.unbind("<Map>", bind_id)
+                self.record_latency(name, (time.perf_counter() - requested_at) * 1000)
+        bind_id = window.bind("<Map>", on_map, add="+")
+
+
+_ui_thread = None
+_ui_thread_lock = threading.Lock()
+
+
+def get_ui_thread() -> UIThread:
+    """获取进程内唯一的界面线程（首次调用时启动）"""
+    global _ui_thread
+    with _ui_thread_lock:
+        if _ui_thread is None:
+            _ui_thread = UIThread()
+    _ui_thread.start()
+    return _ui_thread
+
+
+async def get_ui_thread_async() -> UIThread:
+    """在事件循环中获取界面线程：首次启动（Tk初始化）在线程池中进行，不阻塞事件循环
+
+    没有可用的显示环境等导致Tk初始化失败时抛出其异常。
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, get_ui_thread)
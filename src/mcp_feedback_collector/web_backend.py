@@ -0,0 +1,583 @@
+"""
+浏览器反馈界面后端
+在本地启动一个基于asyncio的轻量HTTP服务，在浏览器中填写反馈，不依赖图形
+显示环境（适合远程Linux机器，配合SSH端口转发使用）。
+上传的图片按multipart分块流式写入磁盘，不在内存中保留完整数据。
+"""
+
+import asyncio
+import html
+import json
+import secrets
+import shutil
+import sys
+import tempfile
+import time
+import webbrowser
+from datetime import datetime
+from email.message import Message
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    from .backend import AUTO_TIMEOUT_MESSAGE, FeedbackBackend, image_limit_error
+    from .images import ImageEntry, get_executor
+except ImportError:
+    from backend import AUTO_TIMEOUT_MESSAGE, FeedbackBackend, image_limit_error
+    from images import ImageEntry, get_executor
+
+# 读取请求体的块大小
+CHUNK_SIZE = 64 * 1024
+# multipart单个部分头部的最大长度
+MAX_PART_HEADER_BYTES = 16 * 1024
+# JSON请求体和普通表单字段的最大长度
+MAX_FIELD_BYTES = 1024 * 1024
+# 单次上传请求的最大长度
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+# 限制图片总大小时，为multipart分隔符和头部预留的字节数
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+HTTP_STATUS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """返回给浏览器的HTTP错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class MultipartStream:
+    """按块读取定长请求体，支持查找分隔标记"""
+
+    def __init__(self, reader, length: int):
+        self.reader = reader
+        self.remaining = length
+        self.buffer = bytearray()
+
+    async def _fill(self):
+        if self.remaining <= 0:
+            raise HTTPError(400, "请求体不完整")
+        chunk = await self.reader.read(min(CHUNK_SIZE, self.remaining))
+        if not chunk:
+            raise HTTPError(400, "连接已断开")
+        self.remaining -= len(chunk)
+        self.buffer += chunk
+
+    async def read_exact(self, size: int) -> bytes:
+        while len(self.buffer) < size:
+            await self._fill()
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    async def read_until(self, marker: bytes, limit: int) -> bytes:
+        """读取到标记为止（不含标记），超过limit时报错"""
+        while True:
+            index = self.buffer.find(marker)
+            if index >= 0:
+                data = bytes(self.buffer[:index])
+                del self.buffer[:index + len(marker)]
+                return data
+            if len(self.buffer) > limit:
+                raise HTTPError(400, "multipart头部过长")
+            await self._fill()
+
+    async def stream_until(self, marker: bytes, write=None):
+        """将标记之前的数据分块交给write（为None时丢弃），并跳过标记"""
+        keep = len(marker) - 1
+        while True:
+            index = self.buffer.find(marker)
+            if index >= 0:
+                if write is not None:
+                    write(self.buffer[:index])
+                del self.buffer[:index + len(marker)]
+                return
+            if len(self.buffer) > keep:
+                cut = len(self.buffer) - keep
+                if write is not None:
+                    write(self.buffer[:cut])
+                del self.buffer[:cut]
+            await self._fill()
+
+    async def drain(self):
+        """丢弃剩余的请求体"""
+        self.buffer.clear()
+        while self.remaining > 0:
+            chunk = await self.reader.read(min(CHUNK_SIZE, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+
+
+def _parse_part_headers(raw: bytes) -> dict:
+    headers = {}
+    for line in raw.decode("utf-8", "replace").split("\r\n"):
+        name, _, value = line.partition(":")
+        if value:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _parse_header_params(name: str, value: str) -> Message:
+    """解析带参数的头部（如Content-Disposition、Content-Type）"""
+    message = Message()
+    message[name] = value
+    return message
+
+
+async def parse_multipart(reader, length: int, boundary: bytes, open_file):
+    """流式解析multipart/form-data请求体
+
+    文件部分通过open_file(原始文件名)得到 (可写文件对象, 保存路径) 并逐块写入；
+    普通字段保存在内存中。返回 (fields, files)，files为 [(原始文件名, 保存路径)]。
+    """
+    stream = MultipartStream(reader, length)
+    delimiter = b"--" + boundary
+    await stream.stream_until(delimiter)
+
+    fields = {}
+    files = []
+    while await stream.read_exact(2) != b"--":
+        headers = _parse_part_headers(await stream.read_until(b"\r\n\r\n", MAX_PART_HEADER_BYTES))
+        disposition = _parse_header_params("content-disposition", headers.get("content-disposition", ""))
+        name = disposition.get_param("name", header="content-disposition") or ""
+        filename = disposition.get_filename()
+
+        if filename is not None:
+            if not filename:
+                # 未选择文件时浏览器仍会发送空的文件部分
+                await stream.stream_until(b"\r\n" + delimiter)
+                continue
+            f, path = open_file(filename)
+            with f:
+                await stream.stream_until(b"\r\n" + delimiter, f.write)
+            files.append((filename, path))
+        else:
+            chunks = []
+
+            def collect(data):
+                chunks.append(bytes(data))
+                if sum(len(chunk) for chunk in chunks) > MAX_FIELD_BYTES:
+                    raise HTTPError(413, f"表单字段过长: {name}")
+
+            await stream.stream_until(b"\r\n" + delimiter, collect)
+            fields[name] = b"".join(chunks).decode("utf-8", "replace")
+
+    await stream.drain()
+    return fields, files
+
+
+class WebSession:
+    """一次浏览器反馈会话"""
+
+    def __init__(self, token: str, work_summary: str, timeout_seconds: int, on_change=None,
+                 max_images: int = 0, max_total_bytes: int = 0, quick_reply: bool = False):
+        self.token = token
+        self.work_summary = work_summary
+        self.deadline = time.monotonic() + timeout_seconds
+        self.on_change = on_change
+        self.max_images = max_images
+        self.max_total_bytes = max_total_bytes
+        self.quick_reply = quick_reply
+        self.upload_dir = tempfile.mkdtemp(prefix="mcp-feedback-")
+        self.images = {}  # 图片编号 -> ImageEntry（按添加顺序）
+        self.text = ""
+        self.future = asyncio.get_running_loop().create_future()
+        self.closed = False  # collect已返回，上传目录可能已被删除
+        self._next_id = 0
+
+    @property
+    def finished(self) -> bool:
+        """会话已提交、取消、超时或已结束等待，不再接受上传"""
+        return self.closed or self.future.done()
+
+    def open_upload(self, filename: str):
+        """为上传文件创建磁盘文件，文件名由服务端生成"""
+        if self.finished:
+            raise HTTPError(409, "会话已结束")
+        suffix = Path(filename).suffix.lower()[:10]
+        self._next_id += 1
+        path = Path(self.upload_dir) / f"upload_{self._next_id:04d}{suffix}"
+        return open(path, "wb"), str(path)
+
+    @property
+    def image_bytes(self) -> int:
+        """已添加图片的原始数据总字节数"""
+        return sum(entry.file_size for entry in self.images.values())
+
+    def notify_change(self):
+        if self.on_change is not None:
+            self.on_change({'text': self.text, 'images': list(self.images.values())})
+
+    def build_result(self, text: str) -> dict:
+        """构建与Tk对话框相同格式的结果"""
+        images = list(self.images.values())
+        return {
+            'success': True,
+            'text_feedback': text or None,
+            'images': images or None,
+            'image_sources': [img.source for img in images] or None,
+            'has_text': bool(text),
+            'has_images': bool(images),
+            'image_count': len(images),
+            'timestamp': datetime.now().isoformat(),
+            'upload_dir': self.upload_dir
+        }
+
+
+class WebBackend(FeedbackBackend):
+    """在浏览器中填写反馈的后端"""
+
+    name = "web"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, open_browser: bool = True):
+        self.host = host
+        self.port = port
+        self.open_browser = open_browser
+        self.base_url = None
+        self.sessions = {}
+        self._server = None
+
+    async def start(self):
+        """启动HTTP服务（已启动时直接返回）"""
+        if self._server is None:
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+            port = self._server.sockets[0].getsockname()[1]
+            self.base_url = f"http://{self.host}:{port}"
+        return self.base_url
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def create_session(self, work_summary: str, timeout_seconds: int, on_change=None, **limits) -> WebSession:
+        """创建会话，返回的会话地址为 base_url + /s/<token>"""
+        session = WebSession(secrets.token_urlsafe(16), work_summary, timeout_seconds, on_change, **limits)
+        self.sessions[session.token] = session
+        return session
+
+    async def collect(self, work_summary: str, timeout_seconds: int, on_change=None,
+                      max_images: int = 0, max_total_bytes: int = 0, quick_reply: bool = False,
+                      draft_key: str = ""):
+        # 浏览器表单不保存草稿，draft_key被忽略
+        await self.start()
+        session = self.create_session(
+            work_summary, timeout_seconds, on_change,
+            max_images=max_images, max_total_bytes=max_total_bytes, quick_reply=quick_reply
+        )
+        url = f"{self.base_url}/s/{session.token}"
+        print(f"请在浏览器中填写反馈: {url}", file=sys.stderr)
+        if self.open_browser:
+            asyncio.get_running_loop().run_in_executor(None, webbrowser.open, url)
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(session.future), timeout_seconds)
+        except asyncio.TimeoutError:
+            # 超时：与Tk对话框一致，以自动消息加上已填写的内容提交
+            result = session.build_result(AUTO_TIMEOUT_MESSAGE + session.text)
+        except asyncio.CancelledError:
+            shutil.rmtree(session.upload_dir, ignore_errors=True)
+            raise
+        finally:
+            session.closed = True
+            self.sessions.pop(session.token, None)
+        if not result['success']:
+            shutil.rmtree(session.upload_dir, ignore_errors=True)
+        return result
+
+    def release(self, result):
+        upload_dir = (result or {}).get('upload_dir')
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+    async def _handle_connection(self, reader, writer):
+        """处理单个HTTP请求（不支持keep-alive）"""
+        try:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                return
+            try:
+                method, path, headers = self._parse_request_head(head)
+                status, content_type, body = await self._dispatch(method, path, headers, reader)
+            except HTTPError as e:
+                status, content_type, body = e.status, "application/json", json.dumps({'error': e.message})
+            except Exception as e:
+                print(f"反馈网页请求处理失败: {e}", file=sys.stderr)
+                status, content_type, body = 500, "application/json", json.dumps({'error': str(e)})
+
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Cache-Control: no-store\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_request_head(head: bytes):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "无效的请求行")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if value:
+                headers[name.strip().lower()] = value.strip()
+        return method.upper(), urlsplit(target).path, headers
+
+    @staticmethod
+    def _content_length(headers, limit: int) -> int:
+        if "content-length" not in headers:
+            raise HTTPError(411, "缺少Content-Length")
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            raise HTTPError(400, "无效的Content-Length")
+        if length < 0 or length > limit:
+            raise HTTPError(413, "请求体过大")
+        return length
+
+    async def _read_json(self, headers, reader) -> dict:
+        length = self._content_length(headers, MAX_FIELD_BYTES)
+        raw = await reader.readexactly(length) if length else b"{}"
+        try:
+            return json.loads(raw.decode("utf-8"))
+        except ValueError:
+            raise HTTPError(400, "无效的JSON")
+
+    async def _dispatch(self, method, path, headers, reader):
+        parts = path.strip("/").split("/")
+        if len(parts) < 2 or parts[0] != "s" or parts[1] not in self.sessions:
+            raise HTTPError(404, "会话不存在或已结束")
+        session = self.sessions[parts[1]]
+        action = parts[2] if len(parts) > 2 else ""
+
+        if action == "" and method == "GET":
+            return 200, "text/html", self._render_page(session)
+        if method != "POST":
+            raise HTTPError(405, "不支持的请求方法")
+        if session.finished:
+            raise HTTPError(409, "会话已结束")
+
+        if action == "upload":
+            return 200, "application/json", json.dumps(await self._handle_upload(session, headers, reader))
+        data = await self._read_json(headers, reader)
+        if action == "draft":
+            session.text = str(data.get('text', ""))
+            session.notify_change()
+        elif action == "remove":
+            entry = session.images.pop(str(data.get('id')), None)
+            if entry is not None:
+                # 删除上传的文件，反复上传和移除不会占用越来越多的磁盘空间
+                Path(entry.path).unlink(missing_ok=True)
+                session.notify_change()
+        elif action == "submit":
+            text = str(data.get('text', "")).strip()
+            if not text and not session.images:
+                raise HTTPError(400, "请至少提供文字反馈或图片反馈")
+            session.future.set_result(session.build_result(text))
+        elif action == "cancel":
+            session.future.set_result({'success': False, 'message': '用户取消了反馈提交'})
+        else:
+            raise HTTPError(404, "未知操作")
+        return 200, "application/json", json.dumps({'ok': True})
+
+    async def _handle_upload(self, session, headers, reader):
+        """流式接收上传的图片，写入磁盘后在图片线程池中读取头信息和缩略图"""
+        if session.quick_reply:
+            raise HTTPError(403, "快速回复模式不接受图片")
+        limit = MAX_UPLOAD_BYTES
+        if session.max_total_bytes:
+            # 超出剩余预算的请求体在读取之前直接拒绝
+            limit = min(limit, session.max_total_bytes - session.image_bytes + MULTIPART_OVERHEAD_BYTES)
+        length = self._content_length(headers, limit)
+        content_type = _parse_header_params("content-type", headers.get("content-type", ""))
+        boundary = content_type.get_param("boundary")
+        if content_type.get_content_type() != "multipart/form-data" or not boundary:
+            raise HTTPError(400, "需要multipart/form-data格式")
+
+        _, files = await parse_multipart(reader, length, boundary.encode("latin-1"), session.open_upload)
+        if session.finished:
+            # 上传期间会话已结束，结果中不会包含这些图片
+            for _, path in files:
+                Path(path).unlink(missing_ok=True)
+            raise HTTPError(409, "会话已结束")
+
+        loop = asyncio.get_running_loop()
+        uploaded = []
+        for filename, path in files:
+            error = image_limit_error(len(session.images) + 1, 0, session.max_images)
+            if error is not None:
+                Path(path).unlink(missing_ok=True)
+                uploaded.append({'name': filename, 'error': error})
+                continue
+            entry = ImageEntry.for_file(path)
+            entry.source = f"文件: {Path(filename).name}"
+            try:
+                await loop.run_in_executor(get_executor(), entry.load)
+            except Exception as e:
+                Path(path).unlink(missing_ok=True)
+                uploaded.append({'name': filename, 'error': f"无法读取图片: {e}"})
+                continue
+            error = image_limit_error(
+                0, session.image_bytes + entry.file_size, max_total_bytes=session.max_total_bytes
+            )
+            if error is not None:
+                Path(path).unlink(missing_ok=True)
+                uploaded.append({'name': filename, 'error': f"未添加图片 {filename}：{error}"})
+                continue
+            image_id = Path(path).stem
+            session.images[image_id] = entry
+            uploaded.append({
+                'id': image_id,
+                'name': filename,
+                'width': entry.size[0],
+                'height': entry.size[1],
+                'format': entry.format
+            })
+        if files:
+            session.notify_change()
+        return {'images': uploaded}
+
+    def _render_page(self, session) -> str:
+        remaining = max(0, int(session.deadline - time.monotonic()))
+        return FEEDBACK_PAGE.replace("{{SUMMARY}}", html.escape(session.work_summary or "本次对话中完成的工作内容...")) \
+            .replace("{{BASE}}", f"/s/{session.token}") \
+            .replace("{{REMAINING}}", str(remaining)) \
+            .replace("{{MODE}}", "quick" if session.quick_reply else "full")
+
+
+FEEDBACK_PAGE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>🎯 工作完成汇报与反馈收集</title>
+<style>
+  body { font-family: "Microsoft YaHei", sans-serif; background: #f5f5f5; color: #2c3e50; max-width: 760px; margin: 20px auto; padding: 0 15px; }
+  h1 { font-size: 20px; text-align: center; }
+  #countdown { text-align: center; font-weight: bold; margin-bottom: 16px; }
+  #countdown.urgent { color: #e74c3c; }
+  fieldset { background: #fff; border: 2px solid #ddd; border-radius: 6px; margin-bottom: 15px; }
+  legend { font-weight: bold; color: #34495e; }
+  pre { white-space: pre-wrap; background: #ecf0f1; padding: 10px; max-height: 260px; overflow: auto; }
+  textarea { width: 100%; box-sizing: border-box; height: 180px; font: inherit; padding: 8px; }
+  #previews { display: flex; flex-wrap: wrap; gap: 8px; margin-top: 10px; }
+  .tile { border: 1px solid #ccc; padding: 4px; font-size: 12px; text-align: center; background: #fff; }
+  .tile img { max-width: 100px; max-height: 80px; display: block; margin: 0 auto 4px; }
+  button { font: inherit; font-weight: bold; border: 0; border-radius: 4px; padding: 10px 18px; color: #fff; cursor: pointer; }
+  #submit { background: #27ae60; } #cancel { background: #95a5a6; } .remove { background: #e74c3c; padding: 2px 8px; }
+  #status { margin-top: 10px; color: #7f8c8d; }
+  .quick #images { display: none; } .quick textarea { height: 60px; } .quick pre { max-height: 120px; }
+</style>
+</head>
+<body class="{{MODE}}">
+<h1>🎯 工作完成汇报与反馈收集</h1>
+<div id="countdown"></div>
+<fieldset><legend>📋 AI工作完成汇报</legend><pre>{{SUMMARY}}</pre></fieldset>
+<fieldset><legend>💬 您的文字反馈（可选）</legend>
+  <textarea id="text" placeholder="请在此输入您的反馈、建议或问题..."></textarea></fieldset>
+<fieldset id="images"><legend>🖼️ 图片反馈（可选，支持多张，可直接粘贴）</legend>
+  <input type="file" id="files" accept="image/*" multiple>
+  <div id="previews"></div></fieldset>
+<button id="submit">✅ 提交反馈 (Ctrl+Enter)</button>
+<button id="cancel">❌ 取消 (Esc)</button>
+<div id="status">💡 超时后将自动提交固定反馈内容</div>
+<script>
+const base = "{{BASE}}";
+const deadline = Date.now() + {{REMAINING}} * 1000;
+const text = document.getElementById("text");
+const statusBox = document.getElementById("status");
+const quick = document.body.classList.contains("quick");
+let uploads = 0, draftTimer = null, finished = false;
+
+function post(action, body) {
+  return fetch(base + "/" + action, {method: "POST", headers: {"Content-Type": "application/json"},
+    body: JSON.stringify(body || {})}).then(r => r.json().then(data => {
+      if (!r.ok) throw new Error(data.error || r.statusText); return data; }));
+}
+function tick() {
+  if (finished) return;
+  const left = Math.max(0, Math.round((deadline - Date.now()) / 1000));
+  const box = document.getElementById("countdown");
+  box.className = left <= 60 ? "urgent" : "";
+  box.textContent = left > 0 ? `⏰ 剩余时间：${Math.floor(left / 60)}分${String(left % 60).padStart(2, "0")}秒`
+                             : "⏰ 已超时，自动提交反馈";
+  if (left > 0) setTimeout(tick, 1000);
+}
+function upload(fileList) {
+  const files = Array.from(fileList).filter(f => f.type.startsWith("image/"));
+  if (quick || !files.length) return;
+  const form = new FormData();
+  files.forEach((f, i) => form.append("files", f, f.name || `clipboard_${Date.now()}_${i}.png`));
+  uploads++;
+  statusBox.textContent = "图片上传中...";
+  fetch(base + "/upload", {method: "POST", body: form}).then(r => r.json()).then(data => {
+    (data.images || []).forEach((img, i) => addTile(img, files[i]));
+    if (data.error) alert(data.error);
+  }).catch(e => alert("上传失败: " + e)).finally(() => { uploads--; statusBox.textContent = ""; });
+}
+function addTile(img, file) {
+  if (img.error) { alert(img.error); return; }
+  const tile = document.createElement("div");
+  tile.className = "tile";
+  const preview = document.createElement("img");
+  preview.src = URL.createObjectURL(file);
+  const info = document.createElement("div");
+  info.textContent = `${img.name} ${img.width}x${img.height}`;
+  const remove = document.createElement("button");
+  remove.className = "remove"; remove.textContent = "×";
+  remove.onclick = () => post("remove", {id: img.id}).then(() => tile.remove());
+  tile.append(preview, info, remove);
+  document.getElementById("previews").append(tile);
+}
+function finish(message) {
+  finished = true;
+  document.body.innerHTML = `<h1>${message}</h1><p style="text-align:center">可以关闭此页面。</p>`;
+}
+function submit() {
+  if (uploads) { statusBox.textContent = "请等待图片上传完成"; return; }
+  post("submit", {text: text.value}).then(() => finish("✅ 反馈已提交")).catch(e => alert(e.message));
+}
+document.getElementById("files").onchange = e => { upload(e.target.files); e.target.value = ""; };
+document.addEventListener("paste", e => { if (e.clipboardData.files.length) { e.preventDefault(); upload(e.clipboardData.files); } });
+text.addEventListener("input", () => {
+  clearTimeout(draftTimer);
+  draftTimer = setTimeout(() => post("draft", {text: text.value}).catch(() => {}), 300);
+});
+document.getElementById("submit").onclick = submit;
+document.getElementById("cancel").onclick = () => post("cancel").then(() => finish("❌ 已取消反馈"));
+document.addEventListener("keydown", e => {
+  if (e.key === "Enter" && e.ctrlKey) submit();
+  // 快速回复模式下Enter直接提交，Shift+Enter换行
+  else if (quick && e.key === "Enter" && !e.shiftKey && e.target === text) { e.preventDefault(); submit(); }
+  if (e.key === "Escape") document.getElementById("cancel").click();
+});
+tick();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,13 @@
+import pytest
+
+from mcp_feedback_collector import cache, config
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(monkeypatch, tmp_path):
+    """每个测试使用独立的运行配置和图片缓存，不读写用户数据目录"""
+    monkeypatch.setenv("MCP_FEEDBACK_HISTORY", "off")
+    monkeypatch.setenv("MCP_FEEDBACK_DRAFTS", "off")
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setattr(config, "_config", None)
+    monkeypatch.setattr(cache, "_image_cache", None)
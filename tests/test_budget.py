@@ -0,0 +1,122 @@
+import asyncio
+import io
+from datetime import datetime
+from types import SimpleNamespace
+
+from PIL import Image
+
+from mcp_feedback_collector import budget, server
+from mcp_feedback_collector.budget import (
+    estimate_image_tokens, estimate_text_tokens, format_budget_note, image_cost, shape_images, text_cost,
+)
+from mcp_feedback_collector.transport import Base64Text
+
+
+def png_payload(size):
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue(), "png"
+
+
+def payload_sizes(payloads):
+    sizes = []
+    for data, _ in payloads:
+        with budget._open_payload(data) as img:
+            sizes.append(img.size)
+    return sizes
+
+
+def test_estimate_text_tokens():
+    assert estimate_text_tokens("") == 0
+    assert estimate_text_tokens("abcd" * 10) == 10
+    assert estimate_text_tokens("中文反馈") == 4
+    assert estimate_text_tokens("ok 好") == 2
+
+
+def test_estimate_image_tokens_follows_model_scaling():
+    assert estimate_image_tokens(0, 100) == 0
+    assert estimate_image_tokens(30, 25) == 1
+    assert estimate_image_tokens(750, 100) == 100
+    # 长边超过1568像素时先按长边缩小
+    assert estimate_image_tokens(3136, 100) == estimate_image_tokens(1568, 50)
+    # 像素数超过上限时按面积缩小
+    assert estimate_image_tokens(4000, 4000) == budget.MODEL_MAX_PIXELS // budget.PIXELS_PER_TOKEN + 1
+
+
+def test_payloads_within_budget_are_unchanged():
+    payloads = [png_payload((200, 150))]
+    shaped, note, cost = shape_images(payloads, max_tokens=1000)
+    assert shaped is payloads
+    assert note is None
+    assert cost == image_cost(payloads[0][0])
+
+
+def test_downscale_is_tried_first():
+    shaped, note, cost = shape_images([png_payload((2000, 1500))], max_tokens=1200)
+    assert payload_sizes(shaped) == [(1024, 768)]
+    assert "1024" in note
+    assert cost[0] <= 1200
+
+
+def test_many_images_become_one_contact_sheet():
+    # 图片都不大于最小的缩小尺寸，直接合并；每格512像素时仍超出，改为每格256像素
+    payloads = [png_payload((500, 500)) for _ in range(4)]
+    shaped, note, cost = shape_images(payloads, max_tokens=1000)
+    assert len(shaped) == 1
+    assert shaped[0][1] == "jpeg"
+    assert payload_sizes(shaped) == [(512, 512)]
+    assert "4 张图片已合并为一张网格图（每格 256 像素" in note
+    assert cost[0] <= 1000
+
+
+def test_single_image_falls_back_to_thumbnail():
+    shaped, note, _ = shape_images([png_payload((600, 600))], max_tokens=100)
+    assert payload_sizes(shaped) == [(budget.THUMBNAIL_EDGE, budget.THUMBNAIL_EDGE)]
+    assert "缩略图" in note
+
+
+def test_images_are_dropped_when_nothing_fits():
+    shaped, note, cost = shape_images([png_payload((600, 600))], max_tokens=50, reserved=(40, 100))
+    assert shaped == []
+    assert "未发送" in note
+    # 只剩文字和说明本身
+    note_tokens, note_bytes = budget.note_cost(1, max_tokens=50)
+    assert cost == (40 + note_tokens, 100 + note_bytes)
+
+
+def test_byte_budget_includes_reserved_text():
+    payloads = [png_payload((300, 300))]
+    _, size = image_cost(payloads[0][0])
+    assert shape_images(payloads, max_bytes=size + 10)[1] is None
+    shaped, note, cost = shape_images(payloads, max_bytes=size + 10, reserved=(0, 1000))
+    assert note is not None
+    assert cost[1] <= size + 10
+
+
+def test_format_budget_note():
+    note = format_budget_note("图片已缩小", (1234, 2048), max_tokens=2000, max_bytes=4096)
+    assert note == "响应预算：图片已缩小（返回内容估算 1,234 tokens / 2 KB，预算 2,000 tokens / 4 KB）"
+
+
+def test_degraded_response_including_note_stays_within_budget():
+    image = png_payload((2000, 1500))
+    text = "看一下这张截图"
+    result = {
+        'success': True, 'has_text': True, 'text_feedback': text, 'has_images': True,
+        'images': [SimpleNamespace(content_key=None, source="文件: shot.png")], 'encoded_images': [image], 'image_count': 1,
+        'timestamp': datetime(2026, 1, 1).isoformat(),
+    }
+    text_tokens = text_cost(f"用户文字反馈：{text}\n提交时间：{result['timestamp']}")[0]
+    # 缩小到1024像素时图片和文字恰好在预算内，但再加上说明就会超出
+    max_tokens = text_tokens + estimate_image_tokens(1024, 768) + 5
+
+    items, cost = asyncio.run(server._build_feedback_items(result, {}, {'max_tokens': max_tokens}))
+    total = 0
+    for item in items:
+        if isinstance(item, dict):
+            total += estimate_text_tokens(item['text'])
+        else:
+            total += image_cost(Base64Text(item.data))[0]
+    assert "响应预算" in items[0]['text']
+    assert total <= cost[0] <= max_tokens
@@ -0,0 +1,38 @@
+from PIL import Image
+
+from mcp_feedback_collector.cache import CachedImage, ImageCache
+from mcp_feedback_collector.transport import FileData
+
+
+def cached_image():
+    return CachedImage((64, 64), "PNG", 1000, Image.new("RGB", (10, 10)))
+
+
+def test_file_payload_does_not_evict_encoded_entries(tmp_path):
+    cache = ImageCache(max_bytes=50_000)
+    cache.put("encoded", cached_image())
+    cache.put_payload("encoded", ("jpeg", 85), (b"x" * 20_000, "jpeg"))
+    used = cache.total_bytes
+
+    # 原样发送的大文件只保存路径，不占用缓存的字节预算
+    cache.put("file", cached_image())
+    cache.put_payload("file", ("original",), (FileData(str(tmp_path / "large.png"), 500_000_000), "png"))
+
+    assert cache.get_payload("encoded", ("jpeg", 85)) is not None
+    assert cache.get_payload("file", ("original",)) is not None
+    assert cache.total_bytes == used + cached_image().nbytes
+
+    # 替换为内存中的编码结果时按实际大小计入
+    cache.put_payload("file", ("original",), (b"y" * 40_000, "png"))
+    assert cache.get("encoded") is None
+    assert cache.total_bytes == cache.get("file").nbytes
+
+
+def test_in_memory_payloads_are_evicted_lru():
+    cache = ImageCache(max_bytes=30_000)
+    for name in ("a", "b", "c"):
+        cache.put(name, cached_image())
+        cache.put_payload(name, ("png",), (b"x" * 12_000, "png"))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    assert cache.total_bytes <= 30_000
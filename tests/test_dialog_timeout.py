@@ -0,0 +1,228 @@
+import asyncio
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from mcp_feedback_collector import dialog
+from mcp_feedback_collector.backend import AUTO_TIMEOUT_MESSAGE
+
+GRACE_SECONDS = 0.6
+TIMEOUT_SECONDS = 0.2
+
+
+class BusyUIDialog(dialog.FeedbackDialog):
+    """模拟繁忙的界面线程：截止时间过后延迟一段时间才完成自动提交（None表示一直不提交）"""
+
+    def __init__(self, submit_delay):
+        super().__init__("测试汇报", TIMEOUT_SECONDS)
+        self.submit_delay = submit_delay
+
+    def _open_on_ui_thread(self):
+        if self.submit_delay is None:
+            return
+        delay = self.deadline - time.monotonic() + self.submit_delay
+        threading.Timer(delay, self._deliver_result, args=({
+            'success': True, 'text_feedback': AUTO_TIMEOUT_MESSAGE, 'has_text': True,
+            'has_images': False, 'image_count': 0,
+        },)).start()
+
+
+@pytest.fixture(autouse=True)
+def no_ui_thread(monkeypatch):
+    async def ready():
+        return None
+    monkeypatch.setattr(dialog, "get_ui_thread_async", ready)
+    monkeypatch.setattr(dialog, "AUTO_SUBMIT_GRACE_SECONDS", GRACE_SECONDS)
+
+
+def test_slow_auto_submit_within_grace_is_delivered():
+    result = asyncio.run(BusyUIDialog(submit_delay=GRACE_SECONDS / 2).show_dialog_async())
+    assert result is not None
+    assert result['text_feedback'] == AUTO_TIMEOUT_MESSAGE
+
+
+def test_hung_ui_thread_still_times_out():
+    start = time.monotonic()
+    result = asyncio.run(BusyUIDialog(submit_delay=None).show_dialog_async())
+    elapsed = time.monotonic() - start
+    assert result is None
+    assert TIMEOUT_SECONDS + GRACE_SECONDS - 0.05 <= elapsed < TIMEOUT_SECONDS + GRACE_SECONDS + 1.0
+
+
+def test_auto_submit_after_grace_is_ignored():
+    result = asyncio.run(BusyUIDialog(submit_delay=GRACE_SECONDS * 2).show_dialog_async())
+    assert result is None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeRoot:
+    """按测试给定的延迟策略执行定时回调的窗口替身（fire_delay返回回调实际执行前经过的秒数）"""
+
+    def __init__(self, clock, fire_delay=None):
+        self.clock = clock
+        self.fire_delay = fire_delay or (lambda delay: delay)
+        self.timers = {}
+        self._ids = iter(range(1, 10_000))
+
+    def after(self, delay_ms, func, *args):
+        after_id = f"after#{next(self._ids)}"
+        self.timers[after_id] = (self.clock.now + self.fire_delay(delay_ms / 1000), func, args)
+        return after_id
+
+    def after_cancel(self, after_id):
+        self.timers.pop(after_id, None)
+
+    def run_next(self):
+        """推进时钟到最早的回调并执行它"""
+        after_id = min(self.timers, key=lambda key: self.timers[key][0])
+        due, func, args = self.timers.pop(after_id)
+        self.clock.now = max(self.clock.now, due)
+        func(*args)
+
+    def destroy(self):
+        pass
+
+
+class FakeLabel:
+    def __init__(self):
+        self.updates = []
+
+    def config(self, **options):
+        self.updates.append(options['text'])
+
+
+class FakeText:
+    def __init__(self, text=""):
+        self.text = text
+
+    def get(self, start, end):
+        return self.text + "\n"
+
+    def insert(self, index, text):
+        self.text = text + self.text if index == 1.0 else self.text + text
+
+    def delete(self, start, end):
+        self.text = ""
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(dialog, "time", SimpleNamespace(monotonic=clock.monotonic, perf_counter=time.perf_counter))
+    monkeypatch.setattr(dialog, "get_ui_thread", lambda: SimpleNamespace(session_closed=lambda: None))
+    return clock
+
+
+def open_dialog(clock, timeout_seconds, fire_delay=None, text="用户写了一半"):
+    """不创建Tk窗口，用替身控件打开一个倒计时中的对话框"""
+    feedback = dialog.FeedbackDialog("测试汇报", timeout_seconds)
+    feedback.root = FakeRoot(clock, fire_delay)
+    feedback.countdown_label = FakeLabel()
+    feedback.text_widget = FakeText(text)
+    feedback.no_image_label = SimpleNamespace(pack=lambda **kw: None, pack_forget=lambda: None)
+    feedback.report_renderer = SimpleNamespace(cancel=lambda: None)
+    feedback._closed = False
+    feedback.deadline = clock.now + timeout_seconds
+    feedback.start_countdown()
+    return feedback
+
+
+def run_until_closed(feedback, max_steps=1000):
+    for _ in range(max_steps):
+        if feedback._closed or not feedback.root.timers:
+            return
+        feedback.root.run_next()
+    raise AssertionError("倒计时没有结束")
+
+
+def delivered(feedback):
+    results = []
+    while not feedback.result_queue.empty():
+        results.append(feedback.result_queue.get_nowait())
+    return results
+
+
+def test_late_timers_do_not_drift_and_auto_submit_near_deadline(clock):
+    rng = random.Random(7)
+    # 每次定时回调都晚0～0.8秒执行
+    feedback = open_dialog(clock, 30, fire_delay=lambda delay: delay + rng.uniform(0, 0.8))
+    deadline = feedback.deadline
+    run_until_closed(feedback)
+
+    [result] = delivered(feedback)
+    assert result['text_feedback'].startswith(AUTO_TIMEOUT_MESSAGE)
+    assert result['text_feedback'].endswith("用户写了一半")
+    # 自动提交发生在截止时间之后、不超过一次回调的延迟
+    assert deadline <= clock.now < deadline + 0.8 + 0.01
+    # 显示的秒数单调递减，延迟的回调跳过的秒数不会补画，同一数值不会重复绘制
+    seconds = [int(text.split("：")[1].rstrip("秒")) for text in feedback.countdown_label.updates[:-1]]
+    assert seconds == sorted(set(seconds), reverse=True)
+    assert seconds[0] == 30
+    assert feedback.countdown_label.updates[-1] == "⏰ 已超时，自动提交反馈"
+
+
+def test_stalled_loop_auto_submits_on_first_callback_after_deadline(clock):
+    feedback = open_dialog(clock, 10)
+    # 界面线程卡住，下一次回调在截止时间过后很久才执行
+    clock.now = feedback.deadline + 42
+    feedback.root.run_next()
+
+    assert len(delivered(feedback)) == 1
+    assert feedback._closed
+    assert not feedback.root.timers
+
+
+def test_label_is_reconfigured_only_when_displayed_seconds_change(clock):
+    # 定时回调提前并成批执行（时钟几乎没有前进）
+    feedback = open_dialog(clock, 90, fire_delay=lambda delay: 0.0)
+    assert feedback.countdown_label.updates == ["⏰ 剩余时间：1分30秒"]
+    for _ in range(20):
+        feedback.root.run_next()
+    assert feedback.countdown_label.updates == ["⏰ 剩余时间：1分30秒"]
+
+    clock.now += 0.5
+    feedback.root.run_next()
+    clock.now += 0.6
+    feedback.root.run_next()
+    assert feedback.countdown_label.updates == ["⏰ 剩余时间：1分30秒", "⏰ 剩余时间：1分29秒"]
+    # 只保留一个倒计时回调
+    assert len(feedback.root.timers) == 1
+
+
+def test_pending_submit_and_close_guard_against_double_submit(clock):
+    feedback = open_dialog(clock, 5)
+    feedback._ingest_jobs = [(object(), None)]  # 仍有图片在后台处理
+
+    clock.now = feedback.deadline
+    feedback.root.run_next()
+    pending = feedback._submit_after_id
+    assert pending is not None
+    # 等待期间的手动提交和再次自动提交都不会安排第二个提交
+    feedback.submit_feedback()
+    feedback.auto_submit_on_timeout()
+    assert feedback._submit_after_id == pending
+    assert list(feedback.root.timers) == [pending]
+
+    feedback._ingest_jobs = []
+    feedback.root.run_next()
+    [result] = delivered(feedback)
+    # 自动回复只插入一次
+    assert result['text_feedback'].count(AUTO_TIMEOUT_MESSAGE) == 1
+    assert feedback._closed
+
+    # 关闭之后的提交、自动提交和取消都被忽略
+    feedback.submit_feedback()
+    feedback.auto_submit_on_timeout()
+    feedback.cancel()
+    assert delivered(feedback) == []
+    assert not feedback.root.timers
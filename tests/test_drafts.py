@@ -0,0 +1,124 @@
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from mcp_feedback_collector import drafts, server
+from mcp_feedback_collector.drafts import DraftStore
+from mcp_feedback_collector.images import ImageEntry
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DraftStore(str(tmp_path / "drafts.sqlite3"))
+    yield store
+    store._executor.shutdown()
+
+
+def _file_entry(tmp_path, name):
+    path = tmp_path / name
+    Image.new("RGB", (20, 10), (0, 128, 255)).save(path)
+    return ImageEntry.from_file(str(path))
+
+
+def _clipboard_entry(color):
+    return ImageEntry.from_clipboard(Image.new("RGB", (8, 8), color))
+
+
+def _rows(store, sql):
+    conn = sqlite3.connect(store.path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_saved_draft_is_restored(store, tmp_path):
+    file_entry = _file_entry(tmp_path, "shot.png")
+    clipboard_entry = _clipboard_entry("red")
+    session = store.session("key")
+    session.save("写了一半", [file_entry, clipboard_entry]).result(timeout=5)
+
+    draft = store.load("key").result(timeout=5)
+    assert draft.text == "写了一半"
+    assert draft.refs() == [
+        (file_entry.source, file_entry.path, None),
+        ("剪贴板", None, clipboard_entry.digest),
+    ]
+    assert draft.images[1][3] == clipboard_entry.read_bytes()
+    assert store.load("other").result(timeout=5) is None
+
+
+def test_session_writes_only_changes(store, tmp_path):
+    clipboard_entry = _clipboard_entry("red")
+    session = store.session("key")
+    session.save("文字", [clipboard_entry]).result(timeout=5)
+    assert session.save("文字", [clipboard_entry]) is None
+
+    # 同一剪贴板图片再次附加时数据只存一份
+    session.save("文字", [clipboard_entry, clipboard_entry]).result(timeout=5)
+    assert _rows(store, "SELECT count(*) FROM draft_blobs") == [(1,)]
+
+    session.save("改过的文字", [clipboard_entry]).result(timeout=5)
+    draft = store.load("key").result(timeout=5)
+    assert draft.text == "改过的文字"
+    assert len(draft.images) == 1
+
+
+def test_restored_session_continues_from_draft(store):
+    store.session("key").save("草稿", []).result(timeout=5)
+    draft = store.load("key").result(timeout=5)
+    assert store.session("key", draft).save("草稿", []) is None
+
+
+def test_discard_removes_draft_and_unused_blobs(store):
+    session = store.session("key")
+    session.save("文字", [_clipboard_entry("blue")]).result(timeout=5)
+    session.discard().result(timeout=5)
+    assert store.load("key").result(timeout=5) is None
+    assert _rows(store, "SELECT count(*) FROM draft_blobs") == [(0,)]
+
+
+def test_deleted_files_are_not_restored(store, tmp_path):
+    file_entry = _file_entry(tmp_path, "gone.png")
+    store.session("key").save("", [file_entry]).result(timeout=5)
+    (tmp_path / "gone.png").unlink()
+    assert store.load("key").result(timeout=5) is None
+
+
+def test_old_drafts_are_purged_on_open(store):
+    store.session("old").save("很久以前", [_clipboard_entry("green")]).result(timeout=5)
+    store.session("new").save("刚才", []).result(timeout=5)
+    stale = (datetime.now() - timedelta(days=drafts.DRAFT_MAX_AGE_DAYS + 1)).isoformat()
+    conn = sqlite3.connect(store.path)
+    with conn:
+        conn.execute("UPDATE drafts SET updated_at = ? WHERE key = 'old'", (stale,))
+    conn.close()
+
+    reopened = DraftStore(store.path)
+    try:
+        assert reopened.load("old").result(timeout=5) is None
+        assert reopened.load("new").result(timeout=5).text == "刚才"
+        assert _rows(store, "SELECT count(*) FROM draft_blobs") == [(0,)]
+    finally:
+        reopened._executor.shutdown()
+
+
+def _context(client_name):
+    params = SimpleNamespace(clientInfo=SimpleNamespace(name=client_name))
+    return SimpleNamespace(session=SimpleNamespace(client_params=params))
+
+
+def test_draft_key_separates_clients_and_agents(monkeypatch):
+    monkeypatch.delenv("MCP_FEEDBACK_CLIENT_NAME", raising=False)
+    key = server._draft_key(_context("agent-a"))
+    assert key != server._draft_key(_context("agent-b"))
+    monkeypatch.setattr(server.os, "getppid", lambda: -1)
+    assert key != server._draft_key(_context("agent-a"))
+    # 没有请求上下文时仍按目录和进程区分
+    assert server._draft_key(None).startswith(server.os.getcwd())
+
+    monkeypatch.setenv("MCP_FEEDBACK_CLIENT_NAME", "reviewer")
+    assert server._draft_key(_context("agent-a")) == server._draft_key(None)
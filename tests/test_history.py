@@ -0,0 +1,88 @@
+import pytest
+
+from mcp_feedback_collector import config
+from mcp_feedback_collector.history import FeedbackHistory
+from mcp_feedback_collector.images import ImageEntry
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = FeedbackHistory(str(tmp_path / "history.sqlite3"))
+    yield history
+    history._executor.shutdown()
+
+
+def _submitted(text, images=None):
+    return {'success': True, 'text_feedback': text, 'images': images}
+
+
+def _record_all(history, sessions):
+    for work_summary, result in sessions:
+        history.record(work_summary, result).result(timeout=5)
+
+
+def _search(history, *args, **kwargs):
+    return history.search(*args, **kwargs).result(timeout=5)
+
+
+def test_trigram_search_matches_chinese_substrings(history):
+    _record_all(history, [
+        ("重构了图片缓存模块", _submitted("缓存命中率提高了")),
+        ("修复登录页面样式", _submitted("按钮颜色不对")),
+    ])
+    _search(history)  # 打开数据库
+    if not history._trigram:
+        pytest.skip("SQLite不支持三元组分词")
+
+    sessions = _search(history, "图片缓存")
+    assert [s['work_summary'] for s in sessions] == ["重构了图片缓存模块"]
+    assert sessions[0]['feedback'] == "缓存命中率提高了"
+    # 多个词需同时出现，FTS语法字符按普通文字处理
+    assert _search(history, "登录页面 按钮颜色")[0]['work_summary'] == "修复登录页面样式"
+    assert _search(history, '"图片 OR 登录"') == []
+
+
+def test_short_terms_fall_back_to_like(history):
+    _record_all(history, [
+        ("调整UI布局", _submitted("ok")),
+        ("更新文档", _submitted("100% 完成")),
+    ])
+    assert [s['work_summary'] for s in _search(history, "UI")] == ["调整UI布局"]
+    assert [s['work_summary'] for s in _search(history, "文档")] == ["更新文档"]
+    # LIKE的通配符按普通字符匹配
+    assert [s['work_summary'] for s in _search(history, "0%")] == ["更新文档"]
+    assert _search(history, "_") == []
+
+
+def test_outcomes_and_image_references(history, tmp_path):
+    from PIL import Image
+    image_path = tmp_path / "shot.png"
+    Image.new("RGB", (30, 20)).save(image_path)
+    entry = ImageEntry.for_file(str(image_path))
+    entry.load()
+    entry.source = "文件: shot.png"
+    _record_all(history, [
+        ("第一次汇报", None),
+        ("第二次汇报", {'success': False, 'message': "取消"}),
+        ("第三次汇报", _submitted("", [entry])),
+    ])
+
+    assert [s['outcome'] for s in _search(history)] == ["submitted", "cancelled", "timeout"]
+    assert [s['work_summary'] for s in _search(history, outcome="timeout")] == ["第一次汇报"]
+    assert _search(history, since="2999-01-01") == []
+    submitted = _search(history, limit=1)[0]
+    assert submitted['image_count'] == 1
+    assert submitted['images'] == [{
+        'digest': entry.digest, 'source': "文件: shot.png", 'format': "PNG", 'width': 30, 'height': 20
+    }]
+
+
+def test_history_is_off_unless_enabled(monkeypatch, tmp_path):
+    monkeypatch.delenv("MCP_FEEDBACK_HISTORY")
+    assert config.FeedbackConfig().history_path is None
+    monkeypatch.setenv("MCP_FEEDBACK_HISTORY", "on")
+    assert config.FeedbackConfig().history_path == str(
+        tmp_path / "data" / "mcp-feedback-collector" / "history.sqlite3"
+    )
+    monkeypatch.setenv("MCP_FEEDBACK_HISTORY", str(tmp_path / "custom.sqlite3"))
+    assert config.FeedbackConfig().history_path == str(tmp_path / "custom.sqlite3")
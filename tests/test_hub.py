@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+from PIL import Image
+
+from mcp_feedback_collector.backend import FeedbackBackend
+from mcp_feedback_collector.hub import FeedbackHub, HubBackend
+from mcp_feedback_collector.images import ImageEntry
+
+
+class ScriptedBackend(FeedbackBackend):
+    """中心使用的本地后端：返回预设结果，或一直等待并记录是否被取消"""
+
+    name = "scripted"
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.opened = asyncio.Event()
+        self.cancelled = asyncio.Event()
+
+    def prewarm(self):
+        pass
+
+    async def collect(self, work_summary, timeout_seconds, on_change=None, max_images=0,
+                      max_total_bytes=0, quick_reply=False, draft_key=""):
+        self.opened.set()
+        if self.error is not None:
+            raise self.error
+        if self.result is not None:
+            return self.result
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+async def _start_hub(hub):
+    task = asyncio.create_task(hub.serve_forever())
+    while not hub.owns_socket:
+        await asyncio.sleep(0.01)
+    return task
+
+
+async def _stop(task):
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_frontend_disconnect_cancels_session(tmp_path):
+    socket_path = str(tmp_path / "hub.sock")
+
+    async def scenario():
+        backend = ScriptedBackend()
+        hub_task = await _start_hub(FeedbackHub(socket_path, backend))
+        frontend = asyncio.create_task(HubBackend(socket_path).collect("汇报", 60))
+        await asyncio.wait_for(backend.opened.wait(), 5)
+        await _stop(frontend)
+        await asyncio.wait_for(backend.cancelled.wait(), 5)
+        await _stop(hub_task)
+
+    asyncio.run(scenario())
+
+
+def test_second_hub_does_not_take_over_live_socket(tmp_path):
+    socket_path = str(tmp_path / "hub.sock")
+
+    async def scenario():
+        hub_task = await _start_hub(FeedbackHub(socket_path, ScriptedBackend()))
+        second = FeedbackHub(socket_path, ScriptedBackend())
+        with pytest.raises(RuntimeError):
+            await second.serve_forever()
+        assert not second.owns_socket
+        await _stop(hub_task)
+
+    asyncio.run(scenario())
+
+
+def test_stale_socket_is_replaced(tmp_path):
+    socket_path = tmp_path / "hub.sock"
+    socket_path.write_bytes(b"")
+
+    async def scenario():
+        hub_task = await asyncio.wait_for(_start_hub(FeedbackHub(str(socket_path), ScriptedBackend())), 5)
+        await _stop(hub_task)
+
+    asyncio.run(scenario())
+
+
+def test_result_images_keep_pil_format_name(tmp_path):
+    socket_path = str(tmp_path / "hub.sock")
+    image_path = tmp_path / "shot.jpg"
+    Image.new("RGB", (32, 24), (200, 30, 30)).save(image_path, "JPEG")
+    entry = ImageEntry.for_file(str(image_path))
+    entry.load()
+    entry.source = "文件: shot.jpg"
+
+    async def scenario():
+        backend = ScriptedBackend({
+            'success': True, 'text_feedback': "好", 'images': [entry], 'image_count': 1
+        })
+        hub_task = await _start_hub(FeedbackHub(socket_path, backend))
+        result = await asyncio.wait_for(HubBackend(socket_path).collect("汇报", 60), 5)
+        await _stop(hub_task)
+        return result
+
+    result = asyncio.run(scenario())
+    image = result['images'][0]
+    assert image.format == "JPEG"
+    assert image.size == (32, 24)
+    assert result['encoded_images'][0][1] == "jpeg"
+
+
+def test_frontend_falls_back_without_unix_sockets(monkeypatch, tmp_path):
+    monkeypatch.delattr(asyncio, "open_unix_connection")
+    local = ScriptedBackend({'success': False, 'message': "本地界面"})
+    backend = HubBackend(str(tmp_path / "hub.sock"), fallback=lambda: local)
+    result = asyncio.run(backend.collect("汇报", 60))
+    assert result == {'success': False, 'message': "本地界面"}
+
+
+def test_hub_refuses_to_start_without_unix_sockets(monkeypatch, tmp_path):
+    monkeypatch.delattr(asyncio, "start_unix_server")
+    hub = FeedbackHub(str(tmp_path / "hub.sock"), ScriptedBackend())
+    with pytest.raises(RuntimeError):
+        asyncio.run(hub.serve_forever())
+    assert not hub.owns_socket
+
+
+def test_backend_errors_are_returned_as_results(tmp_path):
+    socket_path = str(tmp_path / "hub.sock")
+
+    async def scenario():
+        hub_task = await _start_hub(FeedbackHub(socket_path, ScriptedBackend(error=RuntimeError("Tk已退出"))))
+        result = await asyncio.wait_for(HubBackend(socket_path).collect("汇报", 60), 5)
+        await _stop(hub_task)
+        return result
+
+    result = asyncio.run(scenario())
+    assert result['success'] is False
+    assert "Tk已退出" in result['message']
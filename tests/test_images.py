@@ -0,0 +1,113 @@
+import base64
+import io
+import random
+
+import pytest
+from PIL import Image
+
+from mcp_feedback_collector import config
+from mcp_feedback_collector.images import MARK_COLOR, ImageEdits, ImageEntry, encode_images
+from mcp_feedback_collector.transport import payload_base64
+
+
+def noisy_image(path, size=(600, 400), seed=1):
+    rng = random.Random(seed)
+    img = Image.new("RGB", size)
+    img.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(size[0] * size[1])])
+    img.save(path)
+    return path
+
+
+def decode(data):
+    return Image.open(io.BytesIO(base64.b64decode(payload_base64(data))))
+
+
+def quadrant_image(path):
+    """四个象限颜色不同的图片"""
+    img = Image.new("RGB", (200, 100), (255, 255, 255))
+    img.paste((0, 0, 255), (100, 0, 200, 50))
+    img.paste((0, 255, 0), (0, 50, 100, 100))
+    img.save(path)
+    return path
+
+
+def test_total_byte_budget_counts_duplicate_images(tmp_path):
+    path = noisy_image(tmp_path / "noise.png")
+    entries = [ImageEntry.from_file(path), ImageEntry.from_file(path)]
+    encoded = encode_images(entries, target_format="jpeg", max_total_bytes=200_000)
+    assert len(encoded) == 2
+    assert sum(len(data) for data, _ in encoded) <= 200_000
+
+
+def test_gif_is_not_an_output_format(tmp_path):
+    path = tmp_path / "cmyk.jpg"
+    Image.new("CMYK", (64, 64), (0, 100, 200, 0)).save(path)
+    with pytest.raises(ValueError):
+        encode_images([ImageEntry.from_file(path)], target_format="gif")
+    [(data, fmt)] = encode_images([ImageEntry.from_file(path)], target_format="png")
+    assert fmt == "png"
+
+
+def test_16_bit_png_gets_displayable_thumbnail(tmp_path):
+    path = tmp_path / "depth.png"
+    img = Image.new("I;16", (300, 200))
+    img.putdata([(i * 97) % 65536 for i in range(300 * 200)])
+    img.save(path)
+    entry = ImageEntry.from_file(path)
+    assert entry.thumbnail_image.mode == "L"
+    assert max(entry.thumbnail_image.size) <= 100
+    [(data, fmt)] = encode_images([entry])
+    assert fmt == "png"
+
+
+def test_invalid_image_format_is_rejected_when_config_is_read(monkeypatch, capsys):
+    monkeypatch.setenv("MCP_IMAGE_FORMAT", "tiff")
+    assert config.get_config().image_encoding['target_format'] == "original"
+    assert "MCP_IMAGE_FORMAT" in capsys.readouterr().err
+    with pytest.raises(ValueError):
+        config.check_image_format("gif")
+
+
+def test_crop_is_applied_to_the_original_at_encode_time(tmp_path):
+    path = quadrant_image(tmp_path / "quadrants.png")
+    entry = ImageEntry.from_file(path)
+    entry.edits = ImageEdits(crop=(100, 0, 200, 50))
+    assert entry.output_size == (100, 50)
+
+    [(data, fmt)] = encode_images([entry])
+    assert fmt == "png"
+    with decode(data) as img:
+        assert img.size == (100, 50)
+        assert img.convert("RGB").getcolors() == [(100 * 50, (0, 0, 255))]
+    # 原文件不被修改
+    with Image.open(path) as original:
+        assert original.size == (200, 100)
+
+
+def test_marks_are_drawn_in_original_coordinates_after_crop(tmp_path):
+    path = quadrant_image(tmp_path / "quadrants.png")
+    entry = ImageEntry.from_file(path)
+    entry.edits = ImageEdits(crop=(0, 50, 100, 100), marks=[(10, 60, 50, 90)])
+
+    [(data, _)] = encode_images([entry])
+    with decode(data) as img:
+        img = img.convert("RGB")
+        assert img.size == (100, 50)
+        # 标注框左上角 (10, 60) 位于裁剪后的 (10, 10)
+        assert img.getpixel((10, 10)) == MARK_COLOR
+        assert img.getpixel((30, 25)) == (0, 255, 0)
+
+
+def test_edited_and_unedited_encodings_are_cached_separately(tmp_path):
+    path = quadrant_image(tmp_path / "quadrants.png")
+    plain = ImageEntry.from_file(path)
+    edited = ImageEntry.from_file(path)
+    edited.edits = ImageEdits(crop=(0, 0, 100, 50))
+    assert edited.content_key != plain.content_key
+
+    encoded = encode_images([plain, edited, plain], target_format="png")
+    sizes = []
+    for data, _ in encoded:
+        with decode(data) as img:
+            sizes.append(img.size)
+    assert sizes == [(200, 100), (100, 50), (200, 100)]
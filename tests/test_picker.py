@@ -0,0 +1,72 @@
+import asyncio
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from mcp_feedback_collector import picker
+from mcp_feedback_collector.picker import ImagePicker
+
+
+class FailingUI:
+    """提交的窗口创建在“界面线程”中失败"""
+
+    def submit(self, func, *args):
+        future = Future()
+        asyncio.get_running_loop().call_later(0.05, future.set_exception, RuntimeError("no display"))
+        return future
+
+
+def test_pick_raises_when_window_cannot_open(monkeypatch):
+    async def get_ui():
+        return FailingUI()
+
+    monkeypatch.setattr(picker, "get_ui_thread_async", get_ui)
+
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="no display"):
+        asyncio.run(ImagePicker().pick(30))
+    assert time.perf_counter() - start < 5
+
+
+class RecordingUI:
+    """记录提交到界面线程的调用，窗口一直保持打开"""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, func, *args):
+        self.calls.append((func.__name__, args))
+        return Future()
+
+
+def test_cancelled_pick_closes_window(monkeypatch):
+    ui = RecordingUI()
+
+    async def get_ui():
+        return ui
+
+    monkeypatch.setattr(picker, "get_ui_thread_async", get_ui)
+
+    async def scenario():
+        task = asyncio.create_task(ImagePicker().pick(30))
+        while not ui.calls:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert [name for name, _ in ui.calls] == ["_open_window", "_finish"]
+    assert ui.calls[1][1] == (None,)
+
+
+def test_timed_out_pick_closes_window(monkeypatch):
+    ui = RecordingUI()
+
+    async def get_ui():
+        return ui
+
+    monkeypatch.setattr(picker, "get_ui_thread_async", get_ui)
+    assert asyncio.run(ImagePicker().pick(0.05)) is None
+    assert [name for name, _ in ui.calls] == ["_open_window", "_finish"]
@@ -0,0 +1,128 @@
+from mcp_feedback_collector import report
+from mcp_feedback_collector.report import ReportRenderer
+
+
+class FakeText:
+    """记录插入内容和标签的Text控件替身，定时回调由测试手动执行"""
+
+    def __init__(self):
+        self.segments = []  # [(文字, 标签), ...]
+        self.callbacks = []
+        self.tags = set()
+
+    def tag_configure(self, tag, **options):
+        self.tags.add(tag)
+
+    def tag_bind(self, tag, sequence, func):
+        pass
+
+    def config(self, **options):
+        pass
+
+    def winfo_exists(self):
+        return True
+
+    def insert(self, index, *args):
+        if len(args) % 2:
+            args += ((),)
+        for text, tags in zip(args[::2], args[1::2]):
+            self.segments.append((text, tuple(tags)))
+
+    def delete(self, first, last):
+        if first == "more.first":
+            self.segments = [segment for segment in self.segments if "more" not in segment[1]]
+        else:
+            self.segments = []
+
+    def after(self, delay, func):
+        self.callbacks.append(func)
+        return f"after#{len(self.callbacks)}"
+
+    def after_cancel(self, after_id):
+        self.callbacks = []
+
+    def run_pending(self):
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+    @property
+    def text(self):
+        return "".join(text for text, _ in self.segments)
+
+    def tagged(self, tag):
+        return [text for text, tags in self.segments if tag in tags]
+
+
+def render(text, **options):
+    widget = FakeText()
+    renderer = ReportRenderer(widget, ("Arial", 11), **options)
+    renderer.render(text)
+    widget.run_pending()
+    return widget, renderer
+
+
+def test_markdown_tags():
+    widget, _ = render(
+        "# 标题\n"
+        "普通 **粗体** 和 `代码`\n"
+        "> 引用\n"
+        "```diff\n"
+        "@@ -1 +1 @@\n"
+        "-旧的\n"
+        "+新的\n"
+        "```\n"
+        "## 小标题"
+    )
+    assert widget.tagged("h1") == ["标题"]
+    assert widget.tagged("h2") == ["小标题"]
+    assert widget.tagged("bold") == ["粗体"]
+    assert widget.tagged("code") == ["代码"]
+    assert widget.tagged("quote") == ["> 引用"]
+    assert widget.tagged("diff_hunk") == ["@@ -1 +1 @@"]
+    assert widget.tagged("diff_del") == ["-旧的"]
+    assert widget.tagged("diff_add") == ["+新的"]
+    # 行内样式只保留文字，去掉标记符
+    assert "普通 粗体 和 代码" in widget.text
+
+
+def test_plain_text_mode_inserts_text_unchanged():
+    text = "# 不是标题\n**不加粗**"
+    widget, _ = render(text, markdown=False)
+    assert widget.text == text
+    assert "h1" not in widget.tags
+
+
+def test_long_report_is_inserted_in_chunks():
+    lines = [f"第{i}行" for i in range(report.FIRST_CHUNK_LINES + report.CHUNK_LINES + 10)]
+    widget = FakeText()
+    renderer = ReportRenderer(widget, ("Arial", 11), max_lines=0)
+    renderer.render("\n".join(lines))
+    assert widget.text.count("\n") == report.FIRST_CHUNK_LINES - 1
+    assert renderer.pending
+
+    widget.run_pending()
+    assert not renderer.pending
+    assert widget.text == "\n".join(lines)
+
+
+def test_max_lines_truncates_and_expands():
+    lines = [f"line {i}" for i in range(30)]
+    widget, renderer = render("\n".join(lines), max_lines=10)
+    assert widget.text.startswith("\n".join(lines[:10]))
+    assert "line 10" not in widget.text
+    assert widget.tagged("more") == ["\n… 还有 20 行未显示，点击展开"]
+
+    renderer.expand()
+    widget.run_pending()
+    assert widget.text == "\n".join(lines)
+    assert widget.tagged("more") == []
+
+
+def test_render_cancels_previous_chunks():
+    widget = FakeText()
+    renderer = ReportRenderer(widget, ("Arial", 11), max_lines=0)
+    renderer.render("\n".join(["旧"] * (report.FIRST_CHUNK_LINES + 1)))
+    assert renderer.pending
+    renderer.render("新的汇报")
+    widget.run_pending()
+    assert widget.text == "新的汇报"
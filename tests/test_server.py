@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from PIL import Image
+
+from mcp_feedback_collector import server
+from mcp_feedback_collector.backend import FeedbackBackend
+
+
+class PendingBackend(FeedbackBackend):
+    """collect一直等待到测试给出结果，用于在没有Tk的情况下保持会话打开"""
+
+    name = "pending"
+
+    def __init__(self):
+        self.opened = asyncio.Event()
+        self.result = None
+
+    async def collect(self, work_summary, timeout_seconds, on_change=None, max_images=0,
+                      max_total_bytes=0, quick_reply=False, draft_key=""):
+        self.result = asyncio.get_running_loop().create_future()
+        self.opened.set()
+        return await self.result
+
+
+def test_get_image_info_stays_fast_while_feedback_session_open(monkeypatch, tmp_path):
+    image_path = tmp_path / "screenshot.png"
+    Image.new("RGB", (64, 48), (200, 100, 50)).save(image_path)
+    backend = PendingBackend()
+    monkeypatch.setattr(server, "_feedback_backend", backend)
+
+    async def scenario():
+        session = asyncio.create_task(server.collect_feedback("测试汇报"))
+        await asyncio.wait_for(backend.opened.wait(), 5)
+
+        start = time.perf_counter()
+        infos = await asyncio.wait_for(asyncio.gather(*(
+            server.mcp.call_tool("get_image_info", {"image_path": str(image_path)}) for _ in range(20)
+        )), 5)
+        elapsed = time.perf_counter() - start
+        assert not session.done()
+
+        backend.result.set_result({
+            'success': True, 'text_feedback': "好的", 'images': None, 'image_sources': None,
+            'has_text': True, 'has_images': False, 'image_count': 0, 'timestamp': "2025-01-01T00:00:00",
+        })
+        items = await asyncio.wait_for(session, 5)
+        return infos, elapsed, items
+
+    infos, elapsed, items = asyncio.run(scenario())
+    assert elapsed < 1.0
+    assert all("64 x 48" in info[0].text for info in infos)
+    assert items[0]["text"].startswith("用户文字反馈：好的")
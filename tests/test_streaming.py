@@ -0,0 +1,28 @@
+import asyncio
+
+from mcp_feedback_collector.streaming import FeedbackProgressStreamer
+
+
+class RecordingContext:
+    def __init__(self):
+        self.progress = []
+        self.sent = asyncio.Event()
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.progress.append((progress, total, message))
+        self.sent.set()
+
+
+def test_snapshots_are_sent_as_progress_messages():
+    async def scenario():
+        ctx = RecordingContext()
+        streamer = FeedbackProgressStreamer(ctx)
+        streamer.start()
+        # 发送前连续到达的状态合并为最新的一条
+        streamer.publish({'text': "第一版", 'images': []})
+        streamer.publish({'text': "第二版", 'images': []})
+        await asyncio.wait_for(ctx.sent.wait(), 5)
+        await streamer.stop()
+        return ctx.progress
+
+    assert asyncio.run(scenario()) == [(1, None, "用户正在输入：第二版")]
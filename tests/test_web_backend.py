@@ -0,0 +1,167 @@
+import asyncio
+import io
+import json
+import os
+import shutil
+import urllib.error
+import urllib.request
+
+import pytest
+from PIL import Image
+
+from mcp_feedback_collector.web_backend import HTTPError, WebBackend
+
+
+def _request(url, data=None, content_type=None):
+    request = urllib.request.Request(url, data=data, method="POST" if data is not None else "GET")
+    if content_type:
+        request.add_header("Content-Type", content_type)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+def _multipart(filename, data):
+    boundary = "testboundary"
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), (10, 120, 200)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def _wait_for_session(backend):
+    while not backend.sessions:
+        await asyncio.sleep(0.01)
+    return next(iter(backend.sessions.values()))
+
+
+def test_page_upload_and_submit_over_http():
+    backend = WebBackend(port=0, open_browser=False)
+
+    async def scenario():
+        collect = asyncio.create_task(backend.collect("测试汇报", 10))
+        session = await asyncio.wait_for(_wait_for_session(backend), 5)
+        url = f"{backend.base_url}/s/{session.token}"
+
+        status, page = await asyncio.to_thread(_request, url)
+        assert status == 200
+        assert "测试汇报" in page
+
+        body, content_type = _multipart("shot.png", _png_bytes())
+        status, raw = await asyncio.to_thread(_request, url + "/upload", body, content_type)
+        assert status == 200
+        uploaded = json.loads(raw)["images"]
+        assert [(image["width"], image["height"]) for image in uploaded] == [(40, 30)]
+
+        payload = json.dumps({"text": "看起来不错"}).encode()
+        status, raw = await asyncio.to_thread(_request, url + "/submit", payload, "application/json")
+        assert (status, json.loads(raw)) == (200, {"ok": True})
+
+        result = await asyncio.wait_for(collect, 5)
+        await backend.close()
+        return result
+
+    result = asyncio.run(scenario())
+    try:
+        assert result["success"]
+        assert result["text_feedback"] == "看起来不错"
+        assert result["image_count"] == 1
+        assert result["images"][0].size == (40, 30)
+    finally:
+        backend.release(result)
+
+
+def test_unknown_session_is_not_found():
+    backend = WebBackend(port=0, open_browser=False)
+
+    async def scenario():
+        await backend.start()
+        try:
+            return await asyncio.to_thread(_request, f"{backend.base_url}/s/missing")
+        finally:
+            await backend.close()
+
+    status, raw = asyncio.run(scenario())
+    assert status == 404
+    assert "error" in json.loads(raw)
+
+
+def test_quick_reply_rejects_uploads_as_forbidden():
+    backend = WebBackend(port=0, open_browser=False)
+
+    def upload(url):
+        body, content_type = _multipart("shot.png", _png_bytes())
+        request = urllib.request.Request(url, data=body, method="POST")
+        request.add_header("Content-Type", content_type)
+        try:
+            urllib.request.urlopen(request, timeout=5)
+        except urllib.error.HTTPError as e:
+            return e.code, e.reason
+
+    async def scenario():
+        await backend.start()
+        session = backend.create_session("测试汇报", 10, quick_reply=True)
+        try:
+            return await asyncio.to_thread(upload, f"{backend.base_url}/s/{session.token}/upload")
+        finally:
+            await backend.close()
+            shutil.rmtree(session.upload_dir, ignore_errors=True)
+
+    assert asyncio.run(scenario()) == (403, "Forbidden")
+
+
+def test_removed_upload_is_deleted_from_disk():
+    backend = WebBackend(port=0, open_browser=False)
+
+    async def scenario():
+        await backend.start()
+        session = backend.create_session("测试汇报", 10)
+        url = f"{backend.base_url}/s/{session.token}"
+        try:
+            for _ in range(3):
+                body, content_type = _multipart("shot.png", _png_bytes())
+                status, raw = await asyncio.to_thread(_request, url + "/upload", body, content_type)
+                [uploaded] = json.loads(raw)["images"]
+                payload = json.dumps({"id": uploaded["id"]}).encode()
+                status, _ = await asyncio.to_thread(_request, url + "/remove", payload, "application/json")
+                assert status == 200
+            return session.images, os.listdir(session.upload_dir)
+        finally:
+            await backend.close()
+            shutil.rmtree(session.upload_dir, ignore_errors=True)
+
+    images, files = asyncio.run(scenario())
+    assert images == {}
+    assert files == []
+
+
+def test_finished_session_rejects_new_uploads():
+    async def scenario():
+        backend = WebBackend(port=0, open_browser=False)
+        answered = backend.create_session("测试汇报", 10)
+        released = backend.create_session("测试汇报", 10)
+        try:
+            answered.future.set_result({'success': False, 'message': "取消"})
+            # collect已返回、上传目录已删除的会话
+            released.closed = True
+            shutil.rmtree(released.upload_dir)
+            statuses = []
+            for session in (answered, released):
+                with pytest.raises(HTTPError) as error:
+                    session.open_upload("late.png")
+                statuses.append(error.value.status)
+            return statuses, os.listdir(answered.upload_dir)
+        finally:
+            shutil.rmtree(answered.upload_dir, ignore_errors=True)
+
+    assert asyncio.run(scenario()) == ([409, 409], [])